@@ -111,15 +111,17 @@ export async function GET(request: Request) {
     
     // Build query conditions
     let query = supabase
-      .from('player_odds_history')
+      .from('player_odds_current')
       .select('*')
       .eq('player_id', targetPlayerId)
       .eq('market', databaseMarket)
       .order('updated_at', { ascending: false })
     
-    // If we have event_id, filter by it, otherwise get latest odds
+    // If we have event_id, filter by it, otherwise get latest odds for games that haven't started
     if (targetEventId) {
       query = query.eq('vendor_event_id', targetEventId)
+    } else {
+      query = query.gte('commence_time', new Date().toISOString())
     }
     
     const { data: records, error } = await query
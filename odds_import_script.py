@@ -2,13 +2,24 @@
 # -*- coding: utf-8 -*-
 
 import os
+import sys
 import requests
 import unicodedata
 import re
 import json
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from supabase import create_client
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from odds_store import store_odds_records
+from redis_hash_layout import ODDS_HASH_LAYOUT, HashLayoutWriter, prune_market_hashes
+from redis_key_index import index_value_write
+from generation_publisher import ODDS_GENERATIONS, GenerationPublisher
+from ttl_policy import slate_ttl, ttl_for
+from upstash_rest import create_redis_client
+from poll_scheduler import record_quota
+from events_cache import upcoming_events
+
 # ENV VARS
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_KEY"]
@@ -23,13 +34,7 @@ supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 # Initialize Redis client if available
 redis_client = None
 if UPSTASH_URL and UPSTASH_TOKEN:
-    import redis
-    redis_client = redis.Redis(
-        host=UPSTASH_URL.replace("https://", "").split(":")[0],
-        port=6379,
-        password=UPSTASH_TOKEN,
-        ssl=True
-    )
+    redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN)
     print("Redis client initialized for game mapping lookup and current odds storage")
 
 # SETTINGS
@@ -85,7 +90,6 @@ ALTERNATIVE_MARKETS = {
 }
 
 ODDS_FORMAT = "american"
-BATCH_SIZE = 500  # Database batch insert size
 
 HARDCODED_PLAYER_ID_OVERRIDES = {
     "bobby witt": 677951,
@@ -200,7 +204,7 @@ def match_player(name, lookup):
     return lookup.get(n)
 
 def fetch_mlb_events():
-    """Fetch upcoming MLB events from the odds API"""
+    """Fetch upcoming MLB events from the odds API (use through events_cache)"""
     url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/events?apiKey={ODDS_API_KEY}"
     response = requests.get(url)
     response.raise_for_status()
@@ -219,53 +223,9 @@ def fetch_props_for_event(event_id):
     }
     response = requests.get(url, params=params)
     response.raise_for_status()
+    record_quota(redis_client, response.headers)
     return response.json()
 
-class DatabaseBatch:
-    """Efficient database batch operations"""
-    
-    def __init__(self, supabase_client, batch_size=BATCH_SIZE):
-        self.supabase = supabase_client
-        self.batch_size = batch_size
-        self.records = []
-    
-    def add_record(self, record):
-        """Add a record to the batch"""
-        self.records.append(record)
-        
-        if len(self.records) >= self.batch_size:
-            self.flush()
-    
-    def flush(self):
-        """Insert all pending records"""
-        if not self.records:
-            return
-            
-        try:
-            # Use upsert to handle duplicates
-            result = (
-                self.supabase
-                .from_("player_odds_history")
-                .upsert(self.records, on_conflict="vendor_event_id,player_id,market,line,sportsbook,created_at")
-                .execute()
-            )
-            
-            print(f"✅ Inserted {len(self.records)} odds records")
-            self.records.clear()
-            
-        except Exception as e:
-            print(f"❌ Database insert error: {e}")
-            # Log the problematic records for debugging
-            print(f"Sample record: {self.records[0] if self.records else 'None'}")
-            self.records.clear()
-            raise
-    
-    def __enter__(self):
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.flush()
-
 def get_game_mapping_from_redis(event_id):
     """Get mlb_game_id for a vendor event_id from Redis cache"""
     if not redis_client:
@@ -423,6 +383,9 @@ def store_current_odds_in_redis(records):
     
     # Store each player+market group in Redis
     stored_count = 0
+    run_ttl = slate_ttl("player_odds", (d['commence_time'] for d in grouped_odds.values()))
+    hash_writer = HashLayoutWriter(redis_client, SPORT_KEY, run_ttl) if ODDS_HASH_LAYOUT else None
+    publisher = GenerationPublisher(redis_client, SPORT_KEY, run_ttl, "player_odds") if ODDS_GENERATIONS else None
     for group_key, odds_data in grouped_odds.items():
         redis_key = f"odds:{SPORT_KEY}:{odds_data['player_id']}:{odds_data['market']}"
         
@@ -430,15 +393,38 @@ def store_current_odds_in_redis(records):
         odds_data['primary_line'] = determine_primary_line(odds_data['lines'], odds_data['has_alternates'])
         odds_data['last_updated'] = datetime.now(timezone.utc).isoformat()
         
-        # Store with 1.5 hour TTL (5400 seconds)
+        # Expire 30 minutes after first pitch (see ttl_policy.py)
         try:
-            redis_client.setex(redis_key, 5400, json.dumps(odds_data))
+            pipe = redis_client.pipeline(transaction=False)
+            index_value_write(pipe, redis_key, json.dumps(odds_data), ttl_for("player_odds", odds_data['commence_time']),
+                              market=odds_data['market'], player=odds_data['player_id'])
+            pipe.execute()
             stored_count += 1
+            if hash_writer:
+                hash_writer.put(odds_data['event_id'], odds_data['player_id'], odds_data['market'], odds_data)
+            if publisher:
+                publisher.put(redis_key, odds_data)
             print(f"✅ Stored Redis odds: {redis_key} ({len(odds_data['lines'])} lines)")
         except Exception as e:
             print(f"❌ Redis storage error for {redis_key}: {e}")
     
     print(f"📊 Successfully stored {stored_count} player+market combinations in Redis")
+    
+    # Readers of the published generation switch to this run all at once
+    if publisher:
+        try:
+            publisher.publish()
+        except Exception as e:
+            print(f"❌ Redis generation publish error: {e}")
+    
+    if hash_writer:
+        try:
+            hash_writer.flush()
+            base_markets = sorted({m.replace("_alternate", "") for m in MARKETS.split(",")})
+            # Entries not refreshed for a default player-odds TTL belong to finished games
+            prune_market_hashes(redis_client, SPORT_KEY, base_markets, ttl_for("player_odds"))
+        except Exception as e:
+            print(f"❌ Redis hash layout error: {e}")
 
 def process_event_odds(event_props, player_lookup):
     """Process odds for a single event and return database records"""
@@ -499,13 +485,16 @@ def process_event_odds(event_props, player_lookup):
                 if not line or not over_under or price is None:
                     continue
                 
-                # Find existing record for this player/market/line/sportsbook combination
+                # Find existing record for this player/market/line/sportsbook combination.
+                # Standard and alternate quotes stay separate here and are merged
+                # by dedupe_by_conflict_key before the upsert.
                 existing_record = None
                 for record in records:
                     if (record["player_id"] == player_id and 
                         record["market"] == market_display_name and
                         record["line"] == float(line) and
-                        record["sportsbook"] == sportsbook):
+                        record["sportsbook"] == sportsbook and
+                        record["is_alternative"] == is_alternative):
                         existing_record = record
                         break
                 
@@ -559,12 +548,7 @@ def main():
     print(f"Loaded {len(player_lookup)} players")
     
     # Fetch upcoming events from odds API
-    events = fetch_mlb_events()
-    now = datetime.now(timezone.utc)
-    future_events = [
-        e for e in events
-        if now <= datetime.fromisoformat(e["commence_time"].replace("Z", "+00:00")) <= now + timedelta(hours=36)
-    ]
+    future_events = upcoming_events(redis_client, SPORT_KEY, fetch_mlb_events, hours=36)
     
     print(f"TARGET: Processing {len(future_events)} upcoming events")
     
@@ -590,9 +574,8 @@ def main():
     
     # Store all records in database
     if all_records:
-        with DatabaseBatch(supabase) as batch:
-            for record in all_records:
-                batch.add_record(record)
+        # Current odds, change-only history and archive (see odds_store.py)
+        all_records = store_odds_records(supabase, redis_client, SPORT_KEY, all_records)
         print(f"SUCCESS: Successfully stored {len(all_records)} odds records in database")
         
         # NEW: Store current odds in Redis
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: sequential vs. concurrent upsert batches (ConcurrentUpsertWriter).
+
+By default the database is a stand-in that sleeps for one round-trip plus a
+per-row server cost per batch, which is what the PostgREST write phase of the
+loaders looks like from the client. With --pg the batches go to a local
+Postgres instead (BENCH_DATABASE_URL, see benchmark_pg_copy.py), one
+connection per writer thread.
+
+Usage: python scripts/benchmark_concurrent_upsert.py [--pg] [rows] [rtt_ms]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+import upsert_utils
+from upsert_utils import ConcurrentUpsertWriter
+
+BATCH_SIZE = 1000
+IN_FLIGHT_LEVELS = (1, 2, 4, 8)
+PER_ROW_SERVER_MS = 0.02
+
+
+def make_standin_send(rtt_ms):
+    """Simulated PostgREST upsert: one RTT plus server time per row"""
+    def send(records):
+        time.sleep(rtt_ms / 1000 + len(records) * PER_ROW_SERVER_MS / 1000)
+        return records
+    return send
+
+
+def make_postgres_send():
+    """Real upserts against a local Postgres, one connection per thread"""
+    import json
+    import psycopg
+    from benchmark_pg_copy import BENCH_DATABASE_URL, SCHEMA, TABLE, CONFLICT
+
+    with psycopg.connect(BENCH_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(SCHEMA)
+
+    local = threading.local()
+
+    def send(records):
+        if not hasattr(local, "conn"):
+            local.conn = psycopg.connect(BENCH_DATABASE_URL, autocommit=True)
+        columns = list(records[0].keys())
+        cols = ", ".join(columns)
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns if c not in CONFLICT.split(","))
+        local.conn.execute(
+            f"INSERT INTO {TABLE} ({cols}) SELECT {cols} FROM json_populate_recordset(NULL::{TABLE}, %s::json) "
+            f"ON CONFLICT ({CONFLICT}) DO UPDATE SET {updates}",
+            (json.dumps(records),)
+        )
+        return records
+    return send
+
+
+def make_records(count):
+    """Rows with unique conflict keys (shared generator when running --pg)"""
+    try:
+        from benchmark_pg_copy import make_records as make_pg_records
+        return make_pg_records(count)
+    except ImportError:
+        return [{"player_id": i, "market": "Hits", "line": 0.5, "sportsbook": "DraftKings"} for i in range(count)]
+
+
+class StandInError(Exception):
+    """Error shaped like postgrest's APIError (SQLSTATE in .code)"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def check_failure_handling():
+    """Bad rows are isolated and dead-lettered; transient errors are retried, never dead-lettered"""
+    upsert_utils.RETRY_BACKOFF = 0.001
+    upsert_utils.DEAD_LETTER_DIR = tempfile.mkdtemp()
+    records = make_records(64)
+    bad = records[37]
+    calls = {"timeouts": 2, "outages": 0}
+    lock = threading.Lock()
+
+    def send(batch):
+        with lock:
+            if calls["timeouts"]:
+                calls["timeouts"] -= 1
+                raise StandInError("canceling statement due to statement timeout", "57014")
+            if calls["outages"]:
+                raise StandInError("503 Service Unavailable")
+        if any(r is bad for r in batch):
+            raise StandInError('null value in column "line" violates not-null constraint', "23502")
+        return batch
+
+    with ConcurrentUpsertWriter(send, "check", batch_size=16, max_in_flight=2) as writer:
+        for record in records:
+            writer.add(record)
+    assert len(writer.results) == 63, len(writer.results)
+    assert [r for r, _ in writer.rejected] == [bad], writer.rejected
+    dead_letters = os.path.join(upsert_utils.DEAD_LETTER_DIR, "dead_letter_check.jsonl")
+    with open(dead_letters) as f:
+        assert len(f.readlines()) == 1
+
+    # An outage that outlasts the retries: nothing written, nothing dead-lettered
+    calls["outages"] = 1
+    with ConcurrentUpsertWriter(send, "outage", batch_size=16, max_in_flight=2) as writer:
+        for record in records[:32]:
+            writer.add(record)
+    assert len(writer.failures) == 32 and not writer.rejected, (len(writer.failures), writer.rejected)
+    assert writer.crashed_batches == [1, 2] and writer.committed_through == 0
+    assert not os.path.exists(os.path.join(upsert_utils.DEAD_LETTER_DIR, "dead_letter_outage.jsonl"))
+    print("✅ Bad rows bisected and dead-lettered; transient errors retried, not dead-lettered")
+
+
+def main():
+    args = sys.argv[1:]
+    use_pg = "--pg" in args
+    args = [a for a in args if a != "--pg"]
+    rows = int(args[0]) if args else 20000
+    rtt_ms = float(args[1]) if len(args) > 1 else 80.0
+
+    check_failure_handling()
+    
+    records = make_records(rows)
+    send = make_postgres_send() if use_pg else make_standin_send(rtt_ms)
+    target = "local Postgres" if use_pg else f"stand-in ({rtt_ms:.0f}ms RTT, {PER_ROW_SERVER_MS}ms/row)"
+    print(f"🏁 Upserting {rows:,} rows in batches of {BATCH_SIZE} against {target}")
+
+    baseline = None
+    for in_flight in IN_FLIGHT_LEVELS:
+        start = time.perf_counter()
+        with ConcurrentUpsertWriter(send, "bench", batch_size=BATCH_SIZE, max_in_flight=in_flight) as writer:
+            for record in records:
+                writer.add(record)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"📊 in_flight={in_flight}: {elapsed:6.2f}s  {rows / elapsed:>10,.0f} rows/s  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
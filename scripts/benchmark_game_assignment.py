@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark + correctness check: vendor event -> game mapping on a busy day.
+
+  - fuzzy    : SequenceMatcher over every event x StatsAPI game, then every
+               DB game (fixed_game_mapping before the team-identity join)
+  - greedy   : (home_id, away_id, slate date) hash join, nearest start per
+               event on its own
+  - assigned : game_assignment.map_events(), min-cost matching per date
+
+busy_day() builds one slate in the StatsAPI, odds API and mlb_games shapes:
+15 games plus three doubleheaders (a straight one the vendor lists game 2
+early for, a split one, and one with only game 2 listed), vendor spellings
+that differ from StatsAPI, and one event per unassigned reason. The check
+asserts every listed game maps to the right gamePk/game_id, no game is
+used twice and each leftover event has the expected reason; the benchmark
+times all three over a run of such days.
+
+Usage: python scripts/benchmark_game_assignment.py [days] [repeats]
+"""
+
+import sys
+import time
+import statistics
+from datetime import datetime, timedelta, timezone
+from difflib import SequenceMatcher
+
+from team_identity import TeamIdentity
+from game_assignment import (GAME_TAKEN, NO_GAME_FOR_TEAMS, NO_GAME_ON_DATE, START_TIME_GAP, UNKNOWN_TEAM,
+                             listing_flipped, map_events, parse_time, statsapi_slots, vendor_slots)
+
+# (StatsAPI team id, StatsAPI / mlb_games name, odds API name)
+TEAMS = [
+    (147, "New York Yankees", "New York Yankees"), (111, "Boston Red Sox", "Boston Red Sox"),
+    (121, "New York Mets", "New York Mets"), (143, "Philadelphia Phillies", "Philadelphia Phillies"),
+    (112, "Chicago Cubs", "Chicago Cubs"), (138, "St. Louis Cardinals", "St.Louis Cardinals"),
+    (133, "Athletics", "Oakland Athletics"), (136, "Seattle Mariners", "Seattle Mariners"),
+    (119, "Los Angeles Dodgers", "Los Angeles Dodgers"), (137, "San Francisco Giants", "San Francisco Giants"),
+    (145, "Chicago White Sox", "Chicago White Sox"), (116, "Detroit Tigers", "Detroit Tigers"),
+    (110, "Baltimore Orioles", "Baltimore Orioles"), (139, "Tampa Bay Rays", "Tampa Bay Rays"),
+    (141, "Toronto Blue Jays", "Toronto Blue Jays"), (114, "Cleveland Guardians", "Cleveland Guardians"),
+    (117, "Houston Astros", "Houston Astros"), (140, "Texas Rangers", "Texas Rangers"),
+    (108, "Los Angeles Angels", "Los Angeles Angels"), (142, "Minnesota Twins", "Minnesota Twins"),
+    (118, "Kansas City Royals", "Kansas City Royals"), (158, "Milwaukee Brewers", "Milwaukee Brewers"),
+    (113, "Cincinnati Reds", "Cincinnati Reds"), (134, "Pittsburgh Pirates", "Pittsburgh Pirates"),
+    (144, "Atlanta Braves", "Atlanta Braves"), (146, "Miami Marlins", "Miami Marlins"),
+    (120, "Washington Nationals", "Washington Nationals"), (115, "Colorado Rockies", "Colorado Rockies"),
+    (109, "Arizona Diamondbacks", "Arizona Diamondbacks"), (135, "San Diego Padres", "San Diego Padres"),
+]
+MLB_TEAMS = [{"team_id": tid, "name": name} for tid, name, _ in TEAMS]
+
+
+def _iso(dt):
+    return dt.isoformat().replace("+00:00", "Z")
+
+
+def busy_day(day: datetime, day_index: int = 0):
+    """(vendor events, StatsAPI games, mlb_games rows, {event_id: gamePk}, {event_id: reason})"""
+    mlb_games, db_games, events, truth, reasons = [], [], [], {}, {}
+    base_pk = 700000 + day_index * 100
+
+    def game(i, home, away, start, dh="N"):
+        pk = base_pk + len(mlb_games)
+        mlb_games.append({"gamePk": pk, "gameDate": _iso(start), "doubleHeader": dh,
+                          "teams": {"home": {"team": {"id": home[0], "name": home[1]}},
+                                    "away": {"team": {"id": away[0], "name": away[1]}}}})
+        db_games.append({"game_id": pk * 10, "game_datetime": start.isoformat(),
+                         "home_name": home[1], "away_name": away[1]})
+        return pk
+
+    def event(tag, home_name, away_name, start, pk=None, reason=None):
+        event_id = f"d{day_index}-{tag}"
+        events.append({"id": event_id, "home_team": home_name, "away_team": away_name, "commence_time": _iso(start)})
+        if pk is not None:
+            truth[event_id] = pk
+        if reason is not None:
+            reasons[event_id] = reason
+
+    at = lambda hour, minute=5: day.replace(hour=hour, minute=minute)  # UTC
+    for i in range(15):
+        home, away = TEAMS[2 * i], TEAMS[2 * i + 1]
+        if i == 0:
+            # Straight doubleheader; the vendor lists game 2 at a placeholder time
+            pk1 = game(i, home, away, at(17), "Y")
+            pk2 = game(i, home, away, at(20, 40), "Y")
+            event("dh1-g2", home[2], away[2], at(18, 0), pk2)
+            event("dh1-g1", home[2], away[2], at(17), pk1)
+        elif i == 1:
+            # Split doubleheader, both listed accurately
+            pk1 = game(i, home, away, at(17, 10), "S")
+            pk2 = game(i, home, away, at(23, 10), "S")
+            event("dh2-g1", home[2], away[2], at(17, 10), pk1)
+            event("dh2-g2", home[2], away[2], at(23, 10), pk2)
+        elif i == 2:
+            # Doubleheader with only game 2 listed by the vendor
+            game(i, home, away, at(17), "Y")
+            pk2 = game(i, home, away, at(20, 35), "Y")
+            event("dh3-g2", home[2], away[2], at(20, 35), pk2)
+        elif i == 4:
+            # Neutral-site series: the vendor lists the StatsAPI home team as away
+            pk = game(i, home, away, at(18, 10))
+            event("flipped", away[2], home[2], at(18, 10), pk)
+        else:
+            start = at(17 + i % 7, 5 + (i * 5) % 40)
+            pk = game(i, home, away, start)
+            event(f"g{i}", home[2], away[2], start + timedelta(minutes=i % 3), pk)
+
+    event("unknown", "Springfield Isotopes", TEAMS[1][2], at(19), reason=UNKNOWN_TEAM)
+    event("tomorrow", TEAMS[6][2], TEAMS[7][2], at(19) + timedelta(days=1), reason=NO_GAME_ON_DATE)
+    event("no-matchup", TEAMS[0][2], TEAMS[5][2], at(19), reason=NO_GAME_FOR_TEAMS)
+    event("makeup", TEAMS[6][2], TEAMS[7][2], parse_time(mlb_games[5]["gameDate"]) + timedelta(hours=8),
+          reason=START_TIME_GAP)
+    event("relisted", TEAMS[2][2], TEAMS[3][2], at(17, 30), reason=GAME_TAKEN)  # A third dh2 listing
+    return events, mlb_games, db_games, truth, reasons
+
+
+# ── Previous implementations ────────────────────────────
+
+def _normalize(name):
+    return name.lower().replace("é", "e").replace("socks", "sox").replace(" ", "")
+
+
+def _similar(a, b):
+    return SequenceMatcher(None, _normalize(a), _normalize(b)).ratio()
+
+
+def map_fuzzy(events, mlb_games, db_games):
+    """fixed_game_mapping.find_best_mlb_match() before the hash join, per event"""
+    mapped = {}
+    for vendor_event in events:
+        event_time = datetime.fromisoformat(vendor_event["commence_time"].replace("Z", "+00:00"))
+        candidates = []
+        for g in mlb_games:
+            g_time = datetime.fromisoformat(g["gameDate"].replace("Z", "+00:00"))
+            name_score = (_similar(vendor_event["home_team"], g["teams"]["home"]["team"]["name"])
+                          + _similar(vendor_event["away_team"], g["teams"]["away"]["team"]["name"])) / 2
+            time_diff = abs((event_time - g_time).total_seconds()) / 60
+            if name_score > 0.7 and time_diff < 90:
+                candidates.append((name_score, -time_diff, g["gamePk"], g))
+        if not candidates:
+            continue
+        candidates.sort(reverse=True)
+        mlb_game = candidates[0][3]
+        mlb_time = datetime.fromisoformat(mlb_game["gameDate"].replace("Z", "+00:00"))
+        for db_game in db_games:
+            db_time = datetime.fromisoformat(db_game["game_datetime"].replace("Z", "+00:00"))
+            if (_similar(mlb_game["teams"]["home"]["team"]["name"], db_game["home_name"]) > 0.7
+                    and _similar(mlb_game["teams"]["away"]["team"]["name"], db_game["away_name"]) > 0.7
+                    and abs((mlb_time - db_time).total_seconds()) < 3 * 3600):
+                mapped[vendor_event["id"]] = mlb_game["gamePk"]
+                break
+    return mapped
+
+
+def map_greedy(events, mlb_games, db_games, identity):
+    """Hash join with the nearest start picked per event on its own (no DB stage: same join)"""
+    identity.learn_statsapi(mlb_games)
+    index = {}
+    for g in statsapi_slots(mlb_games, identity):
+        index.setdefault((g["home_id"], g["away_id"], g["date"]), []).append(g)
+    mapped = {}
+    for e in vendor_slots(events, identity):
+        candidates = index.get((e["home_id"], e["away_id"], e["date"]))
+        if candidates:
+            best = min(candidates, key=lambda g: abs((g["start"] - e["start"]).total_seconds()))
+            mapped[e["id"]] = best["id"]
+    return mapped
+
+
+def map_assigned(events, mlb_games, db_games, identity):
+    mapped, _ = map_events(events, mlb_games, db_games, identity)
+    return {event_id: game["gamePk"] for event_id, (_, game, _) in mapped.items()}
+
+
+# ── Correctness ─────────────────────────────────────────
+
+def check(label, condition):
+    print(f"  {'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def duplicates(mapped):
+    seen = {}
+    for event_id, pk in mapped.items():
+        seen.setdefault(pk, []).append(event_id)
+    return {pk: ids for pk, ids in seen.items() if len(ids) > 1}
+
+
+def check_day():
+    day = datetime(2025, 7, 4, tzinfo=timezone.utc)
+    events, mlb_games, db_games, truth, reasons = busy_day(day)
+    print(f"🧪 Busy day: {len(events)} vendor events, {len(mlb_games)} games, 3 doubleheaders")
+
+    mapped, unassigned = map_events(events, mlb_games, db_games, TeamIdentity(MLB_TEAMS))
+    check("every listed game maps to its gamePk", {e: g["gamePk"] for e, (_, g, _) in mapped.items()} == truth)
+    check("and to its mlb_games row", all(row["game_id"] == truth[e] * 10 for e, (_, _, row) in mapped.items()))
+    check("no game is assigned twice", not duplicates({e: g["gamePk"] for e, (_, g, _) in mapped.items()}))
+    check("straight doubleheader: early game-2 listing still gets game 2",
+          mapped["d0-dh1-g2"][1]["gamePk"] != mapped["d0-dh1-g1"][1]["gamePk"])
+    check("vendor spellings resolve (St.Louis, Oakland Athletics)", {"d0-dh3-g2", "d0-g3"} <= set(mapped))
+    flipped = {e for e, (event, game, _) in mapped.items() if listing_flipped(event, game, TeamIdentity(MLB_TEAMS))}
+    check("a home/away-flipped listing matches and is reported as flipped", flipped == {"d0-flipped"})
+    for event_id, reason in sorted(reasons.items()):
+        check(f"{event_id}: {reason}", unassigned.get(event_id) == reason)
+    check("nothing else unassigned", set(unassigned) == set(reasons))
+
+    greedy_dupes = duplicates(map_greedy(events, mlb_games, db_games, TeamIdentity(MLB_TEAMS)))
+    check(f"  (greedy per-event join put two events on one game: {greedy_dupes})", bool(greedy_dupes))
+    fuzzy = map_fuzzy(events, mlb_games, db_games)
+    wrong = sorted(e for e, pk in fuzzy.items() if truth.get(e) != pk)
+    print(f"  ℹ️ fuzzy mapping: {len(fuzzy)} mapped, {len(wrong)} wrong or spurious {wrong}")
+
+
+# ── Benchmark ───────────────────────────────────────────
+
+def timed(fn, slates, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for slate in slates:
+            fn(*slate)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    n_days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    check_day()
+
+    start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+    days = [busy_day(start + timedelta(days=d), d)[:3] for d in range(n_days)]
+    n_events = sum(len(d[0]) for d in days)
+    print(f"\n🏁 {n_days} busy days, {n_events} vendor events, median of {repeats}")
+    fuzzy_time = timed(map_fuzzy, days, repeats)
+    greedy_time = timed(lambda *d: map_greedy(*d, TeamIdentity(MLB_TEAMS)), days, repeats)
+    assigned_time = timed(lambda *d: map_assigned(*d, TeamIdentity(MLB_TEAMS)), days, repeats)
+    for label, elapsed in (("fuzzy   ", fuzzy_time), ("greedy  ", greedy_time), ("assigned", assigned_time)):
+        print(f"  {label}: {elapsed * 1000:8.1f} ms  {n_events / elapsed:10,.0f} events/s"
+              f"  ({fuzzy_time / elapsed:.1f}x vs fuzzy)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark + correctness check: cache_game_lines market build, old vs. single pass.
+
+  - old     : process_market_odds() per bookmaker x market, merged with
+              .update() on sportsbooks (tags the payload with market["bookmaker"])
+  - builder : game_lines_builder.build_event_markets()
+
+The check runs both on SAMPLE_EVENT (one MLB game in the /events/{id}/odds
+response shape, two books, hand-built to have the overlapping
+standard/alternate listings books return, with the alternate quoting the
+same point at a different price) and asserts the builder leaves the payload
+untouched, keeps both teams on moneylines and shared alternate spreads,
+keeps the standard price over the alternate one, and agrees with the old
+build wherever the old one didn't drop or overwrite data.
+
+--payload FILE additionally checks a captured /events/{id}/odds response
+(one event object, or a list of them): the payload is left untouched and
+every standard-market quote is the price the build keeps. The benchmark
+then times both over a synthetic slate of alt-line-heavy events.
+
+Usage: python scripts/benchmark_game_lines_builder.py [--payload FILE] [events] [repeats]
+"""
+
+import sys
+import copy
+import json
+import time
+import statistics
+
+from game_lines_builder import base_market_key, build_event_markets
+
+# Subset of cache_game_lines.GAME_MARKETS / SPORTSBOOK_NAME_MAP (that module needs API env vars)
+GAME_MARKETS = {
+    "h2h": {"label": "Moneyline", "description": "Pick the winner of the game",
+            "market_type": "2_way", "has_alternates": False},
+    "spreads": {"label": "Run Line", "description": "Bet with a run spread (typically ±1.5)",
+                "market_type": "spread", "has_alternates": True, "alternate_key": "alternate_spreads"},
+    "totals": {"label": "Total Runs", "description": "Combined runs scored by both teams",
+               "market_type": "total", "has_alternates": True, "alternate_key": "alternate_totals"},
+}
+SPORTSBOOK_NAME_MAP = {"draftkings": "draftkings", "fanduel": "fanduel", "williamhill_us": "caesars"}
+
+HOME, AWAY = "New York Yankees", "Boston Red Sox"
+
+
+def _o(name, price, point=None, sid=None):
+    outcome = {"name": name, "price": price, "link": f"https://book.example/{sid}" if sid else None, "id": sid}
+    if point is not None:
+        outcome["point"] = point
+    return outcome
+
+
+SAMPLE_EVENT = {
+    "id": "8f1c2a7e5d0b4c3a9e6f1d2c3b4a5e6f",
+    "sport_key": "baseball_mlb",
+    "commence_time": "2025-07-04T23:05:00Z",
+    "home_team": HOME,
+    "away_team": AWAY,
+    "bookmakers": [
+        {"key": "draftkings", "title": "DraftKings", "markets": [
+            {"key": "h2h", "outcomes": [_o(AWAY, 120, sid="dk-ml-a"), _o(HOME, -142, sid="dk-ml-h")]},
+            {"key": "spreads", "outcomes": [_o(AWAY, -160, 1.5, "dk-rl-a"), _o(HOME, 135, -1.5, "dk-rl-h")]},
+            {"key": "totals", "outcomes": [_o("Over", -110, 8.5, "dk-t-o"), _o("Under", -110, 8.5, "dk-t-u")]},
+            {"key": "alternate_spreads", "outcomes": [
+                _o(AWAY, 210, -1.5, "dk-ars-a-15"), _o(HOME, 140, -1.5, "dk-ars-h-15"),
+                _o(AWAY, -340, 2.5, "dk-ars-a25"), _o(HOME, 250, -2.5, "dk-ars-h-25")]},
+            {"key": "alternate_totals", "outcomes": [
+                _o("Over", -135, 7.5, "dk-at-o75"), _o("Under", 105, 7.5, "dk-at-u75"),
+                _o("Over", -115, 8.5, "dk-at-o85"),
+                _o("Over", 115, 9.5, "dk-at-o95"), _o("Under", -145, 9.5, "dk-at-u95")]},
+        ]},
+        {"key": "williamhill_us", "title": "williamhill_us", "markets": [
+            {"key": "alternate_totals", "outcomes": [_o("Over", -105, 8.5, "cz-at-o85")]},
+            {"key": "totals", "outcomes": [_o("Over", -108, 8.5, "cz-t-o"), _o("Under", -112, 8.5, "cz-t-u")]},
+            {"key": "h2h", "outcomes": [_o(HOME, -145, sid="cz-ml-h"), _o(AWAY, 122, sid="cz-ml-a")]},
+        ]},
+    ],
+}
+
+
+# ── Previous implementation (cache_game_lines before the single-pass builder) ──
+
+def process_market_odds(market_data, market_info):
+    market_type = market_info["market_type"]
+    odds_data = {"market_key": market_data["key"], "market_label": market_info["label"], "market_type": market_type,
+                 "description": market_info["description"],
+                 "has_alternates": market_info.get("has_alternates", False), "lines": {}}
+    is_alternate = market_data["key"].startswith("alternate_")
+    for outcome in market_data.get("outcomes", []):
+        raw_sportsbook = market_data["bookmaker"].lower()
+        sportsbook = SPORTSBOOK_NAME_MAP.get(raw_sportsbook, raw_sportsbook)
+        point = outcome.get("point")
+        if point is None and market_type in ["spread", "total"]:
+            point = outcome.get("handicap")
+        line_key = str(point) if point is not None else "0"
+        if line_key not in odds_data["lines"]:
+            odds_data["lines"][line_key] = {"point": point, "sportsbooks": {}}
+        if sportsbook not in odds_data["lines"][line_key]["sportsbooks"]:
+            odds_data["lines"][line_key]["sportsbooks"][sportsbook] = {"is_standard": not is_alternate}
+        if market_type == "total":
+            side = outcome.get("name", "").lower()
+            if side in ["over", "under"]:
+                odds_data["lines"][line_key]["sportsbooks"][sportsbook][side] = {
+                    "price": outcome.get("price"), "link": outcome.get("link"), "sid": outcome.get("id")}
+        else:
+            odds_data["lines"][line_key]["sportsbooks"][sportsbook] = {
+                "price": outcome.get("price"), "link": outcome.get("link"), "sid": outcome.get("id"),
+                "is_standard": not is_alternate}
+    return odds_data
+
+
+def build_old(event_odds):
+    processed_markets = {}
+    for bookmaker in event_odds.get("bookmakers", []):
+        sportsbook = bookmaker.get("title", "").lower()
+        for market in bookmaker.get("markets", []):
+            base_key = base_market_key(market.get("key"))
+            if base_key not in GAME_MARKETS:
+                continue
+            market["bookmaker"] = sportsbook
+            market_odds = process_market_odds(market, GAME_MARKETS[base_key])
+            if base_key not in processed_markets:
+                processed_markets[base_key] = market_odds
+                continue
+            for line_key, line_data in market_odds["lines"].items():
+                if line_key not in processed_markets[base_key]["lines"]:
+                    processed_markets[base_key]["lines"][line_key] = line_data
+                else:
+                    processed_markets[base_key]["lines"][line_key]["sportsbooks"].update(line_data["sportsbooks"])
+    return processed_markets
+
+
+def build_new(event_odds):
+    return build_event_markets(event_odds, GAME_MARKETS, SPORTSBOOK_NAME_MAP)
+
+
+# ── Correctness ─────────────────────────────────────────
+
+def check(label, condition):
+    print(f"  {'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def check_sample():
+    payload = copy.deepcopy(SAMPLE_EVENT)
+    new = build_new(payload)
+    check("payload is not mutated", payload == SAMPLE_EVENT)
+    old = build_old(copy.deepcopy(SAMPLE_EVENT))
+
+    ml = new["h2h"]["lines"]["0"]["sportsbooks"]
+    check("moneyline keeps both teams per book",
+          all(ml[b]["home_team"]["team"] == HOME and ml[b]["away_team"]["team"] == AWAY for b in ("draftkings", "caesars"))
+          and ml["caesars"]["away_team"]["price"] == 122)
+    check("  (old build kept one team per book)", "home_team" not in old["h2h"]["lines"]["0"]["sportsbooks"]["draftkings"])
+
+    shared = new["spreads"]["lines"]["-1.5"]["sportsbooks"]["draftkings"]
+    check("shared alt spread point keeps both teams",
+          shared["home_team"]["price"] == 135 and shared["away_team"]["price"] == 210)
+    check("spread line entry names its team and stays standard",
+          shared["team"] == HOME and shared["price"] == 135 and shared["is_standard"] is True
+          and new["spreads"]["lines"]["1.5"]["sportsbooks"]["draftkings"]["team"] == AWAY)
+
+    dk_total = new["totals"]["lines"]["8.5"]["sportsbooks"]["draftkings"]
+    check("standard price beats a later alternate at the same point (total, spread)",
+          dk_total["over"]["price"] == -110 and dk_total["over"]["sid"] == "dk-t-o"
+          and shared["home_team"]["sid"] == "dk-rl-h" and shared["sid"] == "dk-rl-h")
+    check("  (old build took the alternate price)",
+          old["totals"]["lines"]["8.5"]["sportsbooks"]["draftkings"]["over"]["price"] == -115)
+
+    cz = new["totals"]["lines"]["8.5"]["sportsbooks"]["caesars"]
+    check("standard after an alternate on one line merges as standard", cz["is_standard"] is True
+          and cz["over"]["price"] == -108 and cz["under"]["price"] == -112)
+    dk = new["totals"]["lines"]["8.5"]["sportsbooks"]["draftkings"]
+    check("alternate re-listing of the main total keeps the under", dk["under"]["price"] == -110
+          and "under" not in old["totals"]["lines"]["8.5"]["sportsbooks"]["draftkings"])
+
+    # Where an alternate overwrote a standard entry the old build lost the standard flag
+    agree = all(
+        new["totals"]["lines"][line]["sportsbooks"][book].get(side) == entry[side]
+        for line, line_data in old["totals"]["lines"].items()
+        for book, entry in line_data["sportsbooks"].items()
+        if entry["is_standard"] == new["totals"]["lines"][line]["sportsbooks"][book]["is_standard"]
+        for side in ("over", "under") if side in entry
+    )
+    check("every total the old build kept is identical", agree)
+    check("same markets and line keys", {m: set(d["lines"]) for m, d in new.items()}
+          == {m: set(d["lines"]) for m, d in old.items()})
+
+
+def standard_quotes(event_odds):
+    """(market, line key, book, side slot, price) for every standard-market outcome in a payload"""
+    for bookmaker in event_odds.get("bookmakers", []):
+        raw_sportsbook = bookmaker.get("title", "").lower()
+        book = SPORTSBOOK_NAME_MAP.get(raw_sportsbook, raw_sportsbook)
+        for market in bookmaker.get("markets", []):
+            market_info = GAME_MARKETS.get(market.get("key"))
+            if market_info is None:
+                continue
+            for outcome in market.get("outcomes", []):
+                point = outcome.get("point")
+                line_key = str(point) if point is not None else "0"
+                if market_info["market_type"] == "total":
+                    slot = outcome.get("name", "").lower()
+                else:
+                    slot = "home_team" if outcome.get("name") == event_odds.get("home_team") else "away_team"
+                yield market["key"], line_key, book, slot, outcome.get("price")
+
+
+def check_payload(path):
+    with open(path) as f:
+        captured = json.load(f)
+    events = captured if isinstance(captured, list) else [captured]
+    for event in events:
+        payload = copy.deepcopy(event)
+        built = build_new(payload)
+        kept = [built[m]["lines"][line]["sportsbooks"][book].get(slot, {}).get("price") == price
+                for m, line, book, slot, price in standard_quotes(event)]
+        print(f"  event {event.get('id')}: {len(event.get('bookmakers', []))} books, {len(kept)} standard quotes")
+        check("payload is not mutated", payload == event)
+        check("every standard quote keeps its price", all(kept))
+    return events
+
+
+# ── Benchmark ───────────────────────────────────────────
+
+def synthetic_event(i, books=11, alt_lines=20):
+    bookmakers = []
+    for b in range(books):
+        markets = [
+            {"key": "h2h", "outcomes": [_o(AWAY, 110 + b, sid="a"), _o(HOME, -130 - b, sid="h")]},
+            {"key": "spreads", "outcomes": [_o(AWAY, -150, 1.5, "a"), _o(HOME, 130, -1.5, "h")]},
+            {"key": "totals", "outcomes": [_o("Over", -110, 8.5, "o"), _o("Under", -110, 8.5, "u")]},
+            {"key": "alternate_spreads", "outcomes": [
+                o for k in range(alt_lines) for o in (_o(AWAY, 100 + k, -4.5 + 0.5 * k, "a"),
+                                                     _o(HOME, 100 - k, 4.5 - 0.5 * k, "h"))]},
+            {"key": "alternate_totals", "outcomes": [
+                o for k in range(alt_lines) for o in (_o("Over", -200 + 10 * k, 3.5 + 0.5 * k, "o"),
+                                                     _o("Under", 170 - 10 * k, 3.5 + 0.5 * k, "u"))]},
+        ]
+        bookmakers.append({"key": f"book{b}", "title": f"Book{b}", "markets": markets})
+    return {"id": f"evt{i}", "home_team": HOME, "away_team": AWAY, "bookmakers": bookmakers}
+
+
+def timed(fn, events, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for event in events:
+            fn(event)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    args = sys.argv[1:]
+    payload_path = None
+    if "--payload" in args:
+        i = args.index("--payload")
+        payload_path = args[i + 1]
+        del args[i:i + 2]
+    n_events = int(args[0]) if args else 15
+    repeats = int(args[1]) if len(args) > 1 else 7
+
+    print("🧪 Sample payload")
+    check_sample()
+    if payload_path:
+        print(f"\n🧪 Captured payload {payload_path}")
+        check_payload(payload_path)
+
+    events = [synthetic_event(i) for i in range(n_events)]
+    outcomes = sum(len(m["outcomes"]) for e in events for b in e["bookmakers"] for m in b["markets"])
+    print(f"\n🏁 {n_events} events, {outcomes:,} outcomes, median of {repeats}")
+    old_time = timed(build_old, events, repeats)
+    new_time = timed(build_new, events, repeats)
+    print(f"  old     : {old_time * 1000:7.1f} ms")
+    print(f"  builder : {new_time * 1000:7.1f} ms  ({old_time / new_time:.1f}x)")
+    print(f"  payload bytes per event: {len(json.dumps(build_new(events[0]))):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: cache_props in-memory build, list scans vs. dict indexes.
+
+Builds the player entries and the event player_props section for a synthetic
+alt-line-heavy event (10 books x 30 alt lines, over + under, per player and
+market) two ways:
+
+  - list scan : the previous cache_props loop, next(...) over entry["lines"],
+                the event players and the event player's lines per outcome
+  - indexed   : props_builder (dict by line / player_id, lists at the end)
+
+and checks both produce the same JSON. No Redis or API access needed.
+
+Usage: python scripts/benchmark_props_build.py [players] [markets] [repeats]
+"""
+
+import sys
+import json
+import time
+import statistics
+
+from props_builder import EventPropsBuilder, add_quote, side_of
+
+BOOKS = ["draftkings", "fanduel", "betmgm", "caesars", "espn bet",
+         "fanatics", "hard rock bet", "betrivers", "bet365", "pointsbet"]
+ALT_LINES = [0.5 + i for i in range(30)]
+MARKETS = ["batter_total_bases", "batter_hits", "pitcher_strikeouts", "batter_rbis", "pitcher_outs"]
+NOW = "2026-06-01T17:00:00+00:00"
+
+
+def make_players(players, markets):
+    """{player_key: player_info} in the shape cache_props' first pass produces"""
+    data = {}
+    for p in range(players):
+        for market in MARKETS[:markets]:
+            outcomes = [
+                {"book": book, "line": line, "over_under": side, "sid": f"{book}-{p}-{line}",
+                 "link": None, "price": -110 + b + int(line)}
+                for line in ALT_LINES for b, book in enumerate(BOOKS) for side in ("Over", "Under")
+            ]
+            data[f"odds:mlb:evt:{600000 + p}:{market}"] = {
+                "player_id": 600000 + p, "name": f"Player {p}", "market_key": market,
+                "team_abbr": "NYY", "outcomes": outcomes,
+            }
+    return data
+
+
+def build_list_scan(player_data_map):
+    entries, event_markets = {}, {}
+    for player_key, info in player_data_map.items():
+        player_id, market_key = info["player_id"], info["market_key"]
+        entry = {"player_id": player_id, "market": market_key, "lines": []}
+        for outcome in info["outcomes"]:
+            line, book, over_under = outcome["line"], outcome["book"], outcome["over_under"]
+            quote = {"price": outcome["price"], "link": outcome["link"], "sid": outcome["sid"], "last_update": NOW}
+
+            line_entry = next((l for l in entry["lines"] if l["line"] == line), None)
+            if not line_entry:
+                line_entry = {"line": line, "sportsbooks": {}}
+                entry["lines"].append(line_entry)
+            line_entry["sportsbooks"].setdefault(book, {})
+            if over_under and over_under.lower() in ["over", "under"]:
+                line_entry["sportsbooks"][book][over_under.lower()] = dict(quote)
+
+            if market_key not in event_markets:
+                event_markets[market_key] = {"players": []}
+            player_event_entry = next(
+                (p for p in event_markets[market_key]["players"] if p["player_id"] == player_id), None
+            )
+            if not player_event_entry:
+                player_event_entry = {"player_id": player_id, "name": info["name"], "team": info["team_abbr"],
+                                      "is_home": True, "lines": []}
+                event_markets[market_key]["players"].append(player_event_entry)
+            line_event_entry = next((l for l in player_event_entry["lines"] if l["line"] == line), None)
+            if not line_event_entry:
+                line_event_entry = {"line": line, "sportsbooks": {}}
+                player_event_entry["lines"].append(line_event_entry)
+            line_event_entry["sportsbooks"].setdefault(book, {})
+            if over_under and over_under.lower() in ["over", "under"]:
+                line_event_entry["sportsbooks"][book][over_under.lower()] = dict(quote)
+        entries[player_key] = entry
+    return entries, event_markets
+
+
+def build_indexed(player_data_map):
+    entries, event_markets = {}, EventPropsBuilder()
+    for player_key, info in player_data_map.items():
+        player_id, market_key = info["player_id"], info["market_key"]
+        entry = {"player_id": player_id, "market": market_key, "lines": []}
+        lines_by_line = {}
+        event_player = {"player_id": player_id, "name": info["name"], "team": info["team_abbr"], "is_home": True}
+        for outcome in info["outcomes"]:
+            line, book, side = outcome["line"], outcome["book"], side_of(outcome["over_under"])
+            quote = {"price": outcome["price"], "link": outcome["link"], "sid": outcome["sid"], "last_update": NOW}
+            add_quote(lines_by_line, line, book, side, quote)
+            event_markets.add(market_key, event_player, line, book, side, quote)
+        entry["lines"] = list(lines_by_line.values())
+        entries[player_key] = entry
+    return entries, event_markets.to_markets()
+
+
+def timed(fn, player_data_map, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(player_data_map)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), result
+
+
+def main():
+    players = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    markets = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    player_data_map = make_players(players, markets)
+    outcomes = sum(len(p["outcomes"]) for p in player_data_map.values())
+    print(f"🏁 {players} players x {markets} markets x {len(BOOKS)} books x {len(ALT_LINES)} lines "
+          f"= {outcomes:,} outcomes, median of {repeats}")
+
+    scan_time, scan_result = timed(build_list_scan, player_data_map, repeats)
+    indexed_time, indexed_result = timed(build_indexed, player_data_map, repeats)
+
+    same = json.dumps(scan_result, sort_keys=True) == json.dumps(indexed_result, sort_keys=True)
+    print(f"  list scan : {scan_time * 1000:8.1f} ms")
+    print(f"  indexed   : {indexed_time * 1000:8.1f} ms  ({scan_time / indexed_time:.1f}x)")
+    print(f"  {'✅' if same else '❌'} identical player entries and event cache")
+    if not same:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: reader latency of string-per-prop keys vs. the hash layout.
+
+Writes a synthetic slate to a local Redis (BENCH_REDIS_URL, default db 15,
+which is flushed) in both layouts and times the read patterns the app uses:
+
+  - market scan  (cron/mispriced-odds): KEYS odds:mlb:*:{market} + GET each
+                  vs. HGETALL odds_hash:mlb:market:{market}
+  - player lookup (ladder, no event_id): SCAN match + GET
+                  vs. HGET odds_hash:mlb:market:{market} {player}
+  - event read   : KEYS odds:mlb:{event}:* + MGET vs. HGETALL of the event hash
+
+Usage: python scripts/benchmark_redis_hash_layout.py [events] [repeats]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import statistics
+from datetime import datetime, timezone
+
+import redis
+
+from redis_hash_layout import HashLayoutWriter, read_event, read_market, read_player_market
+
+BENCH_REDIS_URL = os.environ.get("BENCH_REDIS_URL", "redis://localhost:6379/15")
+PLAYERS_PER_EVENT = 26
+MARKETS = ["batter_hits", "batter_home_runs", "batter_total_bases", "batter_rbis", "batter_runs_scored",
+           "batter_singles", "batter_walks", "pitcher_strikeouts", "pitcher_outs", "pitcher_walks"]
+BOOKS = ["draftkings", "fanduel", "betmgm", "caesars", "espn bet", "fanatics", "hard rock bet", "betrivers"]
+TTL = 3600
+
+
+def make_entry(event_id, player_id, market, now):
+    lines = [
+        {"line": line, "sportsbooks": {b: {"over": {"price": -110 - i, "link": None, "sid": None, "last_update": now},
+                                          "under": {"price": 100 + i, "link": None, "sid": None, "last_update": now}}
+                                      for i, b in enumerate(BOOKS)}}
+        for line in (0.5, 1.5, 2.5)
+    ]
+    return {"description": f"Player {player_id}", "market": market, "player_id": player_id, "lines": lines,
+            "event_id": event_id, "team": "TM", "is_home": True, "last_updated": now}
+
+
+def populate(client, events):
+    client.flushdb()
+    now = datetime.now(timezone.utc).isoformat()
+    writer = HashLayoutWriter(client, "mlb", TTL)
+    pipe = client.pipeline(transaction=False)
+    for e in range(events):
+        event_id = f"evt{e:04d}"
+        for p in range(PLAYERS_PER_EVENT):
+            player_id = 600000 + e * PLAYERS_PER_EVENT + p
+            for market in MARKETS:
+                entry = make_entry(event_id, player_id, market, now)
+                pipe.setex(f"odds:mlb:{event_id}:{player_id}:{market}", TTL, json.dumps(entry))
+                writer.put(event_id, player_id, market, entry)
+    pipe.execute()
+    writer.flush()
+
+
+def timed(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def scan_keys(client, match):
+    return list(client.scan_iter(match=match, count=1000))
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    client = redis.Redis.from_url(BENCH_REDIS_URL)
+    populate(client, events)
+    print(f"🏁 {events} events x {PLAYERS_PER_EVENT} players x {len(MARKETS)} markets "
+          f"({client.dbsize()} keys, {BENCH_REDIS_URL})")
+
+    market = "batter_hits"
+    event_id = f"evt{events // 2:04d}"
+    player_id = 600000 + random.randrange(events * PLAYERS_PER_EVENT)
+
+    cases = [
+        ("market scan", "KEYS + GET each",
+         lambda: [client.get(k) for k in client.keys(f"odds:mlb:*:{market}")],
+         "HGETALL market hash",
+         lambda: read_market(client, "mlb", market)),
+        ("player lookup", "SCAN + GET",
+         lambda: [client.get(k) for k in scan_keys(client, f"odds:mlb:*:{player_id}:{market}")[:1]],
+         "HGET market hash",
+         lambda: read_player_market(client, "mlb", player_id, market)),
+        ("event read", "KEYS + MGET",
+         lambda: client.mget(client.keys(f"odds:mlb:{event_id}:*")),
+         "HGETALL event hash",
+         lambda: read_event(client, "mlb", event_id)),
+    ]
+
+    print("\n📊 Reader p50 latency:")
+    for name, old_label, old_fn, new_label, new_fn in cases:
+        old_ms = timed(old_fn, repeats)
+        new_ms = timed(new_fn, repeats)
+        print(f"  {name:<14} {old_label:<18} {old_ms:9.2f} ms   {new_label:<20} {new_ms:8.2f} ms   "
+              f"({old_ms / max(new_ms, 1e-6):.1f}x)")
+
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 import os
 import json
 from datetime import timedelta
-import redis
+from redis_key_index import fetch_indexed
+from upstash_rest import create_redis_client
 
 # ── Config ────────────────────────────────────────────────────────────────────
 UPSTASH_URL    = os.environ["UPSTASH_REDIS_REST_URL"]
@@ -12,18 +13,19 @@ MAX_PER_MARKET = 1
 MAX_TOTAL      = 12
 
 # ── Init Redis ────────────────────────────────────────────────────────────────
-redis_client = redis.Redis(
-    host=UPSTASH_URL.replace("https://", "").split(":")[0],
-    port=6379,
-    password=UPSTASH_TOKEN,
-    ssl=True,
-    decode_responses=True,
-)
+redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN, decode_responses=True)
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 def scan_keys(pattern):
     return list(redis_client.scan_iter(match=pattern, count=1000))
 
+def load_odds_values(sport):
+    """(key, raw) pairs from the sport's index set, or a SCAN before the sets exist"""
+    values = fetch_indexed(redis_client, "odds", sport)
+    if values:
+        return list(values.items())
+    return [(key, redis_client.get(key)) for key in scan_keys(f"odds:{sport}:*")]
+
 def american_to_prob(odds: float) -> float:
     """Convert American odds to implied win probability."""
     return (100.0 / (odds + 100.0)) if odds > 0 else (-odds / (-odds + 100.0))
@@ -42,9 +44,8 @@ def am_to_dec(odds: float) -> float:
 def build_landing():
     all_recs = []
 
-    for pattern in ("odds:mlb:*", "odds:wnba:*"):
-        for key in scan_keys(pattern):
-            raw = redis_client.get(key)
+    for sport in ("mlb", "wnba"):
+        for key, raw in load_odds_values(sport):
             if not raw:
                 continue
 
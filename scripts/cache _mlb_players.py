@@ -6,6 +6,11 @@ import json
 from datetime import datetime, timezone, timedelta
 from supabase import create_client
 
+from odds_store import store_odds_records
+from redis_key_index import index_value_write
+from generation_publisher import ODDS_GENERATIONS, GenerationPublisher
+from ttl_policy import slate_ttl, ttl_for
+
 # ENV VARS
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_KEY"]
@@ -84,7 +89,6 @@ ALTERNATIVE_MARKETS = {
 }
 
 ODDS_FORMAT = "american"
-BATCH_SIZE = 500  # Database batch insert size
 
 HARDCODED_PLAYER_ID_OVERRIDES = {
     "bobby witt": 677951,
@@ -220,51 +224,6 @@ def fetch_props_for_event(event_id):
     response.raise_for_status()
     return response.json()
 
-class DatabaseBatch:
-    """Efficient database batch operations"""
-    
-    def __init__(self, supabase_client, batch_size=BATCH_SIZE):
-        self.supabase = supabase_client
-        self.batch_size = batch_size
-        self.records = []
-    
-    def add_record(self, record):
-        """Add a record to the batch"""
-        self.records.append(record)
-        
-        if len(self.records) >= self.batch_size:
-            self.flush()
-    
-    def flush(self):
-        """Insert all pending records"""
-        if not self.records:
-            return
-            
-        try:
-            # Use upsert to handle duplicates
-            result = (
-                self.supabase
-                .from_("player_odds_history")
-                .upsert(self.records, on_conflict="vendor_event_id,player_id,market,line,sportsbook,created_at")
-                .execute()
-            )
-            
-            print(f"✅ Inserted {len(self.records)} odds records")
-            self.records.clear()
-            
-        except Exception as e:
-            print(f"❌ Database insert error: {e}")
-            # Log the problematic records for debugging
-            print(f"Sample record: {self.records[0] if self.records else 'None'}")
-            self.records.clear()
-            raise
-    
-    def __enter__(self):
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.flush()
-
 def get_game_mapping_from_redis(event_id):
     """Get mlb_game_id for a vendor event_id from Redis cache"""
     if not redis_client:
@@ -421,6 +380,8 @@ def store_current_odds_in_redis(records):
     
     # Store each player+market group in Redis
     stored_count = 0
+    run_ttl = slate_ttl("player_odds", (d['commence_time'] for d in grouped_odds.values()))
+    publisher = GenerationPublisher(redis_client, REDIS_SPORT_KEY, run_ttl, "player_odds") if ODDS_GENERATIONS else None
     for group_key, odds_data in grouped_odds.items():
         # Convert market to lowercase to match hit_rate keys exactly
         redis_key = f"odds:{REDIS_SPORT_KEY}:{odds_data['player_id']}:{odds_data['market'].lower()}"
@@ -429,15 +390,27 @@ def store_current_odds_in_redis(records):
         odds_data['primary_line'] = determine_primary_line(odds_data['lines'], odds_data['has_alternates'])
         odds_data['last_updated'] = datetime.now(timezone.utc).isoformat()
         
-        # Store with 1.5 hour TTL (5400 seconds)
+        # Expire 30 minutes after first pitch (see ttl_policy.py)
         try:
-            redis_client.setex(redis_key, 10800 , json.dumps(odds_data))
+            pipe = redis_client.pipeline(transaction=False)
+            index_value_write(pipe, redis_key, json.dumps(odds_data), ttl_for("player_odds", odds_data['commence_time']),
+                              market=odds_data['market'].lower(), player=odds_data['player_id'])
+            pipe.execute()
             stored_count += 1
+            if publisher:
+                publisher.put(redis_key, odds_data)
             print(f"✅ Stored Redis odds: {redis_key} ({len(odds_data['lines'])} lines)")
         except Exception as e:
             print(f"❌ Redis storage error for {redis_key}: {e}")
     
     print(f"📊 Successfully stored {stored_count} player+market combinations in Redis")
+    
+    # Readers of the published generation switch to this run all at once
+    if publisher:
+        try:
+            publisher.publish()
+        except Exception as e:
+            print(f"❌ Redis generation publish error: {e}")
 
 def process_event_odds(event_props, player_lookup):
     """Process odds for a single event and return database records"""
@@ -594,9 +567,8 @@ def main():
     
     # Store all records in database
     if all_records:
-        with DatabaseBatch(supabase) as batch:
-            for record in all_records:
-                batch.add_record(record)
+        # Current odds, change-only history and archive (see odds_store.py)
+        all_records = store_odds_records(supabase, redis_client, SPORT_KEY, all_records)
         print(f"SUCCESS: Successfully stored {len(all_records)} odds records in database")
         
         # NEW: Store current odds in Redis
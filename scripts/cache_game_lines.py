@@ -2,10 +2,17 @@
 # -*- coding: utf-8 -*-
 
 import os
+import time
 import requests
 import json
 from datetime import datetime, timezone, timedelta
-import redis
+from redis_key_index import fetch_indexed, index_value_write
+from generation_publisher import ODDS_GENERATIONS, GenerationPublisher
+from game_lines_builder import build_event_markets
+from poll_scheduler import PollScheduler, record_quota
+from events_cache import upcoming_events
+from ttl_policy import slate_ttl, ttl_for
+from upstash_rest import create_redis_client
 
 # ENV VARS
 ODDS_API_KEY = os.environ["ODDS_API_KEY"]
@@ -33,17 +40,11 @@ SPORT_KEY = "baseball_mlb"
 REDIS_SPORT_KEY = "mlb"  # Use shorter key for Redis consistency
 SPORTSBOOKS = "draftkings,fanduel,betmgm,williamhill_us,espnbet,fanatics,hardrockbet,betrivers,novig,ballybet,pinnacle"
 ODDS_FORMAT = "american"
-REDIS_TTL = 21600  # 6 hours in seconds
 
 # Initialize Redis client if available
 redis_client = None
 if UPSTASH_URL and UPSTASH_TOKEN:
-    redis_client = redis.Redis(
-        host=UPSTASH_URL.replace("https://", "").split(":")[0],
-        port=6379,
-        password=UPSTASH_TOKEN,
-        ssl=True
-    )
+    redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN)
     print("Redis client initialized for game lines storage")
 
 # Game market configuration based on game-markets.ts
@@ -100,6 +101,16 @@ for market_key, market_info in GAME_MARKETS.items():
         MARKETS.append(market_info["alternate_key"])
 MARKETS = ",".join(MARKETS)
 
+# Featured markets come for the whole slate from one /sports/{sport}/odds call;
+# per-event /events/{id}/odds calls are only needed for the inning and alternate markets
+FEATURED_MARKETS = ["h2h", "spreads", "totals"]
+# PollScheduler "alt" kind: polled less often than the main lines and reused in between
+ALT_MARKETS = [m for m in MARKETS.split(",") if m.startswith("alternate_")]
+BULK_FEATURED = os.environ.get("GAME_LINES_BULK", "1") == "1"
+
+# Odds API usage this run; x-requests-last is the credit cost of each call
+api_usage = {"calls": 0, "credits": 0, "seconds": 0.0, "remaining": None}
+
 TARGET_MARKETS = [
     "Hits",
     "Strikeouts",
@@ -140,13 +151,6 @@ MARKET_TO_STAT_KEY = {
     "stolen bases": "stolen_bases"   # New mapping
 }
 
-def get_base_market_key(market_key):
-    """Get the base market key without alternate prefix"""
-    if market_key.startswith("alternate_"):
-        # Extract base market key (e.g., alternate_spreads -> spreads)
-        return market_key.replace("alternate_", "")
-    return market_key
-
 def determine_primary_line(lines_data, has_alternates):
     """Determine primary line from all available lines"""
     if not lines_data:
@@ -178,90 +182,71 @@ def determine_primary_line(lines_data, has_alternates):
     
     return None
 
-def process_market_odds(market_data, market_info):
-    """Process odds for a specific market type"""
-    market_type = market_info["market_type"]
-    odds_data = {
-        "market_key": market_data["key"],
-        "market_label": market_info["label"],
-        "market_type": market_type,
-        "description": market_info["description"],
-        "has_alternates": market_info.get("has_alternates", False),
-        "lines": {}
-    }
-    
-    # Determine if this is an alternate market
-    is_alternate = market_data["key"].startswith("alternate_")
-    
-    for outcome in market_data.get("outcomes", []):
-        # Map the raw sportsbook name to our standardized name
-        raw_sportsbook = market_data["bookmaker"].lower()
-        sportsbook = SPORTSBOOK_NAME_MAP.get(raw_sportsbook, raw_sportsbook)
-        
-        # Get the point value for totals/spreads
-        point = outcome.get("point")
-        if point is None and market_type in ["spread", "total"]:
-            # Try to get point from handicap
-            point = outcome.get("handicap")
-        
-        # Format the line key based on the point value
-        line_key = str(point) if point is not None else "0"
-        
-        # Initialize the line if it doesn't exist
-        if line_key not in odds_data["lines"]:
-            odds_data["lines"][line_key] = {
-                "point": point,
-                "sportsbooks": {}
-            }
-        
-        # Get or create the sportsbook entry for this line
-        if sportsbook not in odds_data["lines"][line_key]["sportsbooks"]:
-            odds_data["lines"][line_key]["sportsbooks"][sportsbook] = {
-                "is_standard": not is_alternate  # Mark as standard if not from alternate market
-            }
-        
-        # Add the outcome data
-        if market_type == "total":
-            # For totals, we need to organize by over/under
-            side = outcome.get("name", "").lower()
-            if side in ["over", "under"]:
-                odds_data["lines"][line_key]["sportsbooks"][sportsbook][side] = {
-                    "price": outcome.get("price"),
-                    "link": outcome.get("link"),
-                    "sid": outcome.get("id")
-                }
-        else:
-            # For other market types (like moneyline)
-            odds_data["lines"][line_key]["sportsbooks"][sportsbook] = {
-                "price": outcome.get("price"),
-                "link": outcome.get("link"),
-                "sid": outcome.get("id"),
-                "is_standard": not is_alternate  # Mark as standard if not from alternate market
-            }
-    
-    return odds_data
+def odds_api_get(url, params=None):
+    """GET from the odds API, recording call count, credit cost and time in api_usage"""
+    start = time.perf_counter()
+    response = requests.get(url, params=params)
+    api_usage["seconds"] += time.perf_counter() - start
+    response.raise_for_status()
+    api_usage["calls"] += 1
+    api_usage["credits"] += int(response.headers.get("x-requests-last") or 0)
+    api_usage["remaining"] = response.headers.get("x-requests-remaining", api_usage["remaining"])
+    record_quota(redis_client, response.headers)
+    return response.json()
 
 def fetch_mlb_events():
-    """Fetch upcoming MLB events from the odds API"""
+    """Fetch upcoming MLB events from the odds API (use through events_cache)"""
     url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/events?apiKey={ODDS_API_KEY}"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json()
+    return odds_api_get(url)
 
-def fetch_odds_for_event(event_id):
+def fetch_odds_for_event(event_id, markets=MARKETS):
     """Fetch odds for a specific event"""
     url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/events/{event_id}/odds"
     params = {
         "apiKey": ODDS_API_KEY,
-        "markets": MARKETS,
+        "markets": markets,
         "oddsFormat": ODDS_FORMAT,
         "bookmakers": SPORTSBOOKS,
         "includeLinks": "true",  # Add this to get link values
         "includeSids": "true"    # Add this to get selection IDs
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return odds_api_get(url, params)
+
+def fetch_featured_odds(commence_from, commence_to):
+    """Featured markets for every event in the window from one call, keyed by event id"""
+    url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/odds"
+    params = {
+        "apiKey": ODDS_API_KEY,
+        "markets": ",".join(FEATURED_MARKETS),
+        "oddsFormat": ODDS_FORMAT,
+        "bookmakers": SPORTSBOOKS,
+        "commenceTimeFrom": commence_from.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commenceTimeTo": commence_to.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "includeLinks": "true",
+        "includeSids": "true"
+    }
+    return {event["id"]: event for event in odds_api_get(url, params)}
+
+def merge_event_payloads(first_odds, second_odds):
+    """One event payload with the bookmakers of both calls (the builder merges books by name)"""
+    return {**first_odds, **second_odds,
+            "bookmakers": first_odds.get("bookmakers", []) + second_odds.get("bookmakers", [])}
+
+def only_markets(event_odds, market_keys):
+    """Copy of an event payload keeping only the given markets"""
+    return {**event_odds, "bookmakers": [
+        {**b, "markets": [m for m in b.get("markets", []) if m.get("key") in market_keys]}
+        for b in event_odds.get("bookmakers", [])
+    ]}
+
+def event_markets_for(kinds, bulk):
+    """Markets to request per event for the due kinds ("main"/"alt")"""
+    markets = []
+    if "main" in kinds:
+        markets += [m for m in MARKETS.split(",") if m not in ALT_MARKETS and not (bulk and m in FEATURED_MARKETS)]
+    if "alt" in kinds:
+        markets += ALT_MARKETS
+    return ",".join(markets)
 
 def process_event_odds(event_odds):
     """Process all markets for an event"""
@@ -272,37 +257,8 @@ def process_event_odds(event_odds):
     
     print(f"Processing event {vendor_event_id}: {away_team} @ {home_team}")
     
-    processed_markets = {}
-    
-    for bookmaker in event_odds.get("bookmakers", []):
-        sportsbook = bookmaker.get("title", "").lower()
-        
-        for market in bookmaker.get("markets", []):
-            market_key = market.get("key")
-            base_market_key = get_base_market_key(market_key)
-            
-            # Skip if not in our defined markets
-            if base_market_key not in GAME_MARKETS:
-                continue
-            
-            market_info = GAME_MARKETS[base_market_key]
-            
-            # Add bookmaker info to market data for processing
-            market["bookmaker"] = sportsbook
-            
-            if base_market_key not in processed_markets:
-                processed_markets[base_market_key] = process_market_odds(market, market_info)
-            else:
-                # Merge the lines data
-                market_odds = process_market_odds(market, market_info)
-                for line_key, line_data in market_odds["lines"].items():
-                    if line_key not in processed_markets[base_market_key]["lines"]:
-                        processed_markets[base_market_key]["lines"][line_key] = line_data
-                    else:
-                        # Merge sportsbook data for existing lines
-                        processed_markets[base_market_key]["lines"][line_key]["sportsbooks"].update(
-                            line_data["sportsbooks"]
-                        )
+    # One pass over every bookmaker/market/outcome; the payload is left untouched
+    processed_markets = build_event_markets(event_odds, GAME_MARKETS, SPORTSBOOK_NAME_MAP)
     
     # Add primary line detection for each market
     for market_key, market_data in processed_markets.items():
@@ -321,8 +277,8 @@ def process_event_odds(event_odds):
         "markets": processed_markets
     }
 
-def store_odds_in_redis(event_data):
-    """Store processed odds in Redis with TTL"""
+def store_odds_in_redis(event_data, publisher=None):
+    """Store processed odds in Redis with TTL (and in the run's generation, if publishing)"""
     if not redis_client:
         print("WARNING: No Redis client available, skipping storage")
         return
@@ -344,21 +300,40 @@ def store_odds_in_redis(event_data):
         })
         
         try:
-            redis_client.setex(
-                redis_key,
-                REDIS_TTL,
-                json.dumps(market_data)
-            )
+            pipe = redis_client.pipeline(transaction=False)
+            index_value_write(pipe, redis_key, json.dumps(market_data), ttl_for("game_lines", event_data["commence_time"]),
+                              market=market_key, event=event_id)
+            pipe.execute()
+            if publisher:
+                publisher.put(redis_key, market_data)
             print(f"✅ Stored Redis odds: {redis_key}")
         except Exception as e:
             print(f"❌ Redis storage error for {redis_key}: {e}")
 
+def carry_forward_game_lines(publisher, events):
+    """Copy the stored markets of events skipped this run into the run's generation.
+
+    A published generation replaces the previous one wholesale, so events the
+    poll scheduler didn't refetch would otherwise drop out of it.
+    """
+    carried = 0
+    for event in events:
+        stored = fetch_indexed(redis_client, "odds", REDIS_SPORT_KEY, "event", event["id"])
+        for key, raw in stored.items():
+            # Only this writer's odds:{sport}:{event}:{market} keys
+            parts = key.split(":")
+            if len(parts) == 4 and parts[3] != "player_props":
+                publisher.put(key, raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+                carried += 1
+    print(f"Carried {carried} stored markets of {len(events)} skipped events into the generation")
+
 # ── FETCH TODAY'S STANDARD PROPS ──────────────────────────────────────────────
 def fetch_today_standard_props():
     """
-    Fetch props from player_odds_history table (non‐alt lines plus Home Runs alt line).
+    Fetch props from player_odds_current table (non‐alt lines plus Home Runs alt line).
     Includes player position and team abbreviation via joins.
-    Since we delete/refresh this table with current data, no date filtering needed.
+    The table holds one row per line/book with the latest price; props of games that
+    already started are left out (the importer purges them, this covers the gap between runs).
     """
     standard_markets = [m for m in TARGET_MARKETS if m.lower() != "home runs"]
 
@@ -367,16 +342,18 @@ def fetch_today_standard_props():
         "mlb_players(position_abbreviation, team_id, mlb_teams(abbreviation))"
     )
 
-    print("🔍 Fetching standard props (non-alt lines, no date filter)...")
+    now = datetime.now(timezone.utc).isoformat()
+    print("🔍 Fetching standard props (non-alt lines, upcoming games)...")
     
     # 1) Fetch non-alt lines
     std_resp = (
         supabase
-        .table("player_odds_history")
+        .table("player_odds_current")
         .select(select_fields)
         .eq("sportsbook", "draftkings")
         .eq("is_alternative", False)
         .in_("market", standard_markets)
+        .gte("commence_time", now)
         .execute()
     )
     standard = std_resp.data or []
@@ -386,10 +363,11 @@ def fetch_today_standard_props():
     print("🔍 Fetching Home Runs alt lines (0.5) from all sportsbooks...")
     hr_resp = (
         supabase
-        .table("player_odds_history")
+        .table("player_odds_current")
         .select(select_fields)
         .eq("market", "Home Runs")
         .eq("line", 0.5)
+        .gte("commence_time", now)
         .execute()
     )
     home_runs = hr_resp.data or []
@@ -419,43 +397,98 @@ def fetch_today_standard_props():
         print(f"     🕐 {game_info['commence_time']} | 👥 {game_info['player_count']} players | 🆔 {event_id}")
     
     if not props:
-        raise Exception("No props found in player_odds_history table.")
+        raise Exception("No props found in player_odds_current table.")
     return props
 
 def main():
     print("STARTING game lines import...")
     
     # Fetch upcoming events
-    events = fetch_mlb_events()
     now = datetime.now(timezone.utc)
-    future_events = [
-        e for e in events
-        if now <= datetime.fromisoformat(e["commence_time"].replace("Z", "+00:00")) <= now + timedelta(hours=36)
-    ]
+    future_events = upcoming_events(redis_client, SPORT_KEY, fetch_mlb_events, hours=36, now=now)
     
     print(f"TARGET: Processing {len(future_events)} upcoming events")
     
+    # Which events (and which of their markets) are due this run, by tier and quota
+    scheduler = PollScheduler(redis_client, REDIS_SPORT_KEY, "game_lines", now)
+    due = {e["id"]: scheduler.due(e["id"], e["commence_time"]) for e in future_events}
+    skipped = [e for e in future_events if not due[e["id"]]]
+    future_events = [e for e in future_events if due[e["id"]]]
+    if skipped:
+        print(f"Skipping {len(skipped)} events that aren't due yet")
+    
+    # Bulk mode: featured markets for the whole slate in one call
+    featured = None
+    bulk_credits = 0
+    if BULK_FEATURED and future_events:
+        try:
+            featured = fetch_featured_odds(now, now + timedelta(hours=36))
+            bulk_credits = api_usage["credits"]
+            print(f"Fetched featured markets for {len(featured)} events in one call")
+        except Exception as e:
+            print(f"WARNING: Bulk featured fetch failed, fetching every market per event: {e}")
+    
     success_count = 0
     
+    # One generation per run, covering the skipped events' stored markets too
+    publisher = None
+    if ODDS_GENERATIONS and redis_client:
+        run_ttl = slate_ttl("game_lines", (e["commence_time"] for e in future_events + skipped))
+        publisher = GenerationPublisher(redis_client, REDIS_SPORT_KEY, run_ttl, "game_lines")
+        carry_forward_game_lines(publisher, skipped)
+    
     for i, event in enumerate(future_events, 1):
         try:
             print(f"[{i}/{len(future_events)}] Processing event {event['id']}...")
             
-            # Fetch odds for this event
-            event_odds = fetch_odds_for_event(event["id"])
+            # Fetch the due markets for this event (featured ones come from the bulk call)
+            kinds = due[event["id"]]
+            event_odds = fetch_odds_for_event(event["id"], event_markets_for(kinds, featured is not None))
+            if "alt" in kinds:
+                scheduler.cache_payload(event["id"], "alt", only_markets(event_odds, ALT_MARKETS))
+            if featured is not None and event["id"] in featured:
+                event_odds = merge_event_payloads(featured[event["id"]], event_odds)
+            if "alt" not in kinds:
+                # Alternates aren't due: reuse the last ones so the stored markets keep them.
+                # They go first, so the fresh payload's fields and standard quotes win
+                cached_alt = scheduler.cached_payload(event["id"], "alt")
+                if cached_alt:
+                    event_odds = merge_event_payloads(cached_alt, event_odds)
             
             # Process odds data
             processed_data = process_event_odds(event_odds)
             
             # Store in Redis
-            store_odds_in_redis(processed_data)
+            store_odds_in_redis(processed_data, publisher)
+            scheduler.mark_polled(event["id"], kinds)
             
             success_count += 1
             
         except Exception as e:
             print(f"WARNING: Failed to process event {event['id']}: {e}")
+            # Keep its last stored markets in the generation rather than dropping it
+            if publisher:
+                carry_forward_game_lines(publisher, [event])
     
     print(f"COMPLETED! Processed {success_count}/{len(future_events)} events")
+    
+    # Readers of the published generation switch to this run all at once
+    if publisher:
+        try:
+            publisher.publish()
+        except Exception as e:
+            print(f"❌ Redis generation publish error: {e}")
+    report_api_usage(featured is not None, bulk_credits, len(future_events))
+
+def report_api_usage(bulk, bulk_credits, event_count):
+    """Per-run API cost and time; run once with GAME_LINES_BULK=0 for the per-event baseline"""
+    mode = "bulk featured" if bulk else "per-event"
+    print(f"API ({mode}): {api_usage['calls']} calls, {api_usage['credits']} credits, "
+          f"{api_usage['seconds']:.1f}s waiting on the API, {api_usage['remaining']} credits remaining")
+    if bulk and event_count > 1:
+        # Per event, the featured markets cost the same as the one bulk call did for the whole slate
+        print(f"API savings: ~{bulk_credits * (event_count - 1)} credits vs. per-event featured markets "
+              f"({bulk_credits} for the slate instead of ~{bulk_credits} per event)")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
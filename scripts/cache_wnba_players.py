@@ -3,9 +3,16 @@ import requests
 import unicodedata
 import re
 import json
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from supabase import create_client
 
+from redis_key_index import index_value_write
+from generation_publisher import ODDS_GENERATIONS, GenerationPublisher
+from ttl_policy import slate_ttl, ttl_for
+from upstash_rest import create_redis_client
+from poll_scheduler import record_quota
+from events_cache import upcoming_events
+
 # ENV VARS
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_KEY"]
@@ -20,13 +27,7 @@ supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 # Initialize Redis client if available
 redis_client = None
 if UPSTASH_URL and UPSTASH_TOKEN:
-    import redis
-    redis_client = redis.Redis(
-        host=UPSTASH_URL.replace("https://", "").split(":")[0],
-        port=6379,
-        password=UPSTASH_TOKEN,
-        ssl=True
-    )
+    redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN)
     print("Redis client initialized for game mapping lookup and current odds storage")
 
 # SETTINGS
@@ -152,7 +153,7 @@ def match_player(name, lookup):
     return lookup.get(n)
 
 def fetch_wnba_events():
-    """Fetch upcoming WNBA events from the odds API"""
+    """Fetch upcoming WNBA events from the odds API (use through events_cache)"""
     url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/events?apiKey={ODDS_API_KEY}"
     response = requests.get(url)
     response.raise_for_status()
@@ -171,6 +172,7 @@ def fetch_props_for_event(event_id):
     }
     response = requests.get(url, params=params)
     response.raise_for_status()
+    record_quota(redis_client, response.headers)
     return response.json()
 
 def determine_primary_line(lines_data, has_alternates):
@@ -271,6 +273,8 @@ def store_current_odds_in_redis(records):
     
     # Store each player+market group in Redis
     stored_count = 0
+    run_ttl = slate_ttl("player_odds", (d['commence_time'] for d in grouped_odds.values()))
+    publisher = GenerationPublisher(redis_client, REDIS_SPORT_KEY, run_ttl, "player_odds") if ODDS_GENERATIONS else None
     for group_key, odds_data in grouped_odds.items():
         redis_key = f"odds:{REDIS_SPORT_KEY}:{odds_data['player_id']}:{odds_data['market'].lower()}"
         
@@ -278,13 +282,24 @@ def store_current_odds_in_redis(records):
         odds_data['last_updated'] = datetime.now(timezone.utc).isoformat()
         
         try:
-            redis_client.setex(redis_key, 10800, json.dumps(odds_data))
+            pipe = redis_client.pipeline(transaction=False)
+            index_value_write(pipe, redis_key, json.dumps(odds_data), ttl_for("player_odds", odds_data['commence_time']),
+                              market=odds_data['market'].lower(), player=odds_data['player_id'])
+            pipe.execute()
             stored_count += 1
+            if publisher:
+                publisher.put(redis_key, odds_data)
             print(f"✅ Stored Redis odds: {redis_key} ({len(odds_data['lines'])} lines)")
         except Exception as e:
             print(f"❌ Redis storage error for {redis_key}: {e}")
     
     print(f"📊 Successfully stored {stored_count} player+market combinations in Redis")
+    
+    if publisher:
+        try:
+            publisher.publish()
+        except Exception as e:
+            print(f"❌ Redis generation publish error: {e}")
 
 def process_event_odds(event_props, player_lookup):
     """Process odds for a single event and return records for Redis storage"""
@@ -391,12 +406,7 @@ def main():
     print(f"Loaded {len(player_lookup)} WNBA players")
     
     # Fetch upcoming events from odds API
-    events = fetch_wnba_events()
-    now = datetime.now(timezone.utc)
-    future_events = [
-        e for e in events
-        if now <= datetime.fromisoformat(e["commence_time"].replace("Z", "+00:00")) <= now + timedelta(hours=36)
-    ]
+    future_events = upcoming_events(redis_client, SPORT_KEY, fetch_wnba_events, hours=36)
     
     print(f"TARGET: Processing {len(future_events)} upcoming events")
     
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Checks UpstashRestClient against a local HTTP stub of the Upstash REST API.
+
+The stub keeps an in-memory keyspace for the commands the scripts use and
+counts TCP connections and requests, so the check covers command replies,
+/pipeline chunking, /multi-exec, error replies, auth, keep-alive reuse,
+reconnects and which requests are resent after a timeout, and the change
+feed's consumer group over the stream commands, and the events
+cache's single-flight fetch and commence-time window lookup.
+
+Usage: python scripts/check_upstash_rest.py
+"""
+
+import json
+import time
+import fnmatch
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from upstash_rest import UpstashRestClient, UpstashRestError
+from odds_change_feed import ChangeFeedConsumer
+from events_cache import RELEASE_LOCK_LUA, cached_events, events_in_window
+
+TOKEN = "stub-token"
+
+
+class StubRedis:
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def run(self, command):
+        name, args = command[0].upper(), command[1:]
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            raise ValueError(f"ERR unknown command '{name}'")
+        return handler(*args)
+
+    def cmd_ping(self):
+        return "PONG"
+
+    def cmd_get(self, key):
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, str):
+            raise ValueError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_set(self, key, value, *opts):
+        opts = [o.upper() for o in opts]
+        previous = self.data.get(key)
+        if "NX" in opts and key in self.data:
+            return None
+        self.data[key] = value
+        if "EX" in opts:
+            self.ttls[key] = int(opts[opts.index("EX") + 1])
+        return previous if "GET" in opts else "OK"
+
+    def cmd_setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = int(ttl)
+        return "OK"
+
+    def cmd_mget(self, *keys):
+        return [self.data.get(k) for k in keys]
+
+    def cmd_incrby(self, key, amount):
+        self.data[key] = str(int(self.data.get(key, 0)) + int(amount))
+        return int(self.data[key])
+
+    def cmd_del(self, *keys):
+        return sum(1 for k in keys if self.data.pop(k, None) is not None)
+
+    def cmd_exists(self, *keys):
+        return sum(1 for k in keys if k in self.data)
+
+    def cmd_eval(self, script, numkeys, *keys_and_args):
+        if script != RELEASE_LOCK_LUA:
+            raise ValueError("ERR the stub only runs the events cache lock release")
+        key, token = keys_and_args
+        return self.cmd_del(key) if self.data.get(key) == token else 0
+
+    def cmd_expire(self, key, ttl, *flags):
+        if key not in self.data:
+            return 0
+        current = self.ttls.get(key)
+        if "NX" in flags and current is not None:
+            return 0
+        if "GT" in flags and (current is None or int(ttl) <= current):
+            return 0
+        self.ttls[key] = int(ttl)
+        return 1
+
+    def cmd_ttl(self, key):
+        return -2 if key not in self.data else self.ttls.get(key, -1)
+
+    def cmd_keys(self, pattern):
+        return sorted(k for k in self.data if fnmatch.fnmatchcase(k, pattern))
+
+    def cmd_scan(self, cursor, *opts):
+        match = opts[opts.index("MATCH") + 1] if "MATCH" in opts else "*"
+        count = int(opts[opts.index("COUNT") + 1]) if "COUNT" in opts else 10
+        keys = sorted(self.data)
+        start = int(cursor)
+        page = keys[start:start + count]
+        next_cursor = start + count if start + count < len(keys) else 0
+        return [str(next_cursor), [k for k in page if fnmatch.fnmatchcase(k, match)]]
+
+    def cmd_sadd(self, key, *members):
+        s = self.data.setdefault(key, set())
+        before = len(s)
+        s.update(members)
+        return len(s) - before
+
+    def cmd_srem(self, key, *members):
+        s = self.data.get(key, set())
+        removed = len(s & set(members))
+        s.difference_update(members)
+        return removed
+
+    def cmd_smembers(self, key):
+        return sorted(self.data.get(key, set()))
+
+    def cmd_hset(self, key, *pairs):
+        h = self.data.setdefault(key, {})
+        added = sum(1 for f in pairs[::2] if f not in h)
+        h.update(zip(pairs[::2], pairs[1::2]))
+        return added
+
+    def cmd_hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    def cmd_hgetall(self, key):
+        return [x for pair in self.data.get(key, {}).items() for x in pair]
+
+    def cmd_hmget(self, key, *fields):
+        h = self.data.get(key, {})
+        return [h.get(f) for f in fields]
+
+    def cmd_hdel(self, key, *fields):
+        h = self.data.get(key, {})
+        return sum(1 for f in fields if h.pop(f, None) is not None)
+
+    def cmd_hscan(self, key, cursor, *opts):
+        return ["0", self.cmd_hgetall(key)]
+
+    def cmd_zadd(self, key, *args):
+        z = self.data.setdefault(key, {})
+        pairs = [a for a in args if str(a).upper() not in ("NX", "XX", "GT", "LT")]
+        added = sum(1 for m in pairs[1::2] if m not in z)
+        z.update({m: float(score) for score, m in zip(pairs[::2], pairs[1::2])})
+        return added
+
+    def cmd_zrangebyscore(self, key, lo, hi, *opts):
+        z = self.data.get(key, {})
+        return [m for m, score in sorted(z.items(), key=lambda i: (i[1], i[0])) if float(lo) <= score <= float(hi)]
+
+    # Streams: {"entries": [(id, [f, v, ...])], "groups": {group: {"last": n, "pending": {id: consumer}}}}
+    def _stream(self, key):
+        return self.data.setdefault(key, {"entries": [], "groups": {}, "seq": 0})
+
+    def cmd_xadd(self, key, *args):
+        stream = self._stream(key)
+        if args[0] == "MAXLEN":
+            maxlen, args = int(args[2]), args[3:]
+        else:
+            maxlen = None
+        stream["seq"] += 1
+        entry_id = f"{stream['seq']}-0"
+        stream["entries"].append((entry_id, list(args[1:])))
+        if maxlen is not None:
+            del stream["entries"][:-maxlen]
+        return entry_id
+
+    def cmd_xlen(self, key):
+        return len(self._stream(key)["entries"])
+
+    def cmd_xgroup(self, sub, key, group, start, *opts):
+        if key not in self.data and "MKSTREAM" not in opts:
+            raise ValueError("ERR no such key")
+        stream = self._stream(key)
+        if group in stream["groups"]:
+            raise ValueError("BUSYGROUP Consumer Group name already exists")
+        last = stream["seq"] if start == "$" else 0
+        stream["groups"][group] = {"last": last, "pending": {}}
+        return "OK"
+
+    def cmd_xreadgroup(self, _, group, consumer, *args):
+        count = int(args[args.index("COUNT") + 1]) if "COUNT" in args else None
+        key = args[args.index("STREAMS") + 1]
+        state = self._stream(key)["groups"][group]
+        new = [e for e in self._stream(key)["entries"] if int(e[0].split("-")[0]) > state["last"]][:count]
+        if not new:
+            return None
+        state["last"] = int(new[-1][0].split("-")[0])
+        state["pending"].update({entry_id: consumer for entry_id, _ in new})
+        return [[key, [list(e) for e in new]]]
+
+    def cmd_xack(self, key, group, *ids):
+        pending = self._stream(key)["groups"][group]["pending"]
+        return sum(1 for i in ids if pending.pop(i, None) is not None)
+
+    def cmd_xautoclaim(self, key, group, consumer, min_idle, start, *opts):
+        pending = self._stream(key)["groups"][group]["pending"]
+        entries = dict(self._stream(key)["entries"])
+        claimed = [[i, entries[i]] for i in sorted(pending) if int(min_idle) == 0]
+        pending.update({i: consumer for i, _ in claimed})
+        return ["0-0", claimed, []]
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.redis = StubRedis()
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.delay_next = 0       # Run the next request, then stall this long before replying
+        self.close_next = False   # Close the connection after the next reply
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, payload):
+        delay, self.server.delay_next = self.server.delay_next, 0
+        time.sleep(delay)
+        if self.server.close_next:
+            self.server.close_next = False
+            self.close_connection = True
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            pass  # The client timed out and hung up
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append((self.path, len(body)))
+        if self.headers.get("Authorization") != f"Bearer {TOKEN}":
+            return self.reply(401, {"error": "Unauthorized"})
+
+        self.reply(*self.run(body))
+
+    def run(self, body):
+        with self.server.lock:
+            if self.path == "/":
+                try:
+                    return 200, {"result": self.server.redis.run(body)}
+                except ValueError as e:
+                    return 400, {"error": str(e)}
+
+            replies = []
+            for command in body:
+                try:
+                    replies.append({"result": self.server.redis.run(command)})
+                except ValueError as e:
+                    replies.append({"error": str(e)})
+            return 200, replies
+
+
+def check(label, condition):
+    print(f"  {'✅' if condition else '❌'} {label}")
+    if not condition:
+        raise SystemExit(1)
+
+
+def main():
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = UpstashRestClient(url, TOKEN, max_batch=1000)
+
+    print(f"🧪 Upstash REST stub at {url}")
+    check("PING", client.ping() is True)
+    check("SETEX + GET + TTL", client.setex("odds:mlb:1:hits", 60, json.dumps({"a": 1})) is True
+          and json.loads(client.get("odds:mlb:1:hits")) == {"a": 1} and client.ttl("odds:mlb:1:hits") == 60)
+    check("SET ex= / GET=", client.set("games:mlb:today", "v1", ex=30) is True
+          and client.set("games:mlb:today", "v2", get=True) == "v1")
+    check("EXPIRE NX/GT", client.expire("games:mlb:today", 10, nx=True) is False
+          and client.expire("games:mlb:today", 100, gt=True) is True and client.ttl("games:mlb:today") == 100)
+    check("MGET missing keys -> None", client.mget(["odds:mlb:1:hits", "nope"])[1] is None)
+    check("SADD/SMEMBERS/SREM", client.sadd("idx:s", "a", "b") == 2 and client.smembers("idx:s") == {"a", "b"}
+          and client.srem("idx:s", "a") == 1)
+    check("HSET mapping/HGETALL/HMGET", client.hset("h", mapping={"f1": "1", "f2": "2"}) == 2
+          and client.hgetall("h") == {"f1": "1", "f2": "2"} and client.hmget("h", ["f2", "f9"]) == ["2", None])
+    check("hscan_iter", dict(client.hscan_iter("h")) == {"f1": "1", "f2": "2"})
+
+    for i in range(25):
+        client.set(f"odds:mlb:scan:{i}", "x")
+    check("scan_iter walks every page", len(list(client.scan_iter(match="odds:mlb:scan:*", count=7))) == 25)
+
+    before = len(server.requests)
+    pipe = client.pipeline(transaction=False)
+    for i in range(2500):
+        pipe.setex(f"bulk:{i}", 60, i)
+    results = pipe.execute()
+    sent = server.requests[before:]
+    check("pipeline of 2500 -> 3 /pipeline requests", [p for p, _ in sent] == ["/pipeline"] * 3
+          and [n for _, n in sent] == [1000, 1000, 500] and all(results))
+
+    before = len(server.requests)
+    tx = client.pipeline(transaction=True)
+    tx.set("current_gen", "g2").sadd("gens", "g2").get("current_gen")
+    check("multi-exec sends one request", tx.execute() == [True, 1, "g2"]
+          and server.requests[before:] == [("/multi-exec", 3)])
+
+    pipe = client.pipeline(transaction=False)
+    pipe.hset("wrongtype", "f", "v").get("wrongtype")
+    try:
+        pipe.execute()
+        check("pipeline error raises", False)
+    except UpstashRestError as e:
+        check("pipeline error raises", "WRONGTYPE" in str(e))
+    pipe.hset("wrongtype", "f", "v").get("wrongtype")
+    check("raise_on_error=False returns the error", isinstance(pipe.execute(raise_on_error=False)[1], UpstashRestError))
+
+    feed = ChangeFeedConsumer(client, "mlb", "alerts", "c1")
+    check("XGROUP CREATE is idempotent (BUSYGROUP)", ChangeFeedConsumer(client, "mlb", "alerts", "c2") is not None)
+    pipe = client.pipeline(transaction=False)
+    for i in range(5):
+        pipe.xadd(feed.key, {"player": i, "side": "over", "old": "", "new": -110 - i}, maxlen=3, approximate=False)
+    pipe.execute()
+    seen = []
+    check("XADD MAXLEN caps the stream", client.xlen(feed.key) == 3)
+    check("consumer group reads and acks new entries once", feed.process(seen.append) == 3
+          and [m["player"] for m in seen] == ["2", "3", "4"] and feed.process(seen.append) == 0)
+    client.xadd(feed.key, {"player": 9})
+    feed.process(lambda m: 1 / 0)
+    check("failed handler leaves the entry pending", client.xack(feed.key, "alerts", "6-0") == 1)
+
+    check(f"keep-alive: {len(server.requests)} requests over {server.connections} connection", server.connections == 1)
+
+    client._conn.sock.close()  # Simulate the server dropping an idle connection
+    check("reconnects after a dropped connection", client.get("current_gen") == "g2" and server.connections == 2)
+
+    try:
+        UpstashRestClient(url, "wrong").get("x")
+        check("bad token rejected", False)
+    except UpstashRestError as e:
+        check("bad token rejected", "Unauthorized" in str(e))
+
+    connections = server.connections
+    server.close_next = True
+    client.get("current_gen")
+    time.sleep(0.1)
+    check("server-closed idle connection replaced before a write", client.incrby("ctr", 1) == 1
+          and server.connections == connections + 1)
+
+    slow = UpstashRestClient(url, TOKEN, timeout=0.3)
+    server.delay_next = 0.6
+    check("read resent after a timeout", slow.get("ctr") == "1")
+    server.delay_next = 0.6
+    try:
+        slow.incrby("ctr", 1)
+        check("write not resent after a timeout", False)
+    except OSError:
+        time.sleep(0.5)
+        check("write not resent after a timeout", client.get("ctr") == "2")
+    server.delay_next = 0.6
+    tx = slow.pipeline(transaction=True)
+    tx.get("ctr").incrby("ctr", 1)
+    try:
+        tx.execute()
+        check("MULTI with a write not resent after a timeout", False)
+    except OSError:
+        time.sleep(0.5)
+        check("MULTI with a write not resent after a timeout", client.get("ctr") == "3")
+
+    now = datetime(2025, 7, 4, 16, 0, tzinfo=timezone.utc)
+    events = [{"id": f"e{h}", "commence_time": (now + timedelta(hours=h)).isoformat().replace("+00:00", "Z")}
+              for h in (40, 2, -1, 20, 35)]
+    fetches = []
+
+    def slow_fetch():
+        fetches.append(1)
+        time.sleep(0.3)
+        return events
+
+    results = []
+    crons = [threading.Thread(target=lambda: results.append(
+        cached_events(UpstashRestClient(url, TOKEN), "baseball_mlb", slow_fetch))) for _ in range(6)]
+    for t in crons:
+        t.start()
+    for t in crons:
+        t.join()
+    check("events cache: 6 concurrent callers, 1 API fetch", len(fetches) == 1
+          and len(results) == 6 and all(r == events for r in results))
+    check("events cache: lock released", client.exists("events:baseball_mlb:lock") == 0)
+    window = events_in_window(client, "baseball_mlb", slow_fetch, now, now + timedelta(hours=36))
+    check("events cache: 36h window by ZRANGEBYSCORE, in commence order",
+          [e["id"] for e in window] == ["e2", "e20", "e35"] and len(fetches) == 1)
+    check("events cache: same window without Redis", events_in_window(None, "baseball_mlb", slow_fetch, now,
+          now + timedelta(hours=36)) == window)
+    client.delete("events:baseball_mlb")
+    check("events cache: window lookup refills an expired list", [e["id"] for e in events_in_window(
+          client, "baseball_mlb", slow_fetch, now, now + timedelta(hours=3))] == ["e2"] and len(fetches) == 3)
+    client.delete("events:baseball_mlb:by_id")  # Expired between the ZRANGEBYSCORE and the HMGET
+    check("events cache: short HMGET falls back to the list", [e["id"] for e in events_in_window(
+          client, "baseball_mlb", slow_fetch, now, now + timedelta(hours=36))] == ["e2", "e20", "e35"]
+          and len(fetches) == 3)
+
+    server.shutdown()
+    print("✅ All checks passed")
+
+
+if __name__ == "__main__":
+    main()
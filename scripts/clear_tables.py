@@ -10,7 +10,8 @@ supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
 def get_total_rows(table_name):
     try:
-        response = supabase.table(table_name).select("*", count="exact").execute()
+        # Only the count is needed, so don't ship every row back
+        response = supabase.table(table_name).select("id", count="exact").limit(1).execute()
         return response.count if hasattr(response, 'count') else 0
     except Exception as e:
         print(f"❌ Error getting row count for {table_name}: {e}")
@@ -76,11 +77,13 @@ def clear_old_records(table_name, days_to_keep=7):
 
 def main():
     # Option 1: Clear entire tables in batches
-    clear_table_in_batches("player_odds_history")
+    # player_odds_history is an append-only change log now (current prices live
+    # in player_odds_current), so it is no longer wiped every run.
     clear_table_in_batches("player_hit_rate_profiles")
     
     # Option 2: Clear only old records (keep last 7 days)
-    # clear_old_records("player_odds_history", days_to_keep=7)
+    # player_odds_history retention is handled by odds_history_retention.py,
+    # which drops whole daily partitions (see partition_odds_history.sql)
     # clear_old_records("player_hit_rate_profiles", days_to_keep=7)
 
 if __name__ == "__main__":
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compacts player_odds_history into player_odds_intervals price runs.
+
+Each run of identical over/under prices for a
+(vendor_event_id, player_id, market, line, sportsbook) key becomes one
+[valid_from, valid_to) row. Requires odds_intervals.sql and a direct Postgres
+connection (SUPABASE_DB_URL). Safe to run on every import, even while an
+import is still writing: it only reads history rows inserted since the last
+compaction, by database insert time rather than the importer's created_at.
+"""
+
+import os
+
+import psycopg
+
+SUPABASE_DB_URL = os.environ["SUPABASE_DB_URL"]
+
+
+def compact(conn):
+    points_read, intervals_written = conn.execute("SELECT * FROM compact_odds_history()").fetchone()
+    if points_read:
+        print(f"🗜️  Compacted {points_read} history rows into {intervals_written} price runs "
+              f"({intervals_written / points_read:.1%} of the rows)")
+    else:
+        print("✅ No new history rows to compact")
+    return points_read, intervals_written
+
+
+def price_at(conn, vendor_event_id, player_id, market, line, sportsbook, at):
+    """(over_price, under_price, valid_from, valid_to) in effect at `at`, or None"""
+    return conn.execute(
+        "SELECT * FROM odds_price_at(%s, %s, %s, %s, %s, %s)",
+        (vendor_event_id, player_id, market, line, sportsbook, at)
+    ).fetchone()
+
+
+def main():
+    with psycopg.connect(SUPABASE_DB_URL, autocommit=True) as conn:
+        compact(conn)
+
+
+if __name__ == "__main__":
+    main()
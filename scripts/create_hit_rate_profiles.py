@@ -42,9 +42,10 @@ MARKET_TO_STAT_KEY = {
 
 def fetch_today_standard_props():
     """
-    Fetch props from player_odds_history table (non‐alt lines plus Home Runs alt line).
+    Fetch props from player_odds_current table (non‐alt lines plus Home Runs alt line).
     Includes player position and team abbreviation via joins.
-    Since we delete/refresh this table with current data, no date filtering needed.
+    The table holds one row per line/book with the latest price; props of games that
+    already started are left out (the importer purges them, this covers the gap between runs).
     """
     standard_markets = [m for m in TARGET_MARKETS if m.lower() != "home runs"]
 
@@ -53,16 +54,18 @@ def fetch_today_standard_props():
         "mlb_players(position_abbreviation, team_id, mlb_teams(abbreviation))"
     )
 
-    print("🔍 Fetching standard props (non-alt lines, no date filter)...")
+    now = datetime.now(timezone.utc).isoformat()
+    print("🔍 Fetching standard props (non-alt lines, upcoming games)...")
     
     # 1) Fetch non-alt lines
     std_resp = (
         supabase
-        .table("player_odds_history")
+        .table("player_odds_current")
         .select(select_fields)
         .eq("sportsbook", "draftkings")
         .eq("is_alternative", False)
         .in_("market", standard_markets)
+        .gte("commence_time", now)
         .execute()
     )
     standard = std_resp.data or []
@@ -72,10 +75,11 @@ def fetch_today_standard_props():
     print("🔍 Fetching Home Runs alt lines (0.5) from all sportsbooks...")
     hr_resp = (
         supabase
-        .table("player_odds_history")
+        .table("player_odds_current")
         .select(select_fields)
         .eq("market", "Home Runs")
         .eq("line", 0.5)
+        .gte("commence_time", now)
         .execute()
     )
     home_runs = hr_resp.data or []
@@ -105,5 +109,5 @@ def fetch_today_standard_props():
         print(f"     🕐 {game_info['commence_time']} | 👥 {game_info['player_count']} players | 🆔 {event_id}")
     
     if not props:
-        raise Exception("No props found in player_odds_history table.")
+        raise Exception("No props found in player_odds_current table.")
     return props
\ No newline at end of file
@@ -5,15 +5,20 @@ import os
 import requests
 from datetime import datetime, timezone, timedelta
 from supabase import create_client
+from upstash_rest import create_redis_client
+from events_cache import upcoming_events
 
 # ENV VARS
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_KEY"]
 ODDS_API_KEY = os.environ["ODDS_API_KEY"]
 ODDS_API_BASE_URL = os.environ["ODDS_API_BASE_URL"]
+UPSTASH_URL = os.environ.get("UPSTASH_REDIS_REST_URL")
+UPSTASH_TOKEN = os.environ.get("UPSTASH_REDIS_REST_TOKEN")
 
 # INIT CLIENT
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN) if UPSTASH_URL and UPSTASH_TOKEN else None
 
 SPORT_KEY = "baseball_mlb"
 
@@ -66,12 +71,7 @@ def main():
     # Get team names from odds API
     print("2. TEAM NAMES FROM ODDS API:")
     try:
-        events = fetch_mlb_events()
-        now = datetime.now(timezone.utc)
-        future_events = [
-            e for e in events
-            if now <= datetime.fromisoformat(e["commence_time"].replace("Z", "+00:00")) <= now + timedelta(hours=36)
-        ]
+        future_events = upcoming_events(redis_client, SPORT_KEY, fetch_mlb_events, hours=36)
         
         api_teams = set()
         for event in future_events[:5]:  # Show first 5 events
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared, short-lived cache of the odds API events list per sport.
+
+Every importer, loader and mapper starts by fetching /sports/{sport}/events,
+often several crons in the same minute. cached_events() serves them all from
+one Redis copy:
+
+  events:{sport}               JSON list as returned by the API (EVENTS_TTL)
+  events:{sport}:by_id         hash event id -> event JSON
+  events:{sport}:by_commence   ZSET event id scored by commence_time epoch
+  events:{sport}:lock          single-flight lock (SET NX EX)
+
+On a miss only the caller holding the lock hits the API; everyone else polls
+the cache until it's filled (or the lock expires, then fetches directly), so
+concurrent crons don't stampede the API. The three keys are written in one
+MULTI with the same TTL, so the ZSET index always matches the list and the
+36h window filter is a ZRANGEBYSCORE + HMGET instead of parsing every
+commence_time. If the keys expire between those two reads, the window is
+filtered from the (refilled) list instead.
+
+Without Redis both functions fall back to a direct fetch (old behavior).
+"""
+
+import os
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+EVENTS_TTL = int(os.environ.get("EVENTS_CACHE_TTL", "120"))
+LOCK_TTL = 20                 # Longer than a slow /events call
+WAIT_STEP = 0.25
+
+# Delete the lock only if we still own it (it may have expired and been re-taken)
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _epoch(commence_time) -> float:
+    return datetime.fromisoformat(str(commence_time).replace("Z", "+00:00")).timestamp()
+
+
+def events_key(sport: str) -> str:
+    return f"events:{sport}"
+
+
+def _read(redis_client, sport: str) -> Optional[List[Dict]]:
+    raw = redis_client.get(events_key(sport))
+    return json.loads(_decode(raw)) if raw else None
+
+
+def _store(redis_client, sport: str, events: List[Dict], ttl: int):
+    key = events_key(sport)
+    by_id, by_commence = f"{key}:by_id", f"{key}:by_commence"
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(by_id, by_commence)
+    if events:
+        pipe.hset(by_id, mapping={e["id"]: json.dumps(e) for e in events})
+        pipe.zadd(by_commence, {e["id"]: _epoch(e["commence_time"]) for e in events})
+        pipe.expire(by_id, ttl)
+        pipe.expire(by_commence, ttl)
+    pipe.set(key, json.dumps(events), ex=ttl)
+    pipe.execute()
+
+
+def cached_events(redis_client, sport: str, fetch: Callable[[], List[Dict]], ttl: int = EVENTS_TTL) -> List[Dict]:
+    """The sport's events list, fetched through fetch() at most once per ttl across all callers"""
+    if not redis_client:
+        return fetch()
+
+    events = _read(redis_client, sport)
+    if events is not None:
+        return events
+
+    lock_key = f"{events_key(sport)}:lock"
+    token = uuid.uuid4().hex
+    deadline = time.time() + LOCK_TTL
+    while not redis_client.set(lock_key, token, ex=LOCK_TTL, nx=True):
+        # Someone else is fetching: wait for their copy
+        time.sleep(WAIT_STEP)
+        events = _read(redis_client, sport)
+        if events is not None:
+            return events
+        if time.time() > deadline:
+            print(f"⚠️ Timed out waiting for the {sport} events fetch, fetching directly")
+            return fetch()
+
+    try:
+        # The holder before us may have filled it between our GET and SET NX
+        events = _read(redis_client, sport)
+        if events is None:
+            events = fetch()
+            _store(redis_client, sport, events, ttl)
+        return events
+    finally:
+        redis_client.eval(RELEASE_LOCK_LUA, 1, lock_key, token)
+
+
+def _in_window(events: List[Dict], start: datetime, end: datetime) -> List[Dict]:
+    lo, hi = start.timestamp(), end.timestamp()
+    return sorted((e for e in events if lo <= _epoch(e["commence_time"]) <= hi),
+                  key=lambda e: _epoch(e["commence_time"]))
+
+
+def events_in_window(redis_client, sport: str, fetch: Callable[[], List[Dict]],
+                     start: datetime, end: datetime) -> List[Dict]:
+    """Events with start <= commence_time <= end, in commence order"""
+    if not redis_client:
+        return _in_window(fetch(), start, end)
+
+    key = events_key(sport)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.exists(key)
+    pipe.zrangebyscore(f"{key}:by_commence", start.timestamp(), end.timestamp())
+    cached, ids = pipe.execute()
+    if cached:
+        if not ids:
+            return []
+        rows = redis_client.hmget(f"{key}:by_id", [_decode(i) for i in ids])
+        if all(rows):
+            return [json.loads(_decode(r)) for r in rows]
+
+    # Expired before (or between) the reads: filter the list, refilling it if needed
+    return _in_window(cached_events(redis_client, sport, fetch), start, end)
+
+
+def upcoming_events(redis_client, sport: str, fetch: Callable[[], List[Dict]],
+                    hours: float = 36, now: Optional[datetime] = None) -> List[Dict]:
+    """Events starting within the next `hours`"""
+    now = now or datetime.now(timezone.utc)
+    return events_in_window(redis_client, sport, fetch, now, now + timedelta(hours=hours))
@@ -3,6 +3,9 @@ import json
 from datetime import datetime, timezone
 import math
 
+from redis_key_index import fetch_indexed, indexed_sports
+from generation_publisher import published_sports, read_generation
+
 # Initialize Redis client
 redis_client = redis.Redis(
     host='your-redis-host',
@@ -47,34 +50,56 @@ def calculate_arbitrage(over_odds: float, under_odds: float) -> tuple[float, flo
     
     return 0, 0, 0
 
+def iter_lines(data: dict):
+    """(line, {book: {over, under}}) pairs for both cached shapes of 'lines'"""
+    lines = data.get('lines')
+    if isinstance(lines, dict):
+        # odds:{sport}:{player_id}:{market}: {line: {book: ...}}
+        return lines.items()
+    # odds:mlb:{event}:{player}:{market} (optimized_odds_cache): [{"line", "sportsbooks"}]
+    return ((l['line'], l.get('sportsbooks', {})) for l in lines or [])
+
 def find_arbitrage_opportunities(min_profit_percentage: float = 1.0):
     """
     Scan Redis for arbitrage opportunities.
     min_profit_percentage: minimum profit percentage to report (e.g., 1.0 for 1%)
     """
-    # Get all odds keys
-    cursor = 0
-    odds_keys = []
+    # Every odds writer publishes generations: a published sport is read from
+    # its writers' last complete runs only, so one scan never mixes two runs
+    odds_values = {}
+    published = published_sports(redis_client)
+    for sport in published:
+        odds_values.update(read_generation(redis_client, sport))
+    
+    # Sports without a published generation (ODDS_GENERATIONS off) come from
+    # the writer-maintained index sets (SMEMBERS + MGET)
+    for sport in indexed_sports(redis_client, "odds"):
+        if sport not in published:
+            odds_values.update(fetch_indexed(redis_client, "odds", sport))
     
-    while True:
-        cursor, keys = redis_client.scan(cursor, match="odds:*", count=1000)
-        odds_keys.extend(keys)
-        if cursor == 0:
-            break
+    # Fall back to a keyspace scan until the index sets exist
+    if not odds_values:
+        cursor = 0
+        while True:
+            cursor, keys = redis_client.scan(cursor, match="odds:*", count=1000)
+            for key in keys:
+                odds_values[key] = redis_client.get(key)
+            if cursor == 0:
+                break
     
-    print(f"Found {len(odds_keys)} odds keys to analyze...")
+    print(f"Found {len(odds_values)} odds keys to analyze...")
     opportunities = []
     
-    for key in odds_keys:
+    for key, raw in odds_values.items():
         try:
-            data = json.loads(redis_client.get(key))
+            data = raw if isinstance(raw, dict) else json.loads(raw)
             
-            # Skip if no lines data
+            # Skip if no lines data (e.g. odds:mlb:{event}:player_props)
             if not data.get('lines'):
                 continue
             
             # Check each line for arbitrage
-            for line, books in data['lines'].items():
+            for line, books in iter_lines(data):
                 best_over = float('-inf')
                 best_over_book = None
                 best_under = float('-inf')
@@ -106,7 +131,7 @@ def find_arbitrage_opportunities(min_profit_percentage: float = 1.0):
                         'market': data['market'],
                         'line': line,
                         'event_id': data['event_id'],
-                        'commence_time': data['commence_time'],
+                        'commence_time': data.get('commence_time'),
                         'over': {
                             'odds': best_over,
                             'book': best_over_book,
@@ -118,8 +143,8 @@ def find_arbitrage_opportunities(min_profit_percentage: float = 1.0):
                             'stake_percentage': round(under_pct, 2)
                         },
                         'profit_percentage': round(profit_pct, 2),
-                        'home_team': data['home_team'],
-                        'away_team': data['away_team']
+                        'home_team': data.get('home_team'),
+                        'away_team': data.get('away_team')
                     }
                     
                     # Add links if available
@@ -153,7 +178,8 @@ def main():
     for opp in opportunities:
         print(f"\n{opp['player']} - {opp['market']} (Line: {opp['line']})")
         print(f"Game: {opp['away_team']} @ {opp['home_team']}")
-        print(f"Start time: {datetime.fromisoformat(opp['commence_time']).strftime('%Y-%m-%d %H:%M:%S')}")
+        if opp['commence_time']:
+            print(f"Start time: {datetime.fromisoformat(opp['commence_time']).strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"Profit: {opp['profit_percentage']}%")
         print("\nBet distribution:")
         print(f"OVER {opp['line']}: {opp['over']['odds']} ({opp['over']['book']}) - Stake: {opp['over']['stake_percentage']}%")
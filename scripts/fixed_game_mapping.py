@@ -4,11 +4,15 @@
 import os
 import json
 import requests
-import redis
 from datetime import datetime, timezone
-from difflib import SequenceMatcher
 from supabase import create_client
 
+from ttl_policy import ttl_for
+from upstash_rest import create_redis_client
+from events_cache import cached_events
+from team_identity import ALIAS_KEY, TeamIdentity
+from game_assignment import REASONS, listing_flipped, map_events
+
 # ENV VARS
 ODDS_API_KEY = os.environ["ODDS_API_KEY"]
 ODDS_API_BASE_URL = os.environ["ODDS_API_BASE_URL"]
@@ -19,33 +23,22 @@ UPSTASH_TOKEN = os.environ["UPSTASH_REDIS_REST_TOKEN"]
 
 # SETUP
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-TEAM_LOOKUP = {
-    t["team_id"]: t["abbreviation"]
-    for t in supabase.table("mlb_teams").select("team_id, abbreviation").execute().data
-}
+MLB_TEAMS = supabase.table("mlb_teams").select("team_id, name, abbreviation").execute().data
+TEAM_LOOKUP = {t["team_id"]: t["abbreviation"] for t in MLB_TEAMS}
 
 if not UPSTASH_URL or not UPSTASH_TOKEN:
     raise ValueError("Missing Upstash Redis credentials.")
 
-redis_client = redis.Redis(
-    host=UPSTASH_URL.replace("https://", "").split(":")[0],
-    port=6379,
-    password=UPSTASH_TOKEN,
-    ssl=True
-)
+redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN)
 
 SPORT_KEY = "baseball_mlb"
 
 # HELPERS
-def normalize(name):
-    return name.lower().replace("é", "e").replace("socks", "sox").replace(" ", "")
-
-def similar(a, b):
-    return SequenceMatcher(None, normalize(a), normalize(b)).ratio()
-
 def fetch_vendor_events():
     url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/events?apiKey={ODDS_API_KEY}"
-    return requests.get(url).json()
+    response = requests.get(url)
+    response.raise_for_status()
+    return response.json()
 
 def fetch_mlb_schedule():
     today = datetime.today().strftime("%Y-%m-%d")
@@ -66,57 +59,8 @@ def get_mlb_games_from_db():
     )
     return games
 
-def find_best_mlb_match(vendor_event, mlb_games, db_games):
-    """Match vendor event to MLB StatsAPI game, then to database game"""
-    event_home = vendor_event["home_team"]
-    event_away = vendor_event["away_team"]
-    event_time = datetime.fromisoformat(vendor_event["commence_time"].replace("Z", "+00:00"))
-
-    # First, find the best match in MLB StatsAPI
-    candidates = []
-    for game in mlb_games:
-        g_home = game["teams"]["home"]["team"]["name"]
-        g_away = game["teams"]["away"]["team"]["name"]
-        g_time = datetime.fromisoformat(game["gameDate"])
-        name_score = (similar(event_home, g_home) + similar(event_away, g_away)) / 2
-        time_diff = abs((event_time - g_time).total_seconds()) / 60
-
-        if name_score > 0.7 and time_diff < 90:
-            candidates.append((name_score, -time_diff, game))
-
-    if not candidates:
-        return None, None
-        
-    # Get the best MLB game match
-    candidates.sort(reverse=True)
-    mlb_game = candidates[0][2]
-    mlb_game_pk = mlb_game["gamePk"]
-    
-    # Now find the corresponding game in our database
-    mlb_home = mlb_game["teams"]["home"]["team"]["name"]
-    mlb_away = mlb_game["teams"]["away"]["team"]["name"]
-    mlb_time = datetime.fromisoformat(mlb_game["gameDate"])
-    
-    # Match to database game by team names and time
-    for db_game in db_games:
-        db_home = db_game.get("home_name", "")
-        db_away = db_game.get("away_name", "")
-        db_time = datetime.fromisoformat(db_game["game_datetime"].replace("Z", "+00:00"))
-        
-        # Check similarity between MLB game and database game
-        home_match = similar(mlb_home, db_home) > 0.7 or similar(event_home, db_home) > 0.7
-        away_match = similar(mlb_away, db_away) > 0.7 or similar(event_away, db_away) > 0.7
-        time_match = abs((mlb_time - db_time).total_seconds()) < 3 * 3600  # 3 hours tolerance
-        
-        if home_match and away_match and time_match:
-            print(f"✅ Found database match: {db_away} @ {db_home} -> game_id {db_game['game_id']}")
-            return mlb_game, db_game
-    
-    print(f"⚠️ MLB game found but no database game match for {mlb_away} @ {mlb_home}")
-    return mlb_game, None
-
 def main():
-    vendor_events = fetch_vendor_events()
+    vendor_events = cached_events(redis_client, SPORT_KEY, fetch_vendor_events)
     mlb_data = fetch_mlb_schedule()
     mlb_games = [g for d in mlb_data["dates"] for g in d["games"]]
     db_games = get_mlb_games_from_db()
@@ -126,40 +70,33 @@ def main():
     print(f"📅 Fetched {len(mlb_games)} MLB scheduled games from StatsAPI")
     print(f"🗃️ Fetched {len(db_games)} games from mlb_games table")
 
-    final_games = {}
-    unmatched = []
-
-    for event in vendor_events:
-        event_id = event["id"]
-        event_time = datetime.fromisoformat(event["commence_time"].replace("Z", "+00:00"))
+    # One batch assignment per slate date, so doubleheader games can't share an event
+    identity = TeamIdentity(MLB_TEAMS, redis_client.hgetall(ALIAS_KEY))
+    mapped, unassigned = map_events(vendor_events, mlb_games, db_games, identity)
 
-        mlb_game, db_game = find_best_mlb_match(event, mlb_games, db_games)
-        
-        if not mlb_game or not db_game:
-            unmatched.append(event)
-            continue
+    final_games = {}
 
+    for event_id, (event, mlb_game, db_game) in mapped.items():
         # Use the database game_id instead of MLB gamePk
-        home_team_id = mlb_game["teams"]["home"]["team"]["id"]
-        away_team_id = mlb_game["teams"]["away"]["team"]["id"]
+        home_team = mlb_game["teams"]["home"]["team"]
+        away_team = mlb_game["teams"]["away"]["team"]
         mlb_game_pk = mlb_game["gamePk"]  # Keep for reference
         db_game_id = db_game["game_id"]   # Use this for foreign key
-        
-        mlb_time = datetime.fromisoformat(mlb_game["gameDate"])
-        time_diff = abs((event_time - mlb_time).total_seconds()) / 60
 
         merged = {
             "sport_key": SPORT_KEY,
             "event_id": event_id,
             "commence_time": event["commence_time"],
+            # Sides come from StatsAPI: the vendor may list the teams flipped
             "home_team": {
-                "name": event["home_team"],
-                "abbreviation": TEAM_LOOKUP.get(home_team_id, "UNK")
+                "name": home_team["name"],
+                "abbreviation": TEAM_LOOKUP.get(home_team["id"], "UNK")
             },
             "away_team": {
-                "name": event["away_team"],
-                "abbreviation": TEAM_LOOKUP.get(away_team_id, "UNK")
+                "name": away_team["name"],
+                "abbreviation": TEAM_LOOKUP.get(away_team["id"], "UNK")
             },
+            "listing_flipped": listing_flipped(event, mlb_game, identity),
             "mlb_game_id": str(db_game_id),  # Use database game_id, not MLB gamePk
             "mlb_game_pk": str(mlb_game_pk),  # Keep MLB gamePk for reference
             "status": "scheduled",
@@ -168,17 +105,23 @@ def main():
             "venue": mlb_game.get("venue", "NA")
         }
 
-        redis_client.set(f"odds:mlb:{event_id}", json.dumps(merged))
+        redis_client.set(f"odds:mlb:{event_id}", json.dumps(merged), ex=ttl_for("game_mapping", event["commence_time"]))
         final_games[event_id] = merged
-        print(f"✅ Mapped: {event['home_team']} vs {event['away_team']} → db_game_id {db_game_id} (MLB gamePk {mlb_game_pk})")
+        print(f"✅ Mapped: {event['home_team']} vs {event['away_team']} → db_game_id {db_game_id} (MLB gamePk {mlb_game_pk})"
+              + (" [vendor lists home/away flipped]" if merged["listing_flipped"] else ""))
 
-    redis_client.set(f"games:mlb:{today_str}", json.dumps(final_games))
+    redis_client.set(f"games:mlb:{today_str}", json.dumps(final_games), ex=ttl_for("games_by_date"))
     print(f"\n💾 Stored {len(final_games)} merged games in Redis")
 
-    if unmatched:
-        print(f"\n⚠️ {len(unmatched)} vendor events could not be matched:")
-        for u in unmatched:
-            print(f"  • {u['home_team']} vs {u['away_team']} at {u['commence_time']} (event_id={u['id']})")
+    identity.save_unresolved(redis_client)
+
+    if unassigned:
+        events_by_id = {e["id"]: e for e in vendor_events}
+        print(f"\n⚠️ {len(unassigned)} vendor events could not be matched:")
+        for event_id, reason in unassigned.items():
+            u = events_by_id[event_id]
+            explanation = REASONS.get(reason.replace("db_", "", 1), reason)
+            print(f"  • {u['home_team']} vs {u['away_team']} at {u['commence_time']} (event_id={event_id}): {reason} - {explanation}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch event -> game assignment for the game mapping (fixed_game_mapping.py).
+
+Matching each vendor event to its nearest game on its own lets both halves
+of a doubleheader land on the same game_id whenever the vendor lists game 2
+near game 1's time. Instead, every record is reduced once to a slot
+(team ids via TeamIdentity, parsed start, slate date) and, per slate date,
+the full left x right cost matrix is solved as a minimum-cost bipartite
+matching (Hungarian algorithm, O(n^3) on ~15-20 games):
+
+  cost = name cost (0 same home/away ids, SWAP_PENALTY flipped) + start gap in seconds
+  infeasible when the teams differ or the gap exceeds MAX_START_GAP
+
+Every row also gets an UNMATCHED_COST way out, far above any feasible cost,
+so the solution matches as many events as possible first and then minimizes
+the total start gap. Rows left out get an explicit reason (REASONS); a
+"db_" prefix means the StatsAPI game matched but its mlb_games row didn't.
+
+map_events() runs it twice: vendor events -> StatsAPI games, then the
+matched StatsAPI games -> mlb_games rows. A flipped match keeps the vendor's
+event, so its home/away sides must be taken from the StatsAPI game, never
+the listing (listing_flipped()).
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Games are grouped by slate date in a fixed US-Pacific offset, where every
+# MLB start time (including London/Tokyo series) falls on its local calendar day
+SLATE_TZ = timezone(timedelta(hours=-8))
+MAX_START_GAP = 6 * 3600        # Further apart, same teams means a different (makeup) game
+SWAP_PENALTY = 4 * 3600         # Home/away flipped (neutral-site series listings)
+UNMATCHED_COST = 1e6            # > any feasible cost: matching one more row always wins
+INFEASIBLE = 1e12
+
+UNKNOWN_TEAM = "unknown_team"
+NO_GAME_ON_DATE = "no_game_on_date"
+NO_GAME_FOR_TEAMS = "no_game_for_teams"
+START_TIME_GAP = "start_time_gap"
+GAME_TAKEN = "game_taken"
+REASONS = {
+    UNKNOWN_TEAM: "a team name doesn't resolve to a team_id (queued for alias learning)",
+    NO_GAME_ON_DATE: "no game scheduled on that slate date",
+    NO_GAME_FOR_TEAMS: "these teams don't play each other on that date",
+    START_TIME_GAP: f"same teams, but every start is more than {MAX_START_GAP // 3600}h away",
+    GAME_TAKEN: "its candidate games were all assigned to closer events",
+}
+
+
+def parse_time(value) -> datetime:
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def make_slots(records: List[Dict], identity, id_of: Callable, home_of: Callable, away_of: Callable,
+               time_of: Callable) -> List[Dict]:
+    """Resolve team ids and parse start times once per record"""
+    slots = []
+    for record in records:
+        start = parse_time(time_of(record))
+        slots.append({
+            "id": id_of(record),
+            "home_id": identity.resolve(home_of(record)),
+            "away_id": identity.resolve(away_of(record)),
+            "start": start,
+            "date": start.astimezone(SLATE_TZ).date(),
+            "record": record,
+        })
+    return slots
+
+
+def vendor_slots(events: List[Dict], identity) -> List[Dict]:
+    return make_slots(events, identity, lambda e: e["id"], lambda e: e["home_team"],
+                      lambda e: e["away_team"], lambda e: e["commence_time"])
+
+
+def statsapi_slots(games: List[Dict], identity) -> List[Dict]:
+    return make_slots(games, identity, lambda g: g["gamePk"], lambda g: g["teams"]["home"]["team"]["name"],
+                      lambda g: g["teams"]["away"]["team"]["name"], lambda g: g["gameDate"])
+
+
+def db_slots(games: List[Dict], identity) -> List[Dict]:
+    return make_slots(games, identity, lambda g: g["game_id"], lambda g: g.get("home_name", ""),
+                      lambda g: g.get("away_name", ""), lambda g: g["game_datetime"])
+
+
+def pair_cost(left: Dict, right: Dict) -> Optional[float]:
+    """Cost of matching two slots, None if they can't be the same game"""
+    if (left["home_id"], left["away_id"]) == (right["home_id"], right["away_id"]):
+        name_cost = 0
+    elif (left["home_id"], left["away_id"]) == (right["away_id"], right["home_id"]):
+        name_cost = SWAP_PENALTY
+    else:
+        return None
+    gap = abs((left["start"] - right["start"]).total_seconds())
+    if gap > MAX_START_GAP:
+        return None
+    return name_cost + gap
+
+
+def min_cost_assignment(cost: List[List[float]]) -> List[int]:
+    """Column for each row minimizing the total cost (Hungarian with potentials, rows <= columns)"""
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    inf = float("inf")
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)       # p[j]: row matched to column j (1-based, 0 = free)
+    way = [0] * (m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = cost[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = [-1] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+def _unassigned_reason(left: Dict, rights: List[Dict]) -> str:
+    if not rights:
+        return NO_GAME_ON_DATE
+    teams = {left["home_id"], left["away_id"]}
+    same_teams = [r for r in rights if {r["home_id"], r["away_id"]} == teams]
+    if not same_teams:
+        return NO_GAME_FOR_TEAMS
+    if all(pair_cost(left, r) is None for r in same_teams):
+        return START_TIME_GAP
+    return GAME_TAKEN
+
+
+def assign(lefts: List[Dict], rights: List[Dict]) -> Tuple[Dict, Dict[str, str]]:
+    """({left id: right slot}, {left id: reason}) with each right slot used at most once"""
+    matched, unassigned = {}, {}
+    rights_by_date: Dict = {}
+    for right in rights:
+        if right["home_id"] is not None and right["away_id"] is not None:
+            rights_by_date.setdefault(right["date"], []).append(right)
+
+    lefts_by_date: Dict = {}
+    for left in lefts:
+        if left["home_id"] is None or left["away_id"] is None:
+            unassigned[left["id"]] = UNKNOWN_TEAM
+        else:
+            lefts_by_date.setdefault(left["date"], []).append(left)
+
+    for date, day_lefts in lefts_by_date.items():
+        day_rights = rights_by_date.get(date, [])
+        # One dummy column per row: leaving a row unassigned costs UNMATCHED_COST
+        cost = []
+        for i, left in enumerate(day_lefts):
+            row = []
+            for right in day_rights:
+                c = pair_cost(left, right)
+                row.append(INFEASIBLE if c is None else c)
+            row.extend(UNMATCHED_COST if k == i else INFEASIBLE for k in range(len(day_lefts)))
+            cost.append(row)
+
+        for i, j in enumerate(min_cost_assignment(cost)):
+            left = day_lefts[i]
+            if j < len(day_rights) and cost[i][j] < UNMATCHED_COST:
+                matched[left["id"]] = day_rights[j]
+            else:
+                unassigned[left["id"]] = _unassigned_reason(left, day_rights)
+    return matched, unassigned
+
+
+def listing_flipped(event: Dict, game: Dict, identity) -> bool:
+    """True if a vendor event lists a StatsAPI game's home team as the away team"""
+    return (identity.resolve(event["home_team"]), identity.resolve(event["away_team"])) == (
+        identity.resolve(game["teams"]["away"]["team"]["name"]),
+        identity.resolve(game["teams"]["home"]["team"]["name"]))
+
+
+def map_events(vendor_events: List[Dict], mlb_games: List[Dict], db_games: List[Dict], identity):
+    """{event_id: (event, StatsAPI game, mlb_games row)} and {event_id: reason} for the rest"""
+    identity.learn_statsapi(mlb_games)
+    events = vendor_slots(vendor_events, identity)
+    event_games, unassigned = assign(events, statsapi_slots(mlb_games, identity))
+
+    game_rows, db_unassigned = assign(list(event_games.values()), db_slots(db_games, identity))
+    mapped = {}
+    for event in events:
+        game = event_games.get(event["id"])
+        if game is None:
+            continue
+        row = game_rows.get(game["id"])
+        if row is None:
+            unassigned[event["id"]] = f"db_{db_unassigned.get(game['id'], NO_GAME_ON_DATE)}"
+            continue
+        mapped[event["id"]] = (event["record"], game["record"], row["record"])
+    return mapped, unassigned
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Single-pass build of the cached game-line markets from an /events/{id}/odds payload.
+
+Each outcome goes straight into markets[base_market]["lines"][point]
+["sportsbooks"][book], indexed by (market, point, side/team), with no
+per-bookmaker intermediate dicts and without touching the API payload. The
+entries follow docs/game-lines-schemas.md:
+
+  total   {"is_standard", "over": {...}, "under": {...}}
+  2_way   {"is_standard", "home_team": {..., "team"}, "away_team": {..., "team"}}
+  spread  {"is_standard", "price", "link", "sid", "team"} for the line's team, plus
+          "home_team"/"away_team" so an alternate point both teams share keeps both
+
+A book/line offered by both the standard and the alternate market is merged
+and marked is_standard; where both quote the same side, the standard price
+is kept whichever market comes first in the payload.
+"""
+
+from typing import Dict
+
+
+def base_market_key(market_key: str) -> str:
+    """alternate_spreads -> spreads"""
+    return market_key.replace("alternate_", "") if market_key.startswith("alternate_") else market_key
+
+
+def build_event_markets(event_odds: Dict, game_markets: Dict, book_names: Dict) -> Dict[str, Dict]:
+    """{base market key: market odds} for every market in game_markets"""
+    home_team = event_odds.get("home_team")
+    away_team = event_odds.get("away_team")
+    team_slots = {home_team: "home_team", away_team: "away_team"}
+    markets = {}
+
+    for bookmaker in event_odds.get("bookmakers", []):
+        raw_sportsbook = bookmaker.get("title", "").lower()
+        sportsbook = book_names.get(raw_sportsbook, raw_sportsbook)
+
+        for market in bookmaker.get("markets", []):
+            market_key = market.get("key")
+            base_key = base_market_key(market_key)
+            market_info = game_markets.get(base_key)
+            if market_info is None:
+                continue
+
+            market_type = market_info["market_type"]
+            is_standard = not market_key.startswith("alternate_")
+            odds_data = markets.get(base_key)
+            if odds_data is None:
+                odds_data = markets[base_key] = {
+                    "market_key": base_key,
+                    "market_label": market_info["label"],
+                    "market_type": market_type,
+                    "description": market_info["description"],
+                    "has_alternates": market_info.get("has_alternates", False),
+                    "lines": {}
+                }
+            lines = odds_data["lines"]
+
+            for outcome in market.get("outcomes", []):
+                point = outcome.get("point")
+                if point is None and market_type in ("spread", "total"):
+                    point = outcome.get("handicap")
+                line_key = str(point) if point is not None else "0"
+
+                line = lines.get(line_key)
+                if line is None:
+                    line = lines[line_key] = {"point": point, "sportsbooks": {}}
+                book = line["sportsbooks"].get(sportsbook)
+                if book is None:
+                    book = line["sportsbooks"][sportsbook] = {"is_standard": is_standard}
+                elif is_standard:
+                    book["is_standard"] = True
+                # The alternate market never overwrites a side the standard one quoted
+                keep_standard = book["is_standard"] and not is_standard
+
+                quote = {"price": outcome.get("price"), "link": outcome.get("link"), "sid": outcome.get("id")}
+                name = outcome.get("name", "")
+                if market_type == "total":
+                    side = name.lower()
+                    if side in ("over", "under") and not (keep_standard and side in book):
+                        book[side] = quote
+                    continue
+
+                slot = team_slots.get(name)
+                if slot and not (keep_standard and slot in book):
+                    book[slot] = {**quote, "team": name}
+                if market_type == "spread" and book.get("team") in (None, name) and not (keep_standard and "price" in book):
+                    book.update(quote, team=name)
+
+    return markets
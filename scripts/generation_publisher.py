@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generation-swap publishing of a full odds slate.
+
+While an importer loops over events, readers of the per-key odds:* layout see
+a mix of this run's prices and the previous run's. A GenerationPublisher
+instead writes the whole run into one hash,
+
+    oddsgen:{sport}:{gen}     field = the usual odds key, value = entry JSON
+
+and only when the run is complete flips oddsgen:{sport}:{source}:current to
+the new generation with a single SET. Several crons write odds for the same
+sport (player odds, props, game lines), so each publishes under its own
+source and oddsgen:{sport}:sources lists them. Readers GET every source's
+pointer and HGETALL/HMGET those generations, so every read sees one complete
+run per writer. Unpublished generations (crashed runs) and replaced ones
+expire on their own.
+
+Enabled with ODDS_GENERATIONS=1, which every odds writer honors, so a sport
+with a published generation can be read from generations alone; the per-key
+writes continue alongside.
+"""
+
+import os
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+ODDS_GENERATIONS = os.environ.get("ODDS_GENERATIONS", "0") == "1"
+GEN_PREFIX = "oddsgen"
+FLUSH_EVERY = 500                 # Fields per HSET pipeline while the run is writing
+UNPUBLISHED_TTL = 2 * 3600        # A run that never publishes disappears after this
+REPLACED_GRACE = 10 * 60          # Readers that fetched the old pointer can still finish
+
+
+def current_key(sport: str, source: str) -> str:
+    return f"{GEN_PREFIX}:{sport}:{source}:current"
+
+
+def sources_key(sport: str) -> str:
+    return f"{GEN_PREFIX}:{sport}:sources"
+
+
+def generation_key(sport: str, gen: str) -> str:
+    return f"{GEN_PREFIX}:{sport}:{gen}"
+
+
+def sports_key() -> str:
+    return f"{GEN_PREFIX}:sports"
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class GenerationPublisher:
+    """Collects one run's entries into a new generation and publishes it atomically"""
+
+    def __init__(self, redis_client, sport: str, ttl_seconds: int, source: str):
+        self.redis_client = redis_client
+        self.sport = sport
+        self.source = source
+        self.ttl_seconds = ttl_seconds
+        self.gen = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.pending: Dict[str, str] = {}
+        self.fields_written = 0
+
+    def put(self, key: str, entry):
+        self.pending[key] = entry if isinstance(entry, str) else json.dumps(entry, default=str, separators=(",", ":"))
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(generation_key(self.sport, self.gen), mapping=self.pending)
+        pipe.expire(generation_key(self.sport, self.gen), UNPUBLISHED_TTL)
+        pipe.execute()
+        self.fields_written += len(self.pending)
+        self.pending = {}
+
+    def publish(self) -> Optional[str]:
+        """Flip the current pointer to this generation; returns the replaced one"""
+        self.flush()
+        if not self.fields_written:
+            print(f"⚠️ Nothing written for {self.sport} generation {self.gen}, not publishing")
+            return None
+
+        new_key = generation_key(self.sport, self.gen)
+        self.redis_client.expire(new_key, self.ttl_seconds)
+        previous = _decode(self.redis_client.set(current_key(self.sport, self.source), self.gen, get=True))
+        self.redis_client.sadd(sources_key(self.sport), self.source)
+        self.redis_client.sadd(sports_key(), self.sport)
+        if previous and previous != self.gen:
+            self.redis_client.expire(generation_key(self.sport, previous), REPLACED_GRACE)
+
+        print(f"🔁 Published {self.sport} {self.source} generation {self.gen} ({self.fields_written} entries)"
+              + (f", replacing {previous}" if previous else ""))
+        return previous
+
+
+# ── Readers ─────────────────────────────────────────────
+
+def published_sports(redis_client) -> List[str]:
+    return sorted(_decode(s) for s in redis_client.smembers(sports_key()))
+
+
+def current_generation(redis_client, sport: str, source: str) -> Optional[str]:
+    return _decode(redis_client.get(current_key(sport, source)))
+
+
+def current_generations(redis_client, sport: str) -> Dict[str, str]:
+    """{source: generation} for every source that published this sport"""
+    sources = sorted(_decode(s) for s in redis_client.smembers(sources_key(sport)))
+    if not sources:
+        return {}
+    pipe = redis_client.pipeline(transaction=False)
+    for source in sources:
+        pipe.get(current_key(sport, source))
+    return {source: _decode(gen) for source, gen in zip(sources, pipe.execute()) if gen}
+
+
+def read_generation(redis_client, sport: str, keys: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """{key: entry} from every source's published generation (HGETALL, or HMGET for `keys`)"""
+    gens = current_generations(redis_client, sport)
+    if not gens:
+        return {}
+    pipe = redis_client.pipeline(transaction=False)
+    for gen in gens.values():
+        if keys is None:
+            pipe.hgetall(generation_key(sport, gen))
+        else:
+            pipe.hmget(generation_key(sport, gen), keys)
+    raw = {}
+    for reply in pipe.execute():
+        pairs = reply.items() if keys is None else zip(keys, reply)
+        raw.update((_decode(k), v) for k, v in pairs if v is not None)
+    return {k: json.loads(_decode(v)) for k, v in raw.items()}
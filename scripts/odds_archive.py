@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar archive of odds history for offline analytics.
+
+Every player-odds importer stores through odds_store.store_odds_records, which
+hands the rows it appended to player_odds_history to an OddsArchiveWriter
+(rows whose append failed are archived by the run that retries them). The
+writer stores them as Parquet files under
+
+    {ODDS_ARCHIVE_DIR}/sport={sport_key}/date={YYYY-MM-DD}/{run}-{n}.parquet
+
+with book, market, player and team columns dictionary-encoded and rows sorted
+by (market, player_id) so row-group statistics are selective. read_archive()
+prunes sport/date directories and pushes player/market/book filters down to
+the row groups, so backtests run locally instead of against Supabase.
+
+pyarrow is optional: without it (or without ODDS_ARCHIVE_DIR) open_archive()
+returns None and the importers skip archiving.
+
+Usage: python scripts/odds_archive.py [--sport baseball_mlb] [--player ID]
+                                      [--market Hits] [--from DATE] [--to DATE]
+"""
+
+import os
+import sys
+import uuid
+import argparse
+from datetime import datetime, date, timezone
+from typing import List, Dict, Optional, Iterable
+
+ODDS_ARCHIVE_DIR = os.environ.get("ODDS_ARCHIVE_DIR")
+ROWS_PER_FILE = 250_000
+ROW_GROUP_SIZE = 50_000
+
+# Columns kept in the archive; sport_key and the date are partition directories
+DICTIONARY_COLUMNS = ["sportsbook", "market", "player_name", "team", "home_team", "away_team", "vendor_event_id"]
+SORT_KEYS = [("market", "ascending"), ("player_id", "ascending"), ("created_at", "ascending")]
+
+
+def _schema():
+    import pyarrow as pa
+
+    text = pa.dictionary(pa.int32(), pa.string())
+    ts = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("vendor_event_id", text),
+        ("player_id", pa.int32()),
+        ("player_name", text),
+        ("mlb_game_id", pa.int32()),
+        ("market", text),
+        ("line", pa.float32()),
+        ("team", text),
+        ("is_home", pa.bool_()),
+        ("sportsbook", text),
+        ("over_price", pa.int32()),
+        ("under_price", pa.int32()),
+        ("is_alternative", pa.bool_()),
+        ("home_team", text),
+        ("away_team", text),
+        ("commence_time", ts),
+        ("created_at", ts),
+    ])
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+class OddsArchiveWriter:
+    """Buffers records per (sport, day) partition and writes Parquet files"""
+
+    def __init__(self, root: str, rows_per_file: int = ROWS_PER_FILE):
+        import pyarrow  # noqa: F401  optional dependency, fail early if missing
+
+        self.root = root
+        self.rows_per_file = rows_per_file
+        self.run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.schema = _schema()
+        self.buffers: Dict[tuple, List[Dict]] = {}
+        self.files_written = 0
+        self.rows_written = 0
+
+    def write(self, records: Iterable[Dict]):
+        for record in records:
+            created_at = _parse_ts(record.get("created_at")) or datetime.now(timezone.utc)
+            partition = (record.get("sport_key") or "unknown", created_at.astimezone(timezone.utc).date())
+            buffer = self.buffers.setdefault(partition, [])
+            buffer.append(record)
+            if len(buffer) >= self.rows_per_file:
+                self._flush_partition(partition)
+
+    def _flush_partition(self, partition):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        records = self.buffers.pop(partition, [])
+        if not records:
+            return
+
+        columns = {field.name: [] for field in self.schema}
+        for record in records:
+            for name, values in columns.items():
+                value = record.get(name)
+                values.append(_parse_ts(value) if name in ("commence_time", "created_at") else value)
+        table = pa.Table.from_pydict(columns, schema=self.schema).sort_by(SORT_KEYS)
+
+        sport_key, day = partition
+        directory = os.path.join(self.root, f"sport={sport_key}", f"date={day.isoformat()}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.run_id}-{self.files_written}.parquet")
+        pq.write_table(
+            table, path,
+            row_group_size=ROW_GROUP_SIZE,
+            use_dictionary=DICTIONARY_COLUMNS + ["player_id"],
+            compression="zstd",
+        )
+        self.files_written += 1
+        self.rows_written += len(records)
+
+    def close(self):
+        for partition in list(self.buffers):
+            self._flush_partition(partition)
+        if self.rows_written:
+            print(f"🗄️  Archived {self.rows_written} odds rows to {self.files_written} Parquet files under {self.root}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def open_archive(root: Optional[str] = None) -> Optional[OddsArchiveWriter]:
+    """Open the Parquet archive writer if a directory is configured, else None"""
+    root = root or ODDS_ARCHIVE_DIR
+    if not root:
+        return None
+    try:
+        return OddsArchiveWriter(root)
+    except ImportError:
+        print("⚠️ pyarrow not installed, skipping the Parquet odds archive")
+        return None
+
+
+def read_archive(
+    root: Optional[str] = None,
+    sport_key: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    player_ids: Optional[List[int]] = None,
+    markets: Optional[List[str]] = None,
+    sportsbooks: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+):
+    """Read archived odds as a pyarrow Table.
+
+    sport_key and the date range prune partition directories; player, market
+    and sportsbook filters are pushed down to Parquet row-group statistics.
+    Dates are inclusive.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    root = root or ODDS_ARCHIVE_DIR
+    partitioning = ds.partitioning(pa.schema([("sport", pa.string()), ("date", pa.string())]), flavor="hive")
+    dataset = ds.dataset(root, format="parquet", partitioning=partitioning)
+
+    conditions = []
+    if sport_key:
+        conditions.append(ds.field("sport") == sport_key)
+    if start_date:
+        conditions.append(ds.field("date") >= str(start_date))
+    if end_date:
+        conditions.append(ds.field("date") <= str(end_date))
+    if player_ids:
+        conditions.append(ds.field("player_id").isin(player_ids))
+    if markets:
+        conditions.append(ds.field("market").isin(markets))
+    if sportsbooks:
+        conditions.append(ds.field("sportsbook").isin(sportsbooks))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the local Parquet odds archive")
+    parser.add_argument("--root", default=ODDS_ARCHIVE_DIR)
+    parser.add_argument("--sport", default="baseball_mlb")
+    parser.add_argument("--player", type=int, action="append")
+    parser.add_argument("--market", action="append")
+    parser.add_argument("--book", action="append")
+    parser.add_argument("--from", dest="start_date", type=date.fromisoformat)
+    parser.add_argument("--to", dest="end_date", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    if not args.root:
+        sys.exit("Set ODDS_ARCHIVE_DIR or pass --root")
+
+    table = read_archive(
+        args.root, args.sport, args.start_date, args.end_date,
+        player_ids=args.player, markets=args.market, sportsbooks=args.book,
+    )
+    print(f"📊 {table.num_rows} rows")
+    print(table.slice(0, 20).to_pandas().to_string() if table.num_rows else "")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Redis Streams change feed of odds movements.
+
+Writers that already diff new prices against the previous run (see
+price_change_tracker.py) XADD one compact entry per moved side to a capped
+per-sport stream,
+
+    odds_feed:{sport}   event player market line book side old new ts
+
+so the arb, EV and alerting jobs can react to movements through a consumer
+group instead of polling and rescanning every odds key. old is empty for a
+prop/side seen for the first time.
+
+ChangeFeedConsumer reads with XREADGROUP and acknowledges each entry once,
+after its handler returned. Entries whose handler raised, or whose consumer
+died, stay pending and are claimed again after CLAIM_IDLE_MS, so handlers
+should be idempotent.
+
+Enabled with ODDS_CHANGE_FEED=1. Run directly to tail a stream:
+python scripts/odds_change_feed.py [sport] [group]
+"""
+
+import os
+import sys
+import socket
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+ODDS_CHANGE_FEED = os.environ.get("ODDS_CHANGE_FEED", "0") == "1"
+FEED_PREFIX = "odds_feed"
+STREAM_MAXLEN = int(os.environ.get("ODDS_FEED_MAXLEN", "200000"))  # Approximate cap per sport
+XADD_CHUNK = 1000
+CLAIM_IDLE_MS = 5 * 60 * 1000
+FIELDS = ("event", "player", "market", "line", "book", "side", "old", "new", "ts")
+
+
+def stream_key(sport: str) -> str:
+    return f"{FEED_PREFIX}:{sport}"
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _price(value) -> str:
+    return "" if value in (None, "None") else str(value)
+
+
+def movements(record: Dict, previous: Optional[str], ts: str) -> List[Dict]:
+    """Feed entries for the sides of a player_odds record whose price differs from previous "over|under" """
+    old_over, old_under = (previous or "|").split("|", 1)
+    moves = []
+    for side, old in (("over", old_over), ("under", old_under)):
+        new = _price(record.get(f"{side}_price"))
+        old = _price(old)
+        if new and new != old:
+            moves.append({
+                "event": record.get("vendor_event_id"),
+                "player": record.get("player_id"),
+                "market": record.get("market"),
+                "line": record.get("line"),
+                "book": record.get("sportsbook"),
+                "side": side,
+                "old": old,
+                "new": new,
+                "ts": ts,
+            })
+    return moves
+
+
+def publish_movements(redis_client, sport: str, moves: List[Tuple[Dict, Optional[str]]]) -> int:
+    """XADD the movements of (record, previous price) pairs, e.g. PriceChangeTracker.moves"""
+    ts = datetime.now(timezone.utc).isoformat()
+    entries = [m for record, previous in moves for m in movements(record, previous, ts)]
+    key = stream_key(sport)
+    for i in range(0, len(entries), XADD_CHUNK):
+        pipe = redis_client.pipeline(transaction=False)
+        for entry in entries[i:i + XADD_CHUNK]:
+            pipe.xadd(key, {f: "" if entry[f] is None else str(entry[f]) for f in FIELDS},
+                      maxlen=STREAM_MAXLEN, approximate=True)
+        pipe.execute()
+    if entries:
+        print(f"📡 Published {len(entries)} price movements to {key}")
+    return len(entries)
+
+
+class ChangeFeedConsumer:
+    """Consumer-group reader of one sport's movement stream"""
+
+    def __init__(self, redis_client, sport: str, group: str, consumer: Optional[str] = None):
+        self.redis_client = redis_client
+        self.key = stream_key(sport)
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._ensure_group()
+
+    def _ensure_group(self):
+        try:
+            # New groups start at the end of the stream; MKSTREAM so readers can start before writers
+            self.redis_client.xgroup_create(self.key, self.group, id="$", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def _entries(raw) -> List[Tuple[str, Dict]]:
+        return [(_decode(entry_id), {_decode(k): _decode(v) for k, v in fields.items()})
+                for entry_id, fields in raw or [] if fields is not None]
+
+    def claim_stale(self, count: int = 100) -> List[Tuple[str, Dict]]:
+        """Pending entries other consumers left unacknowledged for CLAIM_IDLE_MS"""
+        reply = self.redis_client.xautoclaim(self.key, self.group, self.consumer, CLAIM_IDLE_MS, count=count)
+        return self._entries(reply[1])
+
+    def read(self, count: int = 100, block_ms: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        """New entries for this consumer ([] after block_ms without any)"""
+        reply = self.redis_client.xreadgroup(self.group, self.consumer, {self.key: ">"}, count=count, block=block_ms)
+        return self._entries(reply[0][1]) if reply else []
+
+    def ack(self, entry_ids: List[str]) -> int:
+        return self.redis_client.xack(self.key, self.group, *entry_ids) if entry_ids else 0
+
+    def process(self, handler: Callable[[Dict], None], count: int = 100, block_ms: Optional[int] = None) -> int:
+        """Run handler over stale then new entries; ack each one once its handler returned"""
+        entries = self.claim_stale(count) + self.read(count, block_ms)
+        done = []
+        for entry_id, movement in entries:
+            try:
+                handler(movement)
+            except Exception as e:
+                print(f"⚠️ Handler failed for {self.key} {entry_id}, leaving it pending: {e}")
+                continue
+            done.append(entry_id)
+        self.ack(done)
+        return len(done)
+
+
+def main():
+    sport = sys.argv[1] if len(sys.argv) > 1 else "baseball_mlb"
+    group = sys.argv[2] if len(sys.argv) > 2 else "tail"
+    from upstash_rest import create_redis_client
+    redis_client = create_redis_client(os.environ["UPSTASH_REDIS_REST_URL"], os.environ["UPSTASH_REDIS_REST_TOKEN"])
+
+    def show(m):
+        print(f"{m['ts']}  {m['book']:<14} {m['player']:>8} {m['market']:<24} {m['line']:>5} {m['side']:<5} "
+              f"{m['old'] or '—':>6} → {m['new']}")
+
+    consumer = ChangeFeedConsumer(redis_client, sport, group)
+    print(f"👀 Tailing {consumer.key} as {group}/{consumer.consumer} (Ctrl-C to stop)")
+    while True:
+        consumer.process(show, block_ms=5000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+-- Change-only odds storage
+--
+-- player_odds_current holds one row per (event, player, market, line, book) and
+-- is upserted in place on every import run. player_odds_history becomes an
+-- append-only log: the importer only appends a row when the over or under
+-- price moved since the last run (tracked in the per-event odds_last_price:{sport}:{event_id}
+-- Redis hashes, which expire with the event).
+--
+-- Rows of games that already started are deleted by the importer
+-- (purge_started_current_odds), and readers filter on commence_time >= now().
+--
+-- Unlike player_odds_history in database_schema.sql, mlb_game_id has no
+-- REFERENCES mlb_games(game_id) ON DELETE CASCADE: the foreign key is dropped
+-- on purpose so the importer's in-place upserts never fail (or cascade) while
+-- the game loaders replace schedule rows; rows are cleaned up by commence_time.
+CREATE TABLE player_odds_current (
+  id BIGSERIAL PRIMARY KEY,
+
+  -- Vendor identification
+  vendor_event_id TEXT NOT NULL,
+  vendor_name TEXT NOT NULL,
+
+  player_id INTEGER NOT NULL REFERENCES mlb_players(player_id) ON DELETE CASCADE,
+  player_name TEXT NOT NULL,
+  mlb_game_id INTEGER NOT NULL,
+  market TEXT NOT NULL,
+  line DECIMAL(4,1) NOT NULL,
+
+  -- Player team context
+  team TEXT NOT NULL,
+  is_home BOOLEAN NOT NULL,
+
+  -- Sportsbook specific odds
+  sportsbook TEXT NOT NULL,
+  over_price INTEGER,
+  under_price INTEGER,
+  over_link TEXT,
+  under_link TEXT,
+  over_sid TEXT,
+  under_sid TEXT,
+  is_alternative BOOLEAN NOT NULL DEFAULT false,
+
+  -- Game metadata
+  home_team TEXT NOT NULL,
+  away_team TEXT NOT NULL,
+  commence_time TIMESTAMPTZ,
+  sport_key TEXT DEFAULT 'baseball_mlb',
+
+  -- Tracking
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+  CONSTRAINT unique_current_odds UNIQUE (vendor_event_id, player_id, market, line, sportsbook)
+);
+
+CREATE INDEX idx_current_odds_player_market ON player_odds_current (player_id, market);
+CREATE INDEX idx_current_odds_commence ON player_odds_current (commence_time);
+CREATE INDEX idx_current_odds_book_main ON player_odds_current (sportsbook, market) WHERE is_alternative = false;
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retention job for the daily-partitioned player_odds_history table.
+
+Creates partitions a few days ahead (so rows never land in the default
+partition) and detaches + drops whole partitions older than the retention
+window. Requires the partition_odds_history.sql migration and a direct
+Postgres connection (SUPABASE_DB_URL); DDL can't go through PostgREST.
+"""
+
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+
+from compact_odds_history import compact
+
+SUPABASE_DB_URL = os.environ["SUPABASE_DB_URL"]
+DAYS_TO_KEEP = int(os.environ.get("ODDS_HISTORY_DAYS_TO_KEEP", "7"))
+DAYS_AHEAD = 7
+
+PARENT_TABLE = "player_odds_history"
+PARTITION_PATTERN = re.compile(rf"^{PARENT_TABLE}_p(\d{{8}})$")
+
+
+def list_partitions(conn):
+    """Daily partitions of the parent table as {name: day}"""
+    rows = conn.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        """,
+        (PARENT_TABLE,)
+    ).fetchall()
+
+    partitions = {}
+    for (name,) in rows:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions[name] = datetime.strptime(match.group(1), "%Y%m%d").date()
+    return partitions
+
+
+def create_future_partitions(conn, days_ahead=DAYS_AHEAD):
+    today = datetime.now(timezone.utc).date()
+    for offset in range(days_ahead + 1):
+        conn.execute("SELECT create_odds_history_partition(%s)", (today + timedelta(days=offset),))
+    print(f"📅 Partitions exist through {today + timedelta(days=days_ahead)}")
+
+
+def drop_old_partitions(conn, days_to_keep=DAYS_TO_KEEP):
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=days_to_keep)
+    expired = sorted(name for name, day in list_partitions(conn).items() if day < cutoff)
+
+    if not expired:
+        print(f"✅ No partitions older than {cutoff}")
+        return 0
+
+    for name in expired:
+        # Metadata-only, so the lock on the parent is brief. (CONCURRENTLY isn't
+        # allowed while the table has a default partition.)
+        conn.execute(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{name}"')
+        conn.execute(f'DROP TABLE "{name}"')
+        print(f"🗑️  Dropped partition {name}")
+
+    print(f"✅ Dropped {len(expired)} partitions older than {cutoff}")
+    return len(expired)
+
+
+def compact_before_drop(conn):
+    """Fold history into price runs first so dropped partitions lose nothing"""
+    if conn.execute("SELECT to_regprocedure('compact_odds_history(timestamptz)')").fetchone()[0]:
+        compact(conn)
+
+
+def main():
+    # autocommit: each DETACH/DROP commits on its own and releases its lock
+    with psycopg.connect(SUPABASE_DB_URL, autocommit=True) as conn:
+        create_future_partitions(conn)
+        compact_before_drop(conn)
+        drop_old_partitions(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+-- Price runs compacted from player_odds_history
+--
+-- Consecutive snapshots with the same over/under price for a
+-- (vendor_event_id, player_id, market, line, sportsbook) key collapse into one
+-- row valid over [valid_from, valid_to). valid_to is NULL for the run that is
+-- still open. compact_odds_history() is run by compact_odds_history.py (and
+-- before partitions are dropped by odds_history_retention.py).
+
+CREATE TABLE IF NOT EXISTS player_odds_intervals (
+  id BIGSERIAL PRIMARY KEY,
+  vendor_event_id TEXT NOT NULL,
+  player_id INTEGER NOT NULL,
+  market TEXT NOT NULL,
+  line DECIMAL(4,1) NOT NULL,
+  sportsbook TEXT NOT NULL,
+  over_price INTEGER,
+  under_price INTEGER,
+  valid_from TIMESTAMPTZ NOT NULL,
+  valid_to TIMESTAMPTZ,
+
+  -- Also the point-in-time index: key equality + valid_from <= T, newest first
+  CONSTRAINT unique_odds_interval UNIQUE (vendor_event_id, player_id, market, line, sportsbook, valid_from)
+);
+
+-- Line movement for a player's market across events and books
+CREATE INDEX IF NOT EXISTS idx_odds_intervals_player_market ON player_odds_intervals (player_id, market, valid_from);
+-- Open runs are re-read on every compaction
+CREATE INDEX IF NOT EXISTS idx_odds_intervals_open ON player_odds_intervals (vendor_event_id, player_id, market, line, sportsbook) WHERE valid_to IS NULL;
+
+-- The importer stamps created_at when it processes an event but writes history
+-- at the end of the run, so a row can commit long after its created_at and
+-- after a compaction whose watermark already passed it. Compaction therefore
+-- tracks inserted_at, set by the database on insert. Rows from before this
+-- column existed keep NULL and are still read by created_at.
+ALTER TABLE player_odds_history ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMPTZ;
+ALTER TABLE player_odds_history ALTER COLUMN inserted_at SET DEFAULT NOW();
+CREATE INDEX IF NOT EXISTS idx_odds_history_inserted_at ON player_odds_history (inserted_at);
+
+CREATE TABLE IF NOT EXISTS odds_compaction_state (
+  source TEXT PRIMARY KEY,
+  compacted_through TIMESTAMPTZ NOT NULL
+);
+
+-- Fold history rows inserted in (compacted_through, through] into price runs.
+-- Open runs of the keys seen are reopened so a repeated price extends them
+-- instead of starting a new run. inserted_at is the transaction start of the
+-- insert, so the default 5 minute lag only has to cover one batch's commit,
+-- not a whole importer run.
+CREATE OR REPLACE FUNCTION compact_odds_history(through TIMESTAMPTZ DEFAULT NOW() - INTERVAL '5 minutes')
+RETURNS TABLE (points_read BIGINT, intervals_written BIGINT)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  since TIMESTAMPTZ;
+BEGIN
+  INSERT INTO odds_compaction_state (source, compacted_through)
+  VALUES ('player_odds_history', '-infinity')
+  ON CONFLICT (source) DO NOTHING;
+
+  SELECT s.compacted_through INTO since
+  FROM odds_compaction_state s
+  WHERE s.source = 'player_odds_history'
+  FOR UPDATE;
+
+  points_read := 0;
+  intervals_written := 0;
+  IF through <= since THEN
+    RETURN NEXT;
+    RETURN;
+  END IF;
+
+  DROP TABLE IF EXISTS _compaction_points;
+  CREATE TEMP TABLE _compaction_points ON COMMIT DROP AS
+  SELECT h.vendor_event_id, h.player_id, h.market, h.line, h.sportsbook,
+         h.over_price, h.under_price, h.created_at AS observed_at
+  FROM player_odds_history h
+  WHERE h.inserted_at > since AND h.inserted_at <= through
+  UNION ALL
+  -- Separate branch so the created_at bounds still prune partitions
+  SELECT h.vendor_event_id, h.player_id, h.market, h.line, h.sportsbook,
+         h.over_price, h.under_price, h.created_at
+  FROM player_odds_history h
+  WHERE h.inserted_at IS NULL AND h.created_at > since AND h.created_at <= through;
+  SELECT count(*) INTO points_read FROM _compaction_points;
+
+  WITH reopened AS (
+    DELETE FROM player_odds_intervals i
+    USING (SELECT DISTINCT vendor_event_id, player_id, market, line, sportsbook FROM _compaction_points) k
+    WHERE i.valid_to IS NULL
+      AND i.vendor_event_id = k.vendor_event_id AND i.player_id = k.player_id
+      AND i.market = k.market AND i.line = k.line AND i.sportsbook = k.sportsbook
+    RETURNING i.vendor_event_id, i.player_id, i.market, i.line, i.sportsbook,
+              i.over_price, i.under_price, i.valid_from
+  )
+  INSERT INTO _compaction_points SELECT * FROM reopened;
+
+  INSERT INTO player_odds_intervals (vendor_event_id, player_id, market, line, sportsbook,
+                                     over_price, under_price, valid_from, valid_to)
+  SELECT p.vendor_event_id, p.player_id, p.market, p.line, p.sportsbook,
+         p.over_price, p.under_price, p.observed_at,
+         LEAD(p.observed_at) OVER w
+  FROM (
+    SELECT c.*,
+           LAG(c.observed_at) OVER w IS NULL
+           OR c.over_price IS DISTINCT FROM LAG(c.over_price) OVER w
+           OR c.under_price IS DISTINCT FROM LAG(c.under_price) OVER w AS starts_run
+    FROM _compaction_points c
+    WINDOW w AS (PARTITION BY c.vendor_event_id, c.player_id, c.market, c.line, c.sportsbook ORDER BY c.observed_at)
+  ) p
+  WHERE p.starts_run
+  WINDOW w AS (PARTITION BY p.vendor_event_id, p.player_id, p.market, p.line, p.sportsbook ORDER BY p.observed_at);
+  GET DIAGNOSTICS intervals_written = ROW_COUNT;
+
+  UPDATE odds_compaction_state SET compacted_through = through WHERE source = 'player_odds_history';
+  RETURN NEXT;
+END;
+$$;
+
+-- Price at time T for one prop at one book (uses unique_odds_interval)
+CREATE OR REPLACE FUNCTION odds_price_at(
+  p_vendor_event_id TEXT, p_player_id INTEGER, p_market TEXT, p_line DECIMAL, p_sportsbook TEXT, p_at TIMESTAMPTZ
+)
+RETURNS TABLE (over_price INTEGER, under_price INTEGER, valid_from TIMESTAMPTZ, valid_to TIMESTAMPTZ)
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT i.over_price, i.under_price, i.valid_from, i.valid_to
+  FROM player_odds_intervals i
+  WHERE i.vendor_event_id = p_vendor_event_id
+    AND i.player_id = p_player_id
+    AND i.market = p_market
+    AND i.line = p_line
+    AND i.sportsbook = p_sportsbook
+    AND i.valid_from <= p_at
+  ORDER BY i.valid_from DESC
+  LIMIT 1
+$$;
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Database write path shared by every player-odds importer.
+
+A run's records are stored the same way whichever cron produced them:
+
+  1) player_odds_current: one row per (event, player, market, line, book),
+     upserted in place; rows of games that already started are purged
+  2) player_odds_history: append-only, and only for keys whose over/under
+     price moved since the last run (PriceChangeTracker); rows whose append
+     failed stay uncommitted in the tracker so the next run retries them
+  3) the movements that made it into history go to the change feed and the
+     line-movement series when enabled, and the rows to the Parquet archive
+
+store_odds_records() runs all three; the importers only build records.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from supabase import create_client
+
+from pg_copy_sink import open_copy_sink
+from upsert_utils import ConcurrentUpsertWriter, dedupe_by_conflict_key, per_thread_client
+from price_change_tracker import PriceChangeTracker, price_key
+from odds_archive import open_archive
+from odds_change_feed import ODDS_CHANGE_FEED, publish_movements
+from odds_timeseries import ODDS_TIMESERIES, record_movements
+
+BATCH_SIZE = 500  # Database batch insert size
+ODDS_CURRENT_CONFLICT = "vendor_event_id,player_id,market,line,sportsbook"
+ODDS_HISTORY_CONFLICT = "vendor_event_id,player_id,market,line,sportsbook,created_at"
+MAX_IN_FLIGHT = int(os.environ.get("UPSERT_MAX_IN_FLIGHT", "4"))  # Concurrent upsert requests
+
+
+class DatabaseBatch:
+    """Efficient database batch operations"""
+
+    def __init__(self, supabase_client, table="player_odds_history", on_conflict=ODDS_HISTORY_CONFLICT,
+                 batch_size=BATCH_SIZE, copy_sink=None, max_in_flight=MAX_IN_FLIGHT):
+        self.supabase = supabase_client
+        # Worker threads each get their own client with the same credentials
+        self.client = per_thread_client(
+            lambda: create_client(supabase_client.supabase_url, supabase_client.supabase_key))
+        self.table = table
+        self.on_conflict = on_conflict
+        self.batch_size = batch_size
+        self.copy_sink = copy_sink  # Optional direct-Postgres COPY sink
+        self.records = []
+
+        # Batches are sent in the background with bounded concurrency; failing
+        # batches are bisected and bad rows dead-lettered. The COPY sink shares
+        # a single connection, so it runs one batch at a time.
+        self.writer = ConcurrentUpsertWriter(
+            self._send,
+            table,
+            batch_size=batch_size,
+            max_in_flight=1 if copy_sink else max_in_flight
+        )
+
+    def add_record(self, record):
+        """Add a record to the batch"""
+        self.records.append(record)
+
+        if len(self.records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Send all pending records (blocks while max_in_flight batches are outstanding)"""
+        if not self.records:
+            return
+
+        self.writer.submit(self.records)
+        self.records = []
+
+    def close(self):
+        """Flush and wait for every in-flight batch"""
+        self.flush()
+        self.writer.close()
+
+        failures = self.writer.failures
+        if failures:
+            print(f"❌ Database insert error: {len(failures)} records not written "
+                  f"({len(self.writer.rejected)} bad records isolated)")
+            print(f"Sample error: {failures[0][1]}")
+
+        committed = self.writer.records_submitted - len(failures)
+        print(f"✅ Inserted {committed} odds records into {self.table}")
+
+    def _send(self, records):
+        """Upsert one batch, raising on failure"""
+        if self.copy_sink:
+            # COPY into a staging table + one merge instead of a JSON upsert
+            self.copy_sink.upsert(self.table, records, self.on_conflict)
+            return records
+
+        # Use upsert to handle duplicates
+        result = (
+            self.client()
+            .from_(self.table)
+            .upsert(records, on_conflict=self.on_conflict)
+            .execute()
+        )
+        return result.data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def purge_started_current_odds(supabase):
+    """Delete player_odds_current rows of games that already started.
+
+    Rows are upserted in place and nothing else removes them, so without this
+    finished games would pile up in the table and its readers.
+    """
+    cutoff = datetime.now(timezone.utc).isoformat()
+    try:
+        result = supabase.table("player_odds_current").delete().lt("commence_time", cutoff).execute()
+        print(f"🧹 Purged {len(result.data or [])} current odds rows of started games")
+    except Exception as e:
+        print(f"WARNING: Failed to purge started games from player_odds_current: {e}")
+
+
+def store_odds_records(supabase, redis_client, sport_key: str, records: List[Dict]) -> List[Dict]:
+    """Write one run's records to current odds, change-only history and the archive.
+
+    Returns the records deduplicated on the current-odds key, which callers
+    should use for anything else they store (e.g. the Redis odds cache).
+    """
+    # Collapse standard/alternate duplicates that share the upsert conflict key
+    records, _ = dedupe_by_conflict_key(records, ODDS_CURRENT_CONFLICT, "is_alternative")
+
+    # With a direct Postgres URL each table gets one COPY + merge
+    copy_sink = open_copy_sink()
+    try:
+        # 1) Current odds: one row per key, upserted in place every run
+        batch_size = len(records) if copy_sink else BATCH_SIZE
+        with DatabaseBatch(supabase, "player_odds_current", ODDS_CURRENT_CONFLICT,
+                           batch_size=batch_size, copy_sink=copy_sink) as batch:
+            for record in records:
+                batch.add_record(record)
+
+        purge_started_current_odds(supabase)
+
+        # 2) History: append-only, and only for prices that moved since the last run
+        tracker = PriceChangeTracker(sport_key, redis_client)
+        changed_records = tracker.changed_records(records)
+        if changed_records:
+            batch_size = len(changed_records) if copy_sink else BATCH_SIZE
+            with DatabaseBatch(supabase, "player_odds_history", ODDS_HISTORY_CONFLICT,
+                               batch_size=batch_size, copy_sink=copy_sink) as history_batch:
+                for record in changed_records:
+                    history_batch.add_record(record)
+            failed = [record for record, _ in history_batch.writer.failures]
+            tracker.commit(failed)
+
+            # Movements that made it into history also go to the change feed
+            if ODDS_CHANGE_FEED and redis_client:
+                publish_movements(redis_client, sport_key, tracker.moves)
+            # ... and into the downsampled line-movement series
+            if ODDS_TIMESERIES and redis_client:
+                record_movements(redis_client, sport_key, tracker.moves)
+
+            # 3) Rows that made it into history into the local Parquet archive;
+            # failed rows are retried (and archived) by the next run
+            archive = open_archive()
+            if archive:
+                failed_keys = {price_key(record) for record in failed}
+                with archive:
+                    archive.write([r for r in changed_records if price_key(r) not in failed_keys])
+    finally:
+        if copy_sink:
+            copy_sink.close()
+    return records
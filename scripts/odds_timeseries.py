@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Line-movement time series per prop, downsampled in Redis.
+
+store_current_odds_in_redis overwrites prices, so the only record of how a
+line moved is the ever-growing player_odds_history table. Every price
+movement the importer sees (the same (record, previous price) pairs the
+change feed publishes) is also recorded as a tick in sorted sets scored by
+epoch seconds:
+
+    odds_ts:{sport}:raw:{player}:{market}:{line}:{book}:{side}   member "ts:price"
+    odds_ts:{sport}:1m:...   odds_ts:{sport}:5m:...   odds_ts:{sport}:1h:...
+                                                           member "bucket|open|close|min|max"
+
+One Lua call per tick appends the raw tick and folds it into the open/close/
+min/max bucket of every resolution, then trims each set to its retention
+(RESOLUTIONS) and refreshes the key TTL, so memory stays bounded without a
+cleanup job. movement_series() reads any number of props at one resolution in
+a single pipelined round-trip for charting.
+
+Enabled with ODDS_TIMESERIES=1.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from odds_change_feed import movements
+
+ODDS_TIMESERIES = os.environ.get("ODDS_TIMESERIES", "0") == "1"
+TS_PREFIX = "odds_ts"
+RAW_RETENTION = 24 * 3600
+TICK_CHUNK = 500
+
+# resolution -> (bucket width, retention) in seconds
+RESOLUTIONS = {
+    "1m": (60, 2 * 24 * 3600),
+    "5m": (5 * 60, 7 * 24 * 3600),
+    "1h": (3600, 30 * 24 * 3600),
+}
+
+# KEYS[1] raw set, KEYS[2..] one set per resolution
+# ARGV[1] tick epoch seconds, ARGV[2] price, ARGV[3] raw retention,
+# ARGV[2k], ARGV[2k + 1] bucket width and retention for KEYS[k]
+RECORD_TICK_LUA = """
+local ts = tonumber(ARGV[1])
+local price = tonumber(ARGV[2])
+local raw_retention = tonumber(ARGV[3])
+redis.call('ZADD', KEYS[1], ts, ARGV[1] .. ':' .. ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. (ts - raw_retention))
+redis.call('EXPIRE', KEYS[1], raw_retention)
+
+for k = 2, #KEYS do
+  local width = tonumber(ARGV[2 * k])
+  local retention = tonumber(ARGV[2 * k + 1])
+  local bucket = ts - ts % width
+  local open, low, high = price, price, price
+  local existing = redis.call('ZRANGEBYSCORE', KEYS[k], bucket, bucket)
+  if existing[1] then
+    local _, o, _, lo, hi = string.match(existing[1], '([^|]+)|([^|]+)|([^|]+)|([^|]+)|([^|]+)')
+    open = tonumber(o)
+    low = math.min(tonumber(lo), price)
+    high = math.max(tonumber(hi), price)
+    redis.call('ZREMRANGEBYSCORE', KEYS[k], bucket, bucket)
+  end
+  redis.call('ZADD', KEYS[k], bucket, table.concat({bucket, open, price, low, high}, '|'))
+  redis.call('ZREMRANGEBYSCORE', KEYS[k], '-inf', '(' .. (bucket - retention))
+  redis.call('EXPIRE', KEYS[k], retention)
+end
+return #KEYS
+"""
+
+
+def series_key(sport: str, resolution: str, player, market: str, line, book: str, side: str) -> str:
+    return f"{TS_PREFIX}:{sport}:{resolution}:{player}:{market}:{line}:{book}:{side}"
+
+
+def _epoch(ts) -> int:
+    if isinstance(ts, (int, float)):
+        return int(ts)
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    return int(ts.timestamp())
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class TickWriter:
+    """Pipelines RECORD_TICK_LUA calls for a batch of price ticks"""
+
+    def __init__(self, redis_client, sport: str):
+        self.redis_client = redis_client
+        self.sport = sport
+        self.sha = redis_client.script_load(RECORD_TICK_LUA)
+        self.ticks: List[Tuple] = []
+
+    def add(self, player, market: str, line, book: str, side: str, price, ts):
+        self.ticks.append((player, market, line, book, side, price, _epoch(ts)))
+        if len(self.ticks) >= TICK_CHUNK:
+            self.flush()
+
+    def _pipeline(self, ticks):
+        pipe = self.redis_client.pipeline(transaction=False)
+        for player, market, line, book, side, price, ts in ticks:
+            keys = [series_key(self.sport, "raw", player, market, line, book, side)]
+            args = [ts, price, RAW_RETENTION]
+            for resolution, (width, retention) in RESOLUTIONS.items():
+                keys.append(series_key(self.sport, resolution, player, market, line, book, side))
+                args += [width, retention]
+            pipe.evalsha(self.sha, len(keys), *keys, *args)
+        return pipe
+
+    def flush(self) -> int:
+        ticks, self.ticks = self.ticks, []
+        if not ticks:
+            return 0
+        try:
+            self._pipeline(ticks).execute()
+        except Exception as e:
+            if "NOSCRIPT" not in str(e):
+                raise
+            # Script cache was flushed; replaying a tick gives the same buckets
+            self.sha = self.redis_client.script_load(RECORD_TICK_LUA)
+            self._pipeline(ticks).execute()
+        return len(ticks)
+
+
+def record_movements(redis_client, sport: str, moves: List[Tuple[Dict, Optional[str]]]) -> int:
+    """Record ticks for (record, previous price) pairs, e.g. PriceChangeTracker.moves"""
+    ts = datetime.now(timezone.utc).isoformat()
+    writer = TickWriter(redis_client, sport)
+    for record, previous in moves:
+        for m in movements(record, previous, ts):
+            writer.add(m["player"], m["market"], m["line"], m["book"], m["side"], m["new"], ts)
+    written = len(writer.ticks)
+    writer.flush()
+    if written:
+        print(f"📈 Recorded {written} price ticks for {sport}")
+    return written
+
+
+# ── Reader ─────────────────────────────────────────────
+
+def _parse_member(resolution: str, member: str) -> Dict:
+    if resolution == "raw":
+        ts, price = member.split(":", 1)
+        price = float(price)
+        return {"t": int(ts), "open": price, "close": price, "min": price, "max": price}
+    bucket, open_, close, low, high = member.split("|")
+    return {"t": int(bucket), "open": float(open_), "close": float(close), "min": float(low), "max": float(high)}
+
+
+def movement_series(redis_client, sport: str, props: List[Dict], resolution: str = "5m",
+                    since=None, until=None) -> Dict[Tuple, List[Dict]]:
+    """{(player, market, line, book, side): [{t, open, close, min, max}, ...]} in one round-trip
+
+    props are dicts with player, market, line, book and side; since/until are
+    epoch seconds, datetimes or ISO strings.
+    """
+    low = _epoch(since) if since is not None else "-inf"
+    high = _epoch(until) if until is not None else "+inf"
+    fields = ("player", "market", "line", "book", "side")
+    pipe = redis_client.pipeline(transaction=False)
+    for prop in props:
+        pipe.zrangebyscore(series_key(sport, resolution, *(prop[f] for f in fields)), low, high)
+    return {
+        tuple(prop[f] for f in fields): [_parse_member(resolution, _decode(m)) for m in members]
+        for prop, members in zip(props, pipe.execute())
+    }
@@ -1,59 +1,72 @@
-import sys
 import os
 import requests
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 import unicodedata
 import re
 from supabase import create_client
 import concurrent.futures
 from typing import List, Dict, Any
 import time
+from pg_copy_sink import open_copy_sink
+from upsert_utils import ConcurrentUpsertWriter, dedupe_by_conflict_key, per_thread_client
+from upstash_rest import create_redis_client
+from events_cache import upcoming_events
 
 # Use Pipedream environment variables
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_KEY"]
 ODDS_API_KEY = os.environ["ODDS_API_KEY"]
 ODDS_API_BASE_URL = os.environ["ODDS_API_BASE_URL"]
+UPSTASH_URL = os.environ.get("UPSTASH_REDIS_REST_URL")
+UPSTASH_TOKEN = os.environ.get("UPSTASH_REDIS_REST_TOKEN")
 
 # Initialize a single client
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Optional Redis, only for the shared events cache
+redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN) if UPSTASH_URL and UPSTASH_TOKEN else None
+
+# Optional direct-Postgres COPY sink (only when SUPABASE_DB_URL is set)
+copy_sink = open_copy_sink()
+
 # ============= OPTIMIZED DATABASE OPERATIONS =============
 
-def batch_upsert(table: str, data: List[Dict], batch_size: int = 1000):
+PROP_ODDS_CONFLICT = "league_id,player_id,market,line,sportsbook,odds_event_id"
+MAX_IN_FLIGHT = int(os.environ.get("UPSERT_MAX_IN_FLIGHT", "4"))  # Concurrent upsert requests
+
+def batch_upsert(table: str, data: List[Dict], batch_size: int = 1000, max_in_flight: int = MAX_IN_FLIGHT):
     """Batch upsert rows into Supabase table for better performance."""
     if not data:
         return []
     
-    results = []
-    total_batches = (len(data) + batch_size - 1) // batch_size
+    # Standard and alternate quotes for the same line/book share a conflict key;
+    # Postgres rejects a batch that touches one key twice, so merge them first
+    data, _ = dedupe_by_conflict_key(data, PROP_ODDS_CONFLICT, "is_alternate")
     
-    for i in range(0, len(data), batch_size):
-        batch = data[i:i + batch_size]
-        batch_num = (i // batch_size) + 1
-        
+    if copy_sink:
+        # One COPY into a staging table + one merge for the whole slate
         try:
-            print(f"  📦 Upserting batch {batch_num}/{total_batches} ({len(batch)} records)")
-            response = supabase.table(table).upsert(
-                batch,
-                on_conflict="league_id,player_id,market,line,sportsbook,odds_event_id"
-            ).execute()
-            
-            if response.data:
-                results.extend(response.data)
-                
+            print(f"  🐘 COPY-merging {len(data)} records into {table}")
+            copy_sink.upsert(table, data, PROP_ODDS_CONFLICT)
+            return data
         except Exception as e:
-            print(f"  ❌ Error in batch {batch_num}: {e}")
-            # Try individual inserts as fallback
-            for record in batch:
-                try:
-                    response = supabase.table(table).upsert([record]).execute()
-                    if response.data:
-                        results.extend(response.data)
-                except Exception as individual_error:
-                    print(f"    ❌ Failed individual record: {individual_error}")
+            print(f"  ❌ COPY sink failed, falling back to batched upserts: {e}")
     
-    return results
+    total_batches = (len(data) + batch_size - 1) // batch_size
+    print(f"  📦 Upserting {total_batches} batches of up to {batch_size} records ({max_in_flight} in flight)")
+    
+    # One client per worker thread; the shared client's session isn't thread-safe
+    client = per_thread_client(lambda: create_client(SUPABASE_URL, SUPABASE_KEY))
+    
+    def send(records):
+        return client().table(table).upsert(records, on_conflict=PROP_ODDS_CONFLICT).execute().data
+    
+    # Failing batches are split in half recursively to isolate bad rows
+    with ConcurrentUpsertWriter(send, table, batch_size=batch_size, max_in_flight=max_in_flight) as writer:
+        for i in range(0, len(data), batch_size):
+            writer.submit(data[i:i + batch_size])
+    
+    return writer.results
 
 def fetch_players_cached():
     """Fetch players with basic caching logic."""
@@ -332,8 +345,9 @@ def parse_all_props(all_event_props: Dict[str, Any], player_lookup: Dict[str, in
                         total_unmatched_players.add(player_name)
                         continue
                     
-                    # Group by (player, market, line, sportsbook)
-                    key = (pid, market_name, line, sportsbook)
+                    # Group by (player, market, line, sportsbook, alternate); standard vs
+                    # alternate duplicates are merged by dedupe_by_conflict_key before upsert
+                    key = (pid, market_name, line, sportsbook, market_key.endswith("_alternate"))
                     if key not in event_player_props:
                         event_player_props[key] = {
                             "league_id": league_id,
@@ -390,19 +404,9 @@ def main():
     players = fetch_players_cached()
     player_lookup = build_player_lookup(players)
     
-    # 2. Fetch events
-    events = fetch_mlb_events()
-    
-    # 3. Filter future events
-    now = datetime.now(timezone.utc)
+    # 2-3. Upcoming events (range lookup on the shared events cache)
     window_hours = 36
-    latest = now + timedelta(hours=window_hours)
-    
-    future_events = []
-    for event in events:
-        commence_time = datetime.fromisoformat(event["commence_time"].replace("Z", "+00:00"))
-        if now <= commence_time <= latest:
-            future_events.append(event)
+    future_events = upcoming_events(redis_client, SPORT_KEY, fetch_mlb_events, hours=window_hours)
     
     print(f"🎯 Found {len(future_events)} upcoming events in next {window_hours} hours")
     
@@ -1,27 +1,31 @@
 import os
 import requests
-import redis
 import unicodedata
 import re
 import json
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from supabase import create_client
 
+from redis_hash_layout import ODDS_HASH_LAYOUT, HashLayoutWriter, prune_market_hashes
+from redis_key_index import index_key, index_value_write
+from generation_publisher import ODDS_GENERATIONS, GenerationPublisher
+from ttl_policy import grace_for, slate_ttl, ttl_for
+from upstash_rest import create_redis_client
+from poll_scheduler import record_quota
+from events_cache import upcoming_events
+from props_builder import EventPropsBuilder, add_quote, index_lines, side_of
+
 # ── ENV VARS ────────────────────────────────────────────────────
 SUPABASE_URL = os.environ["SUPABASE_URL"]
 SUPABASE_KEY = os.environ["SUPABASE_KEY"]
 ODDS_API_KEY = os.environ["ODDS_API_KEY"]
 ODDS_API_BASE_URL = os.environ["ODDS_API_BASE_URL"]
+UPSTASH_URL = os.environ["UPSTASH_REDIS_REST_URL"]
 UPSTASH_TOKEN = os.environ["UPSTASH_REDIS_REST_TOKEN"]
 
 # ── INIT CLIENTS ─────────────────────────────────────────
 supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-redis_client = redis.Redis(
-    host='finer-basilisk-19142.upstash.io',
-    port=6379,
-    password=UPSTASH_TOKEN,
-    ssl=True
-)
+redis_client = create_redis_client(UPSTASH_URL, UPSTASH_TOKEN)
 
 # ── SETTINGS ──────────────────────────────
 SPORT_KEY = "baseball_mlb"
@@ -57,10 +61,10 @@ def get_consolidated_market_key(market_key):
 
 ODDS_FORMAT = "american"
 
-# Cache TTL settings (in seconds)
-PLAYER_ODDS_TTL = 48 * 3600  # 48 hours for player odds
-EVENT_ODDS_TTL = 48 * 3600   # 48 hours for event odds
+# Per-key TTLs follow commence_time and the hash/generation containers that
+# span events outlive the slate's last event (ttl_policy.py)
 BATCH_SIZE = 50              # Redis pipeline batch size
+USE_LUA_MERGE = os.environ.get("CACHE_PROPS_MERGE", "lua") == "lua"  # "python" for the client-side merge
 
 HARDCODED_PLAYER_ID_OVERRIDES = {
     "bobby witt": 677951,
@@ -168,7 +172,9 @@ def match_player(name, lookup):
 
 def fetch_mlb_events():
     url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/events?apiKey={ODDS_API_KEY}"
-    return requests.get(url).json()
+    response = requests.get(url)
+    response.raise_for_status()
+    return response.json()
 
 def fetch_props_for_event(event_id):
     url = f"{ODDS_API_BASE_URL}/sports/{SPORT_KEY}/events/{event_id}/odds"
@@ -180,7 +186,9 @@ def fetch_props_for_event(event_id):
         "includeSids": "true",
         "includeLinks": "true"
     }
-    return requests.get(url, params=params).json()
+    response = requests.get(url, params=params)
+    record_quota(redis_client, response.headers)
+    return response.json()
 
 def json_dumps(data):
     return json.dumps(data, default=str, separators=(",", ":"))
@@ -191,21 +199,101 @@ def json_loads(data):
         data = data.decode('utf-8')
     return json.loads(data) if data else None
 
+# Server-side merge of per-line/per-book deltas into odds:mlb:{event}:{player}:{market}
+# entries. One EVALSHA per batch replaces the GET round-trip + Python merge +
+# SETEX, and runs atomically so overlapping cron runs can't drop each other's
+# updates.
+#   KEYS[i]        player key
+#   ARGV[1]        "1" to return the merged entries
+#   ARGV[2i]       TTL for KEYS[i]
+#   ARGV[2i + 1]   {"meta": {...new entry fields...}, "last_updated": ts,
+#                   "updates": [[line, book, side, price, link, sid], ...]}
+MERGE_PROPS_LUA = """
+local return_entries = ARGV[1] == '1'
+local merged = {}
+for i, key in ipairs(KEYS) do
+  local ttl = tonumber(ARGV[2 * i])
+  local delta = cjson.decode(ARGV[2 * i + 1])
+  local raw = redis.call('GET', key)
+  local entry
+  if raw then
+    entry = cjson.decode(raw)
+  else
+    entry = delta.meta
+    entry.lines = {}
+  end
+  entry.last_updated = delta.last_updated
+
+  local by_line = {}
+  for _, l in ipairs(entry.lines) do
+    by_line[tostring(l.line)] = l
+  end
+  for _, u in ipairs(delta.updates) do
+    local line_key = tostring(u[1])
+    local line_entry = by_line[line_key]
+    if not line_entry then
+      line_entry = {line = u[1], sportsbooks = {}}
+      table.insert(entry.lines, line_entry)
+      by_line[line_key] = line_entry
+    end
+    local book = line_entry.sportsbooks[u[2]]
+    if not book then
+      book = {}
+      line_entry.sportsbooks[u[2]] = book
+    end
+    if u[3] ~= cjson.null then
+      book[u[3]] = {price = u[4], link = u[5], sid = u[6], last_update = delta.last_updated}
+    end
+  end
+
+  local encoded = cjson.encode(entry)
+  redis.call('SET', key, encoded, 'EX', ttl)
+  if return_entries then
+    merged[i] = encoded
+  end
+end
+if return_entries then
+  return merged
+end
+return #KEYS
+"""
+
+def load_merge_script(redis_client):
+    """SHA of the merge script, or None to fall back to the Python merge"""
+    try:
+        return redis_client.script_load(MERGE_PROPS_LUA)
+    except Exception as e:
+        print(f"⚠️ Lua merge unavailable, merging in Python: {e}")
+        return None
+
 class RedisBatch:
     """Efficient Redis batch operations with pipeline"""
     
-    def __init__(self, redis_client, batch_size=BATCH_SIZE):
+    def __init__(self, redis_client, batch_size=BATCH_SIZE, merge_sha=None, on_merged=None):
         self.redis_client = redis_client
         self.batch_size = batch_size
         self.operations = []
+        self.merge_sha = merge_sha
+        self.on_merged = on_merged  # Called with (key, merged entry) when set
+        self.merges = []
     
-    def set_with_ttl(self, key, data, ttl_seconds):
-        """Add a set operation with TTL to the batch"""
-        self.operations.append(('setex', key, ttl_seconds, json_dumps(data)))
+    def set_with_ttl(self, key, data, ttl_seconds, index=None):
+        """Add a set operation with TTL to the batch (plus index set updates when index dims are given)"""
+        if index:
+            self.operations.append(('setex_indexed', key, ttl_seconds, json_dumps(data), index))
+        else:
+            self.operations.append(('setex', key, ttl_seconds, json_dumps(data)))
         
         if len(self.operations) >= self.batch_size:
             self.flush()
     
+    def merge_with_ttl(self, key, delta, ttl_seconds, index=None):
+        """Queue a delta for the server-side merge script"""
+        self.merges.append((key, ttl_seconds, json_dumps(delta), index))
+        
+        if len(self.merges) >= self.batch_size:
+            self.flush()
+    
     def get_batch(self, keys):
         """Get multiple keys efficiently"""
         if not keys:
@@ -218,19 +306,48 @@ class RedisBatch:
         results = pipe.execute()
         return {key: json_loads(result) for key, result in zip(keys, results) if result}
     
-    def flush(self):
-        """Execute all pending operations"""
-        if not self.operations:
-            return
-            
+    def _build_pipeline(self):
         pipe = self.redis_client.pipeline()
+        if self.merges:
+            # One EVALSHA for every queued delta
+            args = ['1' if self.on_merged else '0']
+            for _, ttl_seconds, delta, _ in self.merges:
+                args += [ttl_seconds, delta]
+            pipe.evalsha(self.merge_sha, len(self.merges), *[key for key, *_ in self.merges], *args)
+            for key, ttl_seconds, _, index in self.merges:
+                if index:
+                    index_key(pipe, key, ttl_seconds, **index)
+        
         for op in self.operations:
             command, *args = op
-            getattr(pipe, command)(*args)
+            if command == 'setex_indexed':
+                key, ttl_seconds, value, index = args
+                index_value_write(pipe, key, value, ttl_seconds, **index)
+            else:
+                getattr(pipe, command)(*args)
+        return pipe
+    
+    def flush(self):
+        """Execute all pending operations"""
+        if not self.operations and not self.merges:
+            return
+        
+        try:
+            results = self._build_pipeline().execute()
+        except Exception as e:
+            if not self.merges or "NOSCRIPT" not in str(e):
+                raise
+            # Script cache was flushed; everything queued is idempotent, so reload and resend
+            self.merge_sha = self.redis_client.script_load(MERGE_PROPS_LUA)
+            results = self._build_pipeline().execute()
+        
+        if self.merges and self.on_merged:
+            for (key, *_), merged in zip(self.merges, results[0]):
+                self.on_merged(key, json_loads(merged))
         
-        pipe.execute()
-        print(f"✅ Flushed {len(self.operations)} Redis operations")
+        print(f"✅ Flushed {len(self.operations)} Redis operations and {len(self.merges)} merges")
         self.operations.clear()
+        self.merges.clear()
     
     def __enter__(self):
         return self
@@ -242,7 +359,7 @@ def get_existing_player_data(player_keys, redis_batch):
     """Efficiently fetch existing player data"""
     return redis_batch.get_batch(player_keys)
 
-def cache_props(event_props, player_lookup):
+def cache_props(event_props, player_lookup, publisher=None, merge_sha=None, container_ttl=None):
     event_id = event_props.get("id")
     home_team = event_props.get("home_team")
     away_team = event_props.get("away_team")
@@ -250,6 +367,7 @@ def cache_props(event_props, player_lookup):
     last_updated = datetime.now(timezone.utc).isoformat()
     
     print(f"📊 Processing event {event_id}: {away_team} @ {home_team}")
+    props_ttl = ttl_for("props", commence_time)
 
     event_cache = {
         "event_id": event_id,
@@ -260,6 +378,7 @@ def cache_props(event_props, player_lookup):
         "markets": {},
         "last_updated": last_updated
     }
+    event_markets = EventPropsBuilder()
 
     # Collect all player keys that we'll need to check
     player_keys_to_check = set()
@@ -312,10 +431,23 @@ def cache_props(event_props, player_lookup):
                     "original_market": market_key  # Track which market this came from
                 })
 
+    # Optional per-event/per-market hashes written next to the string keys
+    # Market hashes span events, so they take the slate's TTL rather than this event's
+    hash_writer = (HashLayoutWriter(redis_client, "mlb", container_ttl or props_ttl)
+                   if ODDS_HASH_LAYOUT else None)
+    
+    # Merged entries come back from the Lua script only when something needs them
+    def on_merged(player_key, entry):
+        if hash_writer:
+            hash_writer.put(event_id, entry["player_id"], entry["market"], entry)
+        if publisher:
+            publisher.put(player_key, entry)
+    
     # Use batch operations for efficiency
-    with RedisBatch(redis_client) as batch:
-        # Fetch existing player data efficiently
-        existing_data = get_existing_player_data(list(player_keys_to_check), batch)
+    with RedisBatch(redis_client, merge_sha=merge_sha,
+                    on_merged=on_merged if (hash_writer or publisher) else None) as batch:
+        # Fetch existing player data efficiently (the Lua merge reads it server-side)
+        existing_data = {} if merge_sha else get_existing_player_data(list(player_keys_to_check), batch)
         
         # Process each player's data
         for player_key, player_info in player_data_map.items():
@@ -327,8 +459,22 @@ def cache_props(event_props, player_lookup):
             
             # Get existing entry or create new one
             entry = existing_data.get(player_key)
-            if entry:
+            if merge_sha:
+                delta = {
+                    "meta": {
+                        "description": name,
+                        "market": market_key,
+                        "player_id": player_id,
+                        "event_id": event_id,
+                        "team": team_abbr,
+                        "is_home": is_home
+                    },
+                    "last_updated": last_updated,
+                    "updates": []
+                }
+            elif entry:
                 entry["last_updated"] = last_updated
+                lines_by_line = index_lines(entry["lines"])
             else:
                 entry = {
                     "description": name,
@@ -340,6 +486,8 @@ def cache_props(event_props, player_lookup):
                     "is_home": is_home,
                     "last_updated": last_updated
                 }
+                lines_by_line = {}
+            event_player = {"player_id": player_id, "name": name, "team": team_abbr, "is_home": is_home}
             
             # Process outcomes for this player
             for outcome in player_info["outcomes"]:
@@ -349,62 +497,40 @@ def cache_props(event_props, player_lookup):
                 sid = outcome["sid"]
                 link = outcome["link"]
                 price = outcome["price"]
+                side = side_of(over_under)
+                quote = {
+                    "price": price,
+                    "link": link,
+                    "sid": sid,
+                    "last_update": last_updated
+                }
                 
-                # Find or create line entry
-                line_entry = next((l for l in entry["lines"] if l["line"] == line), None)
-                if not line_entry:
-                    line_entry = {"line": line, "sportsbooks": {}}
-                    entry["lines"].append(line_entry)
-                
-                # Initialize sportsbook entry
-                line_entry["sportsbooks"].setdefault(book, {})
-                
-                # Add over/under data
-                if over_under and over_under.lower() in ["over", "under"]:
-                    line_entry["sportsbooks"][book][over_under.lower()] = {
-                        "price": price,
-                        "link": link,
-                        "sid": sid,
-                        "last_update": last_updated
-                    }
+                if merge_sha:
+                    delta["updates"].append([line, book, side, price, link, sid])
+                else:
+                    add_quote(lines_by_line, line, book, side, quote)
                 
                 # Add to event-level cache
-                if market_key not in event_cache["markets"]:
-                    event_cache["markets"][market_key] = {"players": []}
-                
-                player_event_entry = next(
-                    (p for p in event_cache["markets"][market_key]["players"] if p["player_id"] == player_id), None
-                )
-                if not player_event_entry:
-                    player_event_entry = {
-                        "player_id": player_id,
-                        "name": name,
-                        "team": team_abbr,
-                        "is_home": is_home,
-                        "lines": []
-                    }
-                    event_cache["markets"][market_key]["players"].append(player_event_entry)
-                
-                line_event_entry = next((l for l in player_event_entry["lines"] if l["line"] == line), None)
-                if not line_event_entry:
-                    line_event_entry = {"line": line, "sportsbooks": {}}
-                    player_event_entry["lines"].append(line_event_entry)
-                
-                line_event_entry["sportsbooks"].setdefault(book, {})
-                if over_under and over_under.lower() in ["over", "under"]:
-                    line_event_entry["sportsbooks"][book][over_under.lower()] = {
-                        "price": price,
-                        "link": link,
-                        "sid": sid,
-                        "last_update": last_updated
-                    }
+                event_markets.add(market_key, event_player, line, book, side, quote)
             
-            # Add player entry to batch with TTL
-            batch.set_with_ttl(player_key, entry, PLAYER_ODDS_TTL)
+            # Add player entry (or its delta) to batch with TTL
+            index = {"event": event_id, "player": player_id, "market": market_key}
+            if merge_sha:
+                batch.merge_with_ttl(player_key, delta, props_ttl, index=index)
+            else:
+                entry["lines"] = list(lines_by_line.values())
+                batch.set_with_ttl(player_key, entry, props_ttl, index=index)
+                on_merged(player_key, entry)
         
         # Add event cache to batch with TTL
+        event_cache["markets"] = event_markets.to_markets()
         event_key = f"odds:mlb:{event_id}:player_props"
-        batch.set_with_ttl(event_key, event_cache, EVENT_ODDS_TTL)
+        batch.set_with_ttl(event_key, event_cache, props_ttl, index={"event": event_id})
+        if publisher:
+            publisher.put(event_key, event_cache)
+    
+    if hash_writer:
+        hash_writer.flush()
     
     # Log consolidation stats
     if consolidation_stats:
@@ -444,27 +570,35 @@ def main():
     player_lookup = build_player_lookup()
     print(f"📝 Loaded {len(player_lookup)} players")
     
-    events = fetch_mlb_events()
-    now = datetime.now(timezone.utc)
-    future_events = [
-        e for e in events
-        if now <= datetime.fromisoformat(e["commence_time"].replace("Z", "+00:00")) <= now + timedelta(hours=36)
-    ]
+    future_events = upcoming_events(redis_client, SPORT_KEY, fetch_mlb_events, hours=36)
     
     print(f"🎯 Processing {len(future_events)} upcoming events")
     
+    # Every event of this run goes into one generation, published after the loop
+    run_ttl = slate_ttl("props", (e["commence_time"] for e in future_events))
+    publisher = GenerationPublisher(redis_client, "mlb", run_ttl, "props") if ODDS_GENERATIONS else None
+    merge_sha = load_merge_script(redis_client) if USE_LUA_MERGE else None
+    
     success_count = 0
     for i, e in enumerate(future_events, 1):
         try:
             print(f"[{i}/{len(future_events)}] Processing event {e['id']}...")
             props = fetch_props_for_event(e["id"])
-            cache_props(props, player_lookup)
+            cache_props(props, player_lookup, publisher, merge_sha, container_ttl=run_ttl)
             success_count += 1
         except Exception as err:
             print(f"⚠️ Failed for event {e['id']}: {err}")
     
+    if publisher and success_count:
+        publisher.publish()
+    
+    if ODDS_HASH_LAYOUT:
+        base_markets = sorted({get_consolidated_market_key(m) for m in MARKETS.split(",")})
+        # Entries not refreshed for a default props TTL belong to finished games
+        prune_market_hashes(redis_client, "mlb", base_markets, ttl_for("props"))
+    
     print(f"✅ Completed! Successfully cached {success_count}/{len(future_events)} events")
-    print(f"📊 Cache TTL: {PLAYER_ODDS_TTL/3600}h for player odds, {EVENT_ODDS_TTL/3600}h for events")
+    print(f"📊 Cache TTL: commence_time + {grace_for('props') // 60}m for player and event odds")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -6,8 +6,10 @@ import requests
 import unicodedata
 import re
 import json
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from supabase import create_client
+from events_cache import upcoming_events
+from odds_store import store_odds_records
 
 # ENV VARS
 SUPABASE_URL = os.environ["SUPABASE_URL"]
@@ -85,7 +87,6 @@ ALTERNATIVE_MARKETS = {
 }
 
 ODDS_FORMAT = "american"
-BATCH_SIZE = 500  # Database batch insert size
 
 HARDCODED_PLAYER_ID_OVERRIDES = {
     "bobby witt": 677951,
@@ -221,51 +222,6 @@ def fetch_props_for_event(event_id):
     response.raise_for_status()
     return response.json()
 
-class DatabaseBatch:
-    """Efficient database batch operations"""
-    
-    def __init__(self, supabase_client, batch_size=BATCH_SIZE):
-        self.supabase = supabase_client
-        self.batch_size = batch_size
-        self.records = []
-    
-    def add_record(self, record):
-        """Add a record to the batch"""
-        self.records.append(record)
-        
-        if len(self.records) >= self.batch_size:
-            self.flush()
-    
-    def flush(self):
-        """Insert all pending records"""
-        if not self.records:
-            return
-            
-        try:
-            # Use upsert to handle duplicates
-            result = (
-                self.supabase
-                .from_("player_odds_history")
-                .upsert(self.records, on_conflict="vendor_event_id,player_id,market,line,sportsbook,created_at")
-                .execute()
-            )
-            
-            print(f"✅ Inserted {len(self.records)} odds records")
-            self.records.clear()
-            
-        except Exception as e:
-            print(f"❌ Database insert error: {e}")
-            # Log the problematic records for debugging
-            print(f"Sample record: {self.records[0] if self.records else 'None'}")
-            self.records.clear()
-            raise
-    
-    def __enter__(self):
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.flush()
-
 def get_game_mapping_from_redis(event_id):
     """Get mlb_game_id for a vendor event_id from Redis cache"""
     if not redis_client:
@@ -424,12 +380,7 @@ def main():
     print(f"Loaded {len(player_lookup)} players")
     
     # Fetch upcoming events from odds API
-    events = fetch_mlb_events()
-    now = datetime.now(timezone.utc)
-    future_events = [
-        e for e in events
-        if now <= datetime.fromisoformat(e["commence_time"].replace("Z", "+00:00")) <= now + timedelta(hours=36)
-    ]
+    future_events = upcoming_events(redis_client, SPORT_KEY, fetch_mlb_events, hours=36)
     
     print(f"TARGET: Processing {len(future_events)} upcoming events")
     
@@ -455,9 +406,8 @@ def main():
     
     # Store all records in database
     if all_records:
-        with DatabaseBatch(supabase) as batch:
-            for record in all_records:
-                batch.add_record(record)
+        # Current odds, change-only history and archive (see odds_store.py)
+        all_records = store_odds_records(supabase, redis_client, SPORT_KEY, all_records)
         print(f"SUCCESS: Successfully stored {len(all_records)} odds records")
     else:
         print("WARNING: No odds records to store")
@@ -0,0 +1,120 @@
+-- Convert player_odds_history into a daily range-partitioned table on created_at
+--
+-- Retention then becomes DETACH + DROP of whole partitions (see
+-- odds_history_retention.py) instead of DELETE ... IN (ids) / DELETE ... WHERE
+-- created_at < cutoff over the whole table.
+--
+-- Run once in the Supabase SQL editor (or psql) during a quiet window; the
+-- importer should be paused while the legacy rows are copied.
+
+BEGIN;
+
+ALTER TABLE player_odds_history RENAME TO player_odds_history_legacy;
+ALTER TABLE player_odds_history_legacy RENAME CONSTRAINT unique_vendor_odds TO unique_vendor_odds_legacy;
+
+-- Free the index names for the partitioned table (the legacy table is only read once)
+DROP INDEX IF EXISTS idx_player_odds_player_fk, idx_player_odds_game_fk, idx_vendor_event_current,
+  idx_player_market_main, idx_game_odds_current, idx_main_lines_only, idx_alternative_lines,
+  idx_sportsbook_alternatives;
+
+-- Partition keys must be part of every unique constraint, so the primary key
+-- becomes (id, created_at). unique_vendor_odds already ends in created_at.
+--
+-- The mlb_game_id -> mlb_games(game_id) ON DELETE CASCADE foreign key is
+-- dropped on purpose: history is expired by dropping whole partitions, and
+-- must outlive the schedule rows, which the game loaders replace. A cascade
+-- from mlb_games would also have to scan every partition on each delete.
+-- mlb_game_id keeps its index (idx_player_odds_game_fk) for joins.
+CREATE TABLE player_odds_history (
+  id BIGSERIAL,
+
+  -- Vendor identification
+  vendor_event_id TEXT NOT NULL,
+  vendor_name TEXT NOT NULL,
+
+  player_id INTEGER NOT NULL REFERENCES mlb_players(player_id) ON DELETE CASCADE,
+  player_name TEXT NOT NULL,
+  mlb_game_id INTEGER NOT NULL,
+  market TEXT NOT NULL,
+  line DECIMAL(4,1) NOT NULL,
+
+  -- Player team context
+  team TEXT NOT NULL,
+  is_home BOOLEAN NOT NULL,
+
+  -- Sportsbook specific odds
+  sportsbook TEXT NOT NULL,
+  over_price INTEGER,
+  under_price INTEGER,
+  over_link TEXT,
+  under_link TEXT,
+  over_sid TEXT,
+  under_sid TEXT,
+  is_alternative BOOLEAN NOT NULL DEFAULT false,
+
+  -- Game metadata
+  home_team TEXT NOT NULL,
+  away_team TEXT NOT NULL,
+  commence_time TIMESTAMPTZ,
+  sport_key TEXT DEFAULT 'baseball_mlb',
+
+  -- Tracking
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+
+  PRIMARY KEY (id, created_at),
+  CONSTRAINT unique_vendor_odds UNIQUE (vendor_event_id, player_id, market, line, sportsbook, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Catches rows outside every daily partition so inserts never fail; the
+-- retention job keeps future partitions created ahead of time.
+CREATE TABLE player_odds_history_default PARTITION OF player_odds_history DEFAULT;
+
+-- One partition per UTC day, named player_odds_history_pYYYYMMDD
+CREATE OR REPLACE FUNCTION create_odds_history_partition(day DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  partition_name TEXT := 'player_odds_history_p' || to_char(day, 'YYYYMMDD');
+BEGIN
+  IF to_regclass(partition_name) IS NULL THEN
+    EXECUTE format(
+      'CREATE TABLE %I PARTITION OF player_odds_history FOR VALUES FROM (%L) TO (%L)',
+      partition_name,
+      day::timestamp AT TIME ZONE 'UTC',
+      (day + 1)::timestamp AT TIME ZONE 'UTC'
+    );
+  END IF;
+  RETURN partition_name;
+END;
+$$;
+
+-- Partitions for the legacy data plus the next week
+SELECT create_odds_history_partition(d::date)
+FROM generate_series(
+  COALESCE((SELECT min(created_at) FROM player_odds_history_legacy), NOW())::date,
+  (NOW() + INTERVAL '7 days')::date,
+  INTERVAL '1 day'
+) AS d;
+
+INSERT INTO player_odds_history SELECT * FROM player_odds_history_legacy WHERE created_at IS NOT NULL;
+SELECT setval(
+  pg_get_serial_sequence('player_odds_history', 'id'),
+  COALESCE((SELECT max(id) FROM player_odds_history_legacy), 1)
+);
+
+-- Indexes on the parent are created on every partition
+CREATE INDEX idx_player_odds_player_fk ON player_odds_history (player_id);
+CREATE INDEX idx_player_odds_game_fk ON player_odds_history (mlb_game_id);
+CREATE INDEX idx_vendor_event_current ON player_odds_history (vendor_event_id, updated_at DESC);
+CREATE INDEX idx_player_market_main ON player_odds_history (player_id, market, is_alternative, updated_at DESC);
+CREATE INDEX idx_game_odds_current ON player_odds_history (mlb_game_id, updated_at DESC);
+CREATE INDEX idx_main_lines_only ON player_odds_history (is_alternative, market, updated_at DESC) WHERE is_alternative = false;
+CREATE INDEX idx_alternative_lines ON player_odds_history (player_id, market, line, is_alternative) WHERE is_alternative = true;
+CREATE INDEX idx_sportsbook_alternatives ON player_odds_history (sportsbook, is_alternative, updated_at DESC);
+
+COMMIT;
+
+-- After verifying row counts match:
+-- DROP TABLE player_odds_history_legacy;
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Direct-Postgres bulk sink for the odds loaders.
+
+Instead of sending 500-1000 row JSON upserts through PostgREST one request at a
+time, records are streamed with COPY ... FROM STDIN into a temporary staging
+table and merged into the target table with a single INSERT ... ON CONFLICT.
+
+The sink is optional: it is only used when SUPABASE_DB_URL is set (the direct
+or pooler connection string from the Supabase dashboard) and psycopg 3 is
+installed. Otherwise open_copy_sink() returns None and the loaders keep using
+their PostgREST upserts.
+"""
+
+import os
+from typing import List, Dict, Optional, Sequence
+
+SUPABASE_DB_URL = os.environ.get("SUPABASE_DB_URL")
+
+
+def collect_columns(records: List[Dict]) -> List[str]:
+    """Union of record keys, in first-seen order."""
+    columns = {}
+    for record in records:
+        for key in record:
+            columns.setdefault(key, None)
+    return list(columns)
+
+
+class PostgresCopySink:
+    """COPY into a staging table, then one INSERT ... ON CONFLICT merge per call"""
+
+    def __init__(self, dsn: str, connect_timeout: int = 10):
+        import psycopg  # optional dependency, only needed when the sink is enabled
+        from psycopg import sql
+
+        self.sql = sql
+        self.conn = psycopg.connect(dsn, connect_timeout=connect_timeout, autocommit=True)
+
+    def upsert(self, table: str, records: List[Dict], on_conflict: str,
+               columns: Optional[Sequence[str]] = None) -> int:
+        """Stream records into `table`, merging on the `on_conflict` columns.
+
+        Returns the number of rows inserted or updated.
+        """
+        if not records:
+            return 0
+
+        sql = self.sql
+        columns = list(columns or collect_columns(records))
+        conflict_cols = [c.strip() for c in on_conflict.split(",")]
+        update_cols = [c for c in columns if c not in conflict_cols]
+
+        column_list = sql.SQL(", ").join(sql.Identifier(c) for c in columns)
+        conflict_list = sql.SQL(", ").join(sql.Identifier(c) for c in conflict_cols)
+        if update_cols:
+            on_conflict_action = sql.SQL("DO UPDATE SET {}").format(
+                sql.SQL(", ").join(
+                    sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c)) for c in update_cols
+                )
+            )
+        else:
+            on_conflict_action = sql.SQL("DO NOTHING")
+
+        staging = sql.Identifier(f"_copy_stage_{table}")
+        with self.conn.transaction():
+            with self.conn.cursor() as cur:
+                # Typed like the target's columns but without its constraints or
+                # defaults, so staging never touches the target's id sequence.
+                cur.execute(
+                    sql.SQL(
+                        "CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA"
+                    ).format(staging, column_list, sql.Identifier(table))
+                )
+                copy_stmt = sql.SQL("COPY {} ({}) FROM STDIN").format(staging, column_list)
+                with cur.copy(copy_stmt) as copy:
+                    for record in records:
+                        copy.write_row([record.get(c) for c in columns])
+
+                # DISTINCT ON keeps the merge valid if the same conflict key was
+                # streamed twice; ON CONFLICT DO UPDATE rejects that otherwise.
+                # The staging table is only ever appended to, so ctid follows
+                # stream order and the last streamed row wins, like
+                # dedupe_by_conflict_key.
+                cur.execute(
+                    sql.SQL(
+                        "INSERT INTO {target} ({cols}) "
+                        "SELECT DISTINCT ON ({keys}) {cols} FROM {staging} "
+                        "ORDER BY {keys}, ctid DESC "
+                        "ON CONFLICT ({keys}) {action}"
+                    ).format(
+                        target=sql.Identifier(table),
+                        cols=column_list,
+                        keys=conflict_list,
+                        staging=staging,
+                        action=on_conflict_action,
+                    )
+                )
+                return cur.rowcount
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_copy_sink(dsn: Optional[str] = None) -> Optional[PostgresCopySink]:
+    """Open the COPY sink if a direct Postgres URL is configured, else None"""
+    dsn = dsn or SUPABASE_DB_URL
+    if not dsn:
+        return None
+    try:
+        sink = PostgresCopySink(dsn)
+        print("🐘 Direct Postgres COPY sink enabled")
+        return sink
+    except Exception as e:
+        print(f"⚠️ COPY sink unavailable, falling back to PostgREST upserts: {e}")
+        return None
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Quota-aware adaptive polling for odds API fetches.
+
+Every cron used to poll every game in the 36h window at the same rate.
+PollScheduler decides per event which kinds of markets are due:
+
+  - main lines on a tier interval by time to commence_time (TIERS): games
+    about to start every few minutes, tomorrow's games a few times a day;
+  - alternate markets ALT_FACTOR times less often than main lines.
+
+All intervals are stretched by a cadence factor computed from the odds API
+quota: every fetcher reports the usage headers through record_quota(), which
+keeps the latest x-requests-remaining/used and a per-day spend counter. If
+today's spend runs ahead of the remaining quota spread evenly over the days
+to the next reset, intervals stretch (up to MAX_STRETCH); under QUOTA_FLOOR
+credits only main lines are polled.
+
+Last-poll times, quota and spend live in Redis so separate cron invocations
+share one budget. Without Redis every event is always due (the old behavior).
+"""
+
+import os
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+
+QUOTA_KEY = "odds_api:quota"
+SPEND_PREFIX = "odds_api:spend"
+POLL_PREFIX = "poll_state"
+
+# (max hours to commence, main-line interval in minutes)
+TIERS = [
+    (1, 5),
+    (3, 15),
+    (12, 60),
+    (36, 240),
+]
+ALT_FACTOR = 3
+MAX_STRETCH = 8.0
+SLACK_SECONDS = 60            # Crons drift; a poll a minute early still counts as due
+QUOTA_FLOOR = int(os.environ.get("ODDS_API_QUOTA_FLOOR", "1000"))
+QUOTA_RESET_DAY = min(28, max(1, int(os.environ.get("ODDS_API_RESET_DAY", "1"))))   # Day of month the quota renews
+PAYLOAD_TTL = 48 * 3600       # Outlives the longest stretched alternate interval
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def record_quota(redis_client, headers, now: Optional[datetime] = None):
+    """Store the usage headers of an odds API response in the shared budget"""
+    if not redis_client or headers.get("x-requests-remaining") is None:
+        return
+    now = now or datetime.now(timezone.utc)
+    spend_key = f"{SPEND_PREFIX}:{now:%Y-%m-%d}"
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(QUOTA_KEY, mapping={
+        "remaining": headers.get("x-requests-remaining"),
+        "used": headers.get("x-requests-used", ""),
+        "updated_at": now.isoformat(),
+    })
+    pipe.incrby(spend_key, int(headers.get("x-requests-last") or 0))
+    pipe.expire(spend_key, 3 * 24 * 3600)
+    pipe.execute()
+
+
+def _next_reset(now: datetime) -> datetime:
+    reset = now.replace(day=QUOTA_RESET_DAY, hour=0, minute=0, second=0, microsecond=0)
+    if reset <= now:
+        reset = (reset + timedelta(days=32)).replace(day=QUOTA_RESET_DAY)
+    return reset
+
+
+def cadence_factor(remaining: Optional[int], spent_today: int, now: datetime) -> float:
+    """How much to stretch every interval: 1.0 on pace, up to MAX_STRETCH when spending too fast"""
+    if remaining is None:
+        return 1.0
+    if remaining <= QUOTA_FLOOR:
+        return MAX_STRETCH
+    days_left = max((_next_reset(now) - now).total_seconds() / 86400, 1 / 24)
+    daily_budget = (remaining - QUOTA_FLOOR + spent_today) / days_left
+    day_elapsed = max((now - now.replace(hour=0, minute=0, second=0, microsecond=0)).total_seconds() / 86400, 1 / 24)
+    pace = spent_today / max(daily_budget * day_elapsed, 1)
+    return min(MAX_STRETCH, max(1.0, pace))
+
+
+def main_interval(hours_to_start: float) -> Optional[int]:
+    """Main-line interval in seconds for a game starting in hours_to_start (None = past the window)"""
+    for max_hours, minutes in TIERS:
+        if hours_to_start <= max_hours:
+            return minutes * 60
+    return None
+
+
+class PollScheduler:
+    """Per-event due checks for one fetcher ("job") against the shared quota"""
+
+    def __init__(self, redis_client, sport: str, job: str, now: Optional[datetime] = None):
+        self.redis_client = redis_client
+        self.state_key = f"{POLL_PREFIX}:{sport}:{job}"
+        self.payload_prefix = f"{POLL_PREFIX}:{sport}:{job}:payload"
+        self.now = now or datetime.now(timezone.utc)
+        self.last_polled: Dict[str, float] = {}
+        self.remaining = None
+        self.factor = 1.0
+        if redis_client:
+            self._load()
+
+    def _load(self):
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hgetall(self.state_key)
+        pipe.hget(QUOTA_KEY, "remaining")
+        pipe.get(f"{SPEND_PREFIX}:{self.now:%Y-%m-%d}")
+        state, remaining, spent = pipe.execute()
+        self.last_polled = {_decode(k): float(v) for k, v in (state or {}).items()}
+        self.remaining = int(remaining) if remaining is not None else None
+        self.factor = cadence_factor(self.remaining, int(spent or 0), self.now)
+        print(f"⏱️ Poll cadence x{self.factor:.1f} (quota remaining: {self.remaining}, spent today: {int(spent or 0)})")
+
+    def due(self, event_id: str, commence_time) -> Set[str]:
+        """Subset of {"main", "alt"} to fetch now for this event"""
+        if not self.redis_client:
+            return {"main", "alt"}
+        commence = datetime.fromisoformat(str(commence_time).replace("Z", "+00:00"))
+        interval = main_interval((commence - self.now).total_seconds() / 3600)
+        if interval is None:
+            return set()
+
+        kinds = set()
+        now = self.now.timestamp()
+        for kind, base in (("main", interval), ("alt", interval * ALT_FACTOR)):
+            if kind == "alt" and self.remaining is not None and self.remaining <= QUOTA_FLOOR:
+                continue
+            last = self.last_polled.get(f"{event_id}:{kind}", 0)
+            if now - last >= base * self.factor - SLACK_SECONDS:
+                kinds.add(kind)
+        # Alternate payloads are merged into the main-line keys, so they always travel with main lines
+        if "alt" in kinds:
+            kinds.add("main")
+        return kinds
+
+    def mark_polled(self, event_id: str, kinds: Set[str]):
+        if not self.redis_client or not kinds:
+            return
+        now = time.time()
+        fields = {f"{event_id}:{kind}": now for kind in kinds}
+        self.last_polled.update(fields)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(self.state_key, mapping=fields)
+        pipe.expire(self.state_key, 48 * 3600)
+        pipe.execute()
+
+    def cache_payload(self, event_id: str, kind: str, payload: Dict):
+        """Keep the last fetched payload of a kind to reuse while it isn't due"""
+        if self.redis_client:
+            self.redis_client.set(f"{self.payload_prefix}:{event_id}:{kind}", json.dumps(payload), ex=PAYLOAD_TTL)
+
+    def cached_payload(self, event_id: str, kind: str) -> Optional[Dict]:
+        if not self.redis_client:
+            return None
+        raw = self.redis_client.get(f"{self.payload_prefix}:{event_id}:{kind}")
+        return json.loads(_decode(raw)) if raw else None
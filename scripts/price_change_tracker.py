@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Last-seen price tracking for change-only odds history.
+
+player_odds_current is upserted in place every run; player_odds_history only
+gets a row when the over or under price for a
+(vendor_event_id, player_id, market, line, sportsbook) key actually moved.
+The last price seen per key lives in one Redis hash per event,
+odds_last_price:{sport}:{event_id}, expiring with the event through
+ttl_policy (or a local JSON file pruned the same way when Redis isn't
+configured), so separate cron runs share it and finished games drop out.
+"""
+
+import os
+import json
+import time
+from collections import defaultdict
+from typing import List, Dict
+
+from ttl_policy import ttl_for
+
+HMGET_CHUNK = 1000
+LAST_PRICE_PREFIX = "odds_last_price"
+LOCAL_STATE_DIR = "/tmp" if os.path.exists("/tmp") else "."
+
+
+def price_key(record: Dict) -> str:
+    return "|".join(str(record.get(c)) for c in ("vendor_event_id", "player_id", "market", "line", "sportsbook"))
+
+
+def price_value(record: Dict) -> str:
+    return f"{record.get('over_price')}|{record.get('under_price')}"
+
+
+class PriceChangeTracker:
+    """Filters records down to the ones whose over/under price changed"""
+
+    def __init__(self, sport_key: str, redis_client=None):
+        self.redis_client = redis_client
+        self.hash_prefix = f"{LAST_PRICE_PREFIX}:{sport_key}"
+        self.local_path = os.path.join(LOCAL_STATE_DIR, f"odds_last_price_{sport_key}.json")
+        self.pending = {}
+        self.commence_times = {}  # vendor_event_id -> commence_time of the pending keys
+        self.pending_moves = {}
+        self.moves = []  # (record, previous "over|under" or None) committed by the last commit()
+
+    def _hash_key(self, event_id) -> str:
+        return f"{self.hash_prefix}:{event_id}"
+
+    def _load_local(self) -> Dict[str, Dict]:
+        """{event_id: {"expires_at": epoch, "prices": {key: value}}}"""
+        try:
+            with open(self.local_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_previous(self, records: List[Dict], keys: List[str]) -> Dict[str, str]:
+        by_event = defaultdict(list)
+        for record, key in zip(records, keys):
+            by_event[record.get("vendor_event_id")].append(key)
+
+        previous = {}
+        if self.redis_client:
+            pipe = self.redis_client.pipeline(transaction=False)
+            requested = []
+            for event_id, event_keys in by_event.items():
+                for i in range(0, len(event_keys), HMGET_CHUNK):
+                    chunk = event_keys[i:i + HMGET_CHUNK]
+                    pipe.hmget(self._hash_key(event_id), chunk)
+                    requested.append(chunk)
+            for chunk, values in zip(requested, pipe.execute()):
+                for key, value in zip(chunk, values):
+                    if value is not None:
+                        previous[key] = value.decode("utf-8") if isinstance(value, bytes) else value
+            return previous
+
+        state = self._load_local()
+        for event_id in by_event:
+            previous.update(state.get(str(event_id), {}).get("prices", {}))
+        return previous
+
+    def changed_records(self, records: List[Dict]) -> List[Dict]:
+        """Records that are new or whose price moved since the last commit()"""
+        keys = [price_key(r) for r in records]
+        previous = self._load_previous(records, keys)
+
+        changed = []
+        for key, record in zip(keys, records):
+            value = price_value(record)
+            if previous.get(key) != value:
+                changed.append(record)
+                self.pending[key] = (record.get("vendor_event_id"), value)
+                self.commence_times[record.get("vendor_event_id")] = record.get("commence_time")
+                self.pending_moves[key] = (record, previous.get(key))
+
+        unchanged = len(records) - len(changed)
+        print(f"📉 {len(changed)} prices moved, {unchanged} unchanged ({unchanged / max(len(records), 1):.0%} of writes skipped)")
+        return changed
+
+    def commit(self, failed_records: List[Dict] = ()):
+        """Remember the new prices; call only after the history append.
+
+        Records that failed to append are left out so the next run retries them.
+        """
+        for record in failed_records:
+            self.pending.pop(price_key(record), None)
+            self.pending_moves.pop(price_key(record), None)
+        self.moves = list(self.pending_moves.values())
+        self.pending_moves = {}
+        if not self.pending:
+            return
+
+        by_event = defaultdict(dict)
+        for key, (event_id, value) in self.pending.items():
+            by_event[event_id][key] = value
+
+        if self.redis_client:
+            pipe = self.redis_client.pipeline()
+            for event_id, prices in by_event.items():
+                pipe.hset(self._hash_key(event_id), mapping=prices)
+                pipe.expire(self._hash_key(event_id), ttl_for("last_price", self.commence_times.get(event_id)))
+            pipe.execute()
+        else:
+            now = time.time()
+            state = {e: entry for e, entry in self._load_local().items() if entry.get("expires_at", 0) > now}
+            for event_id, prices in by_event.items():
+                entry = state.setdefault(str(event_id), {"prices": {}})
+                entry["prices"].update(prices)
+                entry["expires_at"] = now + ttl_for("last_price", self.commence_times.get(event_id))
+            with open(self.local_path, "w") as f:
+                json.dump(state, f)
+
+        self.pending = {}
+        self.commence_times = {}
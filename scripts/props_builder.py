@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-memory build of the player prop entries cache_props writes.
+
+The cached JSON keeps lines as lists ([{"line": 1.5, "sportsbooks": {...}}])
+and event players as lists, but finding a line or player in those lists for
+every outcome is a linear scan, which goes quadratic on alt-line-heavy
+markets. While building, lines are indexed by line value and event players by
+player_id; the list shape is produced only when the entry is serialized.
+"""
+
+from typing import Dict, List, Optional
+
+
+def side_of(over_under) -> Optional[str]:
+    side = over_under.lower() if over_under else None
+    return side if side in ("over", "under") else None
+
+
+def index_lines(lines: List[Dict]) -> Dict:
+    """{line: line entry} for an entry's existing lines (the line dicts are shared, not copied)"""
+    return {l["line"]: l for l in lines}
+
+
+def add_quote(lines_by_line: Dict, line, book: str, side: Optional[str], quote: Dict):
+    """Set book/side on `line`, creating the line and book entries as needed"""
+    line_entry = lines_by_line.get(line)
+    if line_entry is None:
+        line_entry = lines_by_line[line] = {"line": line, "sportsbooks": {}}
+    book_entry = line_entry["sportsbooks"].setdefault(book, {})
+    if side:
+        book_entry[side] = quote
+
+
+class EventPropsBuilder:
+    """Builds the event-level "markets" section of odds:mlb:{event}:player_props"""
+
+    def __init__(self):
+        # market -> player_id -> (player entry without lines, {line: line entry})
+        self.markets: Dict[str, Dict] = {}
+
+    def add(self, market: str, player: Dict, line, book: str, side: Optional[str], quote: Dict):
+        players = self.markets.setdefault(market, {})
+        slot = players.get(player["player_id"])
+        if slot is None:
+            slot = players[player["player_id"]] = (player, {})
+        add_quote(slot[1], line, book, side, quote)
+
+    def to_markets(self) -> Dict[str, Dict]:
+        return {
+            market: {"players": [{**player, "lines": list(lines.values())} for player, lines in players.values()]}
+            for market, players in self.markets.items()
+        }
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hash-per-event / hash-per-market layout for cached player odds.
+
+Alongside the existing one-string-per-prop keys
+(odds:{sport}:{player_id}:{market}, odds:mlb:{event}:{player}:{market}) the
+writers can maintain
+
+    odds_hash:{sport}:event:{event_id}   field "{player_id}:{market}" -> entry JSON
+    odds_hash:{sport}:market:{market}    field "{player_id}"          -> entry JSON (latest event)
+
+so readers fetch a whole event or market with one HGETALL (or a few players
+with HMGET) instead of KEYS/SCAN plus a GET per key. The prefix is
+deliberately not odds:* so the existing SCAN-based readers never hit a hash.
+
+Dual writes are enabled with ODDS_HASH_LAYOUT=1 while readers migrate.
+"""
+
+import os
+import json
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+
+ODDS_HASH_LAYOUT = os.environ.get("ODDS_HASH_LAYOUT", "0") == "1"
+HASH_PREFIX = "odds_hash"
+HSCAN_COUNT = 500
+
+
+def event_hash_key(sport: str, event_id: str) -> str:
+    return f"{HASH_PREFIX}:{sport}:event:{event_id}"
+
+
+def market_hash_key(sport: str, market: str) -> str:
+    return f"{HASH_PREFIX}:{sport}:market:{market}"
+
+
+def _loads(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    return json.loads(value)
+
+
+class HashLayoutWriter:
+    """Queues HSETs for the event and market hashes and sends them in one pipeline"""
+
+    def __init__(self, redis_client, sport: str, ttl_seconds: int):
+        self.redis_client = redis_client
+        self.sport = sport
+        self.ttl_seconds = ttl_seconds
+        self.event_fields: Dict[str, Dict[str, str]] = {}
+        self.market_fields: Dict[str, Dict[str, str]] = {}
+
+    def put(self, event_id: str, player_id, market: str, entry: Dict):
+        payload = json.dumps(entry, default=str, separators=(",", ":"))
+        self.event_fields.setdefault(event_hash_key(self.sport, event_id), {})[f"{player_id}:{market}"] = payload
+        self.market_fields.setdefault(market_hash_key(self.sport, market), {})[str(player_id)] = payload
+
+    def flush(self):
+        if not self.event_fields and not self.market_fields:
+            return 0
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        fields = 0
+        for hashes in (self.event_fields, self.market_fields):
+            for key, mapping in hashes.items():
+                pipe.hset(key, mapping=mapping)
+                # Whole-hash TTL, refreshed on every write; stale fields in the
+                # long-lived market hashes are removed by prune_market_hashes()
+                pipe.expire(key, self.ttl_seconds)
+                fields += len(mapping)
+        pipe.execute()
+
+        print(f"🧺 Wrote {fields} hash fields across {len(self.event_fields)} event "
+              f"and {len(self.market_fields)} market hashes")
+        self.event_fields.clear()
+        self.market_fields.clear()
+        return fields
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+def prune_market_hashes(redis_client, sport: str, markets: List[str], max_age_seconds: int):
+    """HDEL market-hash fields whose entry hasn't been refreshed within max_age_seconds"""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+    removed = 0
+    for market in markets:
+        key = market_hash_key(sport, market)
+        stale = []
+        for field, value in redis_client.hscan_iter(key, count=HSCAN_COUNT):
+            last_updated = (_loads(value) or {}).get("last_updated")
+            if not last_updated or datetime.fromisoformat(str(last_updated).replace("Z", "+00:00")) < cutoff:
+                stale.append(field)
+        if stale:
+            removed += redis_client.hdel(key, *stale)
+    if removed:
+        print(f"🧹 Pruned {removed} stale market hash fields")
+    return removed
+
+
+# ── Readers ─────────────────────────────────────────────
+
+def read_event(redis_client, sport: str, event_id: str) -> Dict[str, Dict]:
+    """All props of one event as {"{player_id}:{market}": entry}"""
+    raw = redis_client.hgetall(event_hash_key(sport, event_id))
+    return {(k.decode("utf-8") if isinstance(k, bytes) else k): _loads(v) for k, v in raw.items()}
+
+
+def read_market(redis_client, sport: str, market: str, player_ids: Optional[List] = None) -> Dict[str, Dict]:
+    """One market as {player_id: entry}; HMGET when player_ids is given, else HGETALL"""
+    key = market_hash_key(sport, market)
+    if player_ids is None:
+        raw = redis_client.hgetall(key)
+        return {(k.decode("utf-8") if isinstance(k, bytes) else k): _loads(v) for k, v in raw.items()}
+
+    fields = [str(p) for p in player_ids]
+    return {f: _loads(v) for f, v in zip(fields, redis_client.hmget(key, fields)) if v is not None}
+
+
+def read_player_market(redis_client, sport: str, player_id, market: str, event_id: Optional[str] = None) -> Optional[Dict]:
+    """One prop; the event hash when event_id is known, else the market hash's latest entry"""
+    if event_id:
+        return _loads(redis_client.hget(event_hash_key(sport, event_id), f"{player_id}:{market}"))
+    return _loads(redis_client.hget(market_hash_key(sport, market), str(player_id)))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Writer-maintained index sets for cached Redis keys.
+
+Every writer that stores an odds:* or hit_rate:* value also adds the key to
+
+    idx:{namespace}:{sport}:all
+    idx:{namespace}:{sport}:market:{market}
+    idx:{namespace}:{sport}:event:{event_id}
+    idx:{namespace}:{sport}:player:{player_id}
+
+(whichever apply) in the same pipeline, and registers the sport in
+idx:{namespace}:sports. Each set's TTL is raised to the member's TTL, so a
+set lives exactly as long as its longest-lived member. Readers use
+SMEMBERS + MGET instead of KEYS/SCAN; members whose value has expired are
+dropped lazily on read.
+
+Run directly to check the sets against a SCAN of the keyspace and rebuild
+them: python scripts/redis_key_index.py [namespace] [sport] [--dry-run]
+"""
+
+import sys
+from typing import Dict, List, Optional
+
+INDEX_PREFIX = "idx"
+MGET_CHUNK = 500
+
+
+def index_set_key(namespace: str, sport: str, dimension: str, value=None) -> str:
+    if value is None:
+        return f"{INDEX_PREFIX}:{namespace}:{sport}:{dimension}"
+    return f"{INDEX_PREFIX}:{namespace}:{sport}:{dimension}:{value}"
+
+
+def sports_set_key(namespace: str) -> str:
+    return f"{INDEX_PREFIX}:{namespace}:sports"
+
+
+def index_sets_for(key: str, market=None, event=None, player=None) -> List[str]:
+    namespace, sport = key.split(":")[:2]
+    sets = [index_set_key(namespace, sport, "all")]
+    for dimension, value in (("market", market), ("event", event), ("player", player)):
+        if value is not None:
+            sets.append(index_set_key(namespace, sport, dimension, value))
+    return sets
+
+
+def index_value_write(pipe, key: str, value, ttl_seconds: int, market=None, event=None, player=None):
+    """SETEX the value and add the key to its index sets, all on the caller's pipeline"""
+    pipe.setex(key, ttl_seconds, value)
+    index_key(pipe, key, ttl_seconds, market=market, event=event, player=player)
+
+
+def index_key(pipe, key: str, ttl_seconds: int, market=None, event=None, player=None):
+    """Add a key written some other way (e.g. by a Lua script) to its index sets"""
+    namespace, sport = key.split(":")[:2]
+    pipe.sadd(sports_set_key(namespace), sport)
+    for set_key in index_sets_for(key, market=market, event=event, player=player):
+        pipe.sadd(set_key, key)
+        # NX sets the first TTL, GT only ever extends it to cover this member
+        pipe.expire(set_key, ttl_seconds, nx=True)
+        pipe.expire(set_key, ttl_seconds, gt=True)
+
+
+def parse_key(key: str) -> Optional[Dict]:
+    """Index dimensions of an existing key, or None for keys that aren't indexed"""
+    parts = key.split(":")
+    namespace = parts[0]
+    if namespace not in ("odds", "hit_rate") or len(parts) < 4:
+        return None  # odds:mlb:{event_id} game mappings and other singletons
+
+    if len(parts) == 5:
+        return {"event": parts[2], "player": parts[3], "market": parts[4]}      # cache_props
+    if parts[3] == "player_props":
+        return {"event": parts[2]}                                             # cache_props event blob
+    if parts[2].isdigit():
+        return {"player": parts[2], "market": parts[3]}                        # player odds / hit rates
+    return {"event": parts[2], "market": parts[3]}                             # game lines
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def index_members(redis_client, namespace: str, sport: str, dimension: str = "all", value=None) -> List[str]:
+    return sorted(_decode(m) for m in redis_client.smembers(index_set_key(namespace, sport, dimension, value)))
+
+
+def indexed_sports(redis_client, namespace: str) -> List[str]:
+    return sorted(_decode(m) for m in redis_client.smembers(sports_set_key(namespace)))
+
+
+def fetch_indexed(redis_client, namespace: str, sport: str, dimension: str = "all", value=None) -> Dict[str, object]:
+    """{key: raw value} for every live member of an index set (SMEMBERS + MGET)"""
+    set_key = index_set_key(namespace, sport, dimension, value)
+    members = index_members(redis_client, namespace, sport, dimension, value)
+
+    values, dangling = {}, []
+    for i in range(0, len(members), MGET_CHUNK):
+        chunk = members[i:i + MGET_CHUNK]
+        for key, raw in zip(chunk, redis_client.mget(chunk)):
+            if raw is None:
+                dangling.append(key)
+            else:
+                values[key] = raw
+
+    if dangling:
+        redis_client.srem(set_key, *dangling)
+    return values
+
+
+def rebuild_indexes(redis_client, namespace: str, sport: str, dry_run: bool = False) -> Dict[str, int]:
+    """Compare the index sets with a SCAN of the keyspace and rewrite them"""
+    expected: Dict[str, set] = {}
+    keys = [_decode(k) for k in redis_client.scan_iter(match=f"{namespace}:{sport}:*", count=1000)]
+    ttls = {}
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.ttl(key)
+    for key, ttl in zip(keys, pipe.execute()):
+        dims = parse_key(key)
+        if dims is None or ttl == -2:  # Not indexed, or expired since the SCAN
+            continue
+        ttls[key] = ttl
+        for set_key in index_sets_for(key, **dims):
+            expected.setdefault(set_key, set()).add(key)
+
+    existing_sets = [_decode(k) for k in redis_client.scan_iter(match=index_set_key(namespace, sport, "*"), count=1000)]
+    missing = dangling = 0
+    for set_key in set(existing_sets) | set(expected):
+        current = {_decode(m) for m in redis_client.smembers(set_key)}
+        should = expected.get(set_key, set())
+        missing += len(should - current)
+        dangling += len(current - should)
+
+    stats = {"keys": len(ttls), "sets": len(expected), "missing": missing, "dangling": dangling}
+    print(f"🔎 {namespace}:{sport}: {stats['keys']} keys, {stats['sets']} index sets, "
+          f"{missing} missing and {dangling} dangling members")
+    if dry_run:
+        return stats
+
+    pipe = redis_client.pipeline(transaction=True)
+    for set_key in existing_sets:
+        if set_key not in expected:
+            pipe.delete(set_key)
+    for set_key, members in expected.items():
+        pipe.delete(set_key)
+        pipe.sadd(set_key, *members)
+        # Members without a TTL keep the set persistent too
+        if all(ttls[m] > 0 for m in members):
+            pipe.expire(set_key, max(ttls[m] for m in members))
+    if expected:
+        pipe.sadd(sports_set_key(namespace), sport)
+    pipe.execute()
+    print(f"✅ Rebuilt {len(expected)} index sets for {namespace}:{sport}")
+    return stats
+
+
+def main():
+    import os
+    from upstash_rest import create_redis_client
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    namespace = args[0] if args else "odds"
+    sports = [args[1]] if len(args) > 1 else None
+
+    redis_client = create_redis_client(os.environ["UPSTASH_REDIS_REST_URL"], os.environ["UPSTASH_REDIS_REST_TOKEN"])
+    for sport in sports or indexed_sports(redis_client, namespace):
+        rebuild_indexes(redis_client, namespace, sport, dry_run="--dry-run" in sys.argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Redis memory report: hard-coded TTLs vs. the commence-time TTL policy.
+
+Replays a synthetic MLB day (games starting every half hour from 17:00 UTC,
+importers running every 30 minutes until first pitch) and, at a few
+checkpoints, loads the keys that would still be alive under each policy into
+a local Redis (BENCH_REDIS_URL, db 15, flushed) with their remaining TTLs.
+used_memory is read before and after each load.
+
+Usage: python scripts/redis_memory_report.py [games]
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta, timezone
+
+import redis
+
+from ttl_policy import ttl_for
+from benchmark_redis_hash_layout import make_entry, MARKETS
+
+BENCH_REDIS_URL = os.environ.get("BENCH_REDIS_URL", "redis://localhost:6379/15")
+PLAYERS_PER_GAME = 26
+RUN_EVERY = timedelta(minutes=30)
+GAME_MARKETS = ["h2h", "spreads", "totals"]
+
+# What each writer hard-coded before ttl_policy.py (None = no expiry)
+LEGACY_TTLS = {
+    "player_odds": 5400,
+    "props": 48 * 3600,
+    "game_lines": 6 * 3600,
+    "game_mapping": None,
+    "hit_rate": 86400,
+}
+
+
+def slate_keys(games, day):
+    """(key, family, commence_time, value) for everything the writers store for one day"""
+    now = day.isoformat()
+    for g in range(games):
+        event_id = f"evt{g:04d}"
+        commence = day.replace(hour=17) + timedelta(minutes=30 * g)
+        yield f"odds:mlb:{event_id}", "game_mapping", commence, json.dumps({"event_id": event_id, "commence_time": commence.isoformat()})
+        for market in GAME_MARKETS:
+            yield f"odds:mlb:{event_id}:{market}", "game_lines", commence, json.dumps({"event_id": event_id, "bookmakers": list(range(40))})
+        for p in range(PLAYERS_PER_GAME):
+            player_id = 600000 + g * PLAYERS_PER_GAME + p
+            for market in MARKETS:
+                value = json.dumps(make_entry(event_id, player_id, market, now))
+                yield f"odds:mlb:{event_id}:{player_id}:{market}", "props", commence, value
+                yield f"odds:baseball_mlb:{player_id}:{market}", "player_odds", commence, value
+                yield f"hit_rate:mlb:{player_id}:{market}", "hit_rate", None, json.dumps({"player_id": player_id, "market": market})
+
+
+def expires_at(family, commence, last_write, legacy):
+    if legacy:
+        ttl = LEGACY_TTLS[family]
+        return None if ttl is None else last_write + timedelta(seconds=ttl)
+    return last_write + timedelta(seconds=ttl_for(family, commence, now=last_write))
+
+
+def last_write_time(family, commence, first_run):
+    """Importers stop writing an event once it has started; hit rates are written once a day"""
+    if family == "hit_rate" or commence is None:
+        return first_run
+    runs = int((commence - first_run) / RUN_EVERY)
+    return first_run + runs * RUN_EVERY
+
+
+def load_alive(client, keys, checkpoint, first_run, legacy):
+    client.flushdb()
+    before = client.info("memory")["used_memory"]
+    pipe = client.pipeline(transaction=False)
+    alive = 0
+    for key, family, commence, value in keys:
+        expiry = expires_at(family, commence, last_write_time(family, commence, first_run), legacy)
+        if expiry is None:
+            pipe.set(key, value)
+        elif expiry > checkpoint:
+            pipe.setex(key, int((expiry - checkpoint).total_seconds()), value)
+        else:
+            continue
+        alive += 1
+    pipe.execute()
+    return alive, client.info("memory")["used_memory"] - before
+
+
+def main():
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    client = redis.Redis.from_url(BENCH_REDIS_URL)
+    day = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_run = day.replace(hour=8)
+    keys = list(slate_keys(games, day))
+    last_pitch = day.replace(hour=17) + timedelta(minutes=30 * (games - 1))
+
+    print(f"🏁 Replaying {games} games, {len(keys)} key writes ({BENCH_REDIS_URL})")
+    print(f"\n{'checkpoint':<22}{'legacy keys':>12}{'legacy MB':>11}{'policy keys':>13}{'policy MB':>11}")
+    for label, checkpoint in (
+        ("before first pitch", day.replace(hour=16)),
+        ("mid slate", day.replace(hour=17) + timedelta(minutes=15 * games)),
+        ("1h after last pitch", last_pitch + timedelta(hours=1)),
+        ("6h after last pitch", last_pitch + timedelta(hours=6)),
+        ("next morning", day + timedelta(days=1, hours=8)),
+    ):
+        legacy_keys, legacy_bytes = load_alive(client, keys, checkpoint, first_run, legacy=True)
+        policy_keys, policy_bytes = load_alive(client, keys, checkpoint, first_run, legacy=False)
+        print(f"{label:<22}{legacy_keys:>12,}{legacy_bytes / 1e6:>11.1f}{policy_keys:>13,}{policy_bytes / 1e6:>11.1f}")
+
+    client.flushdb()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Steam-move and stale-book detector over cross-book price updates.
+
+When several books move the same prop the same way within a few minutes
+(steam) and one book hasn't followed, that lagging price is usually our best
+EV. SteamDetector keeps, per prop (event, player, market, line, side):
+
+  - each book's current implied probability and their running sum, so the
+    consensus excluding any one book is O(1);
+  - a deque of the moves inside STEAM_WINDOW with per-direction counts of the
+    books that moved, evicted from the left as updates arrive.
+
+so each update costs O(1) amortized plus a pass over the prop's books (a
+handful). A steam move is STEAM_MIN_BOOKS or more books moving one way inside
+the window; the books that didn't move with it and sit STALE_MIN_DEVIATION
+or more (implied probability) from the consensus are stale.
+
+Stale books are published to the ZSET steam:{sport}, scored by deviation
+from consensus, with details in the hash steam:{sport}:detail. Entries leave
+when the book catches up or the steam ages out of the window.
+
+The feed only carries movements, so a book that never moves would never be
+part of the consensus or flagged stale. At startup every book's standing
+price is seeded from the importer's last-seen prices
+(odds_last_price:{sport}:{event_id}, see price_change_tracker.py), the same
+snapshot the feed's movements are diffed against.
+
+Run directly to consume the odds change feed (odds_change_feed.py):
+python scripts/steam_detector.py [sport]
+"""
+
+import os
+import sys
+import json
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from price_change_tracker import LAST_PRICE_PREFIX
+
+STEAM_WINDOW = int(os.environ.get("STEAM_WINDOW_SECONDS", "300"))
+STEAM_MIN_BOOKS = int(os.environ.get("STEAM_MIN_BOOKS", "3"))
+MIN_MOVE = 0.005              # Implied probability change that counts as a move
+STALE_MIN_DEVIATION = 0.015   # Implied probability gap to consensus that makes a book stale
+STEAM_TTL = 30 * 60
+SEED_CHUNK = 200              # Last-price hashes per HGETALL pipeline
+
+
+def implied_probability(american) -> float:
+    price = float(american)
+    return 100 / (price + 100) if price > 0 else -price / (-price + 100)
+
+
+def _epoch(ts) -> float:
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+
+
+class SteamDetector:
+    """Rolling per-prop window over book prices; update() is O(1) amortized per price"""
+
+    def __init__(self, window_seconds: int = STEAM_WINDOW, min_books: int = STEAM_MIN_BOOKS,
+                 min_move: float = MIN_MOVE, min_deviation: float = STALE_MIN_DEVIATION):
+        self.window_seconds = window_seconds
+        self.min_books = min_books
+        self.min_move = min_move
+        self.min_deviation = min_deviation
+        self.props: Dict[Tuple, Dict] = {}
+
+    def _state(self, prop: Tuple) -> Dict:
+        state = self.props.get(prop)
+        if state is None:
+            state = self.props[prop] = {
+                "probs": {},                      # book -> implied probability
+                "prices": {},                     # book -> American price
+                "sum": 0.0,
+                "moves": deque(),                 # (ts, book, direction)
+                "movers": {1: {}, -1: {}},        # direction -> {book: moves in window}
+                "last_seen": 0.0,
+            }
+        return state
+
+    def _expire(self, state: Dict, now: float):
+        moves = state["moves"]
+        while moves and moves[0][0] < now - self.window_seconds:
+            _, book, direction = moves.popleft()
+            movers = state["movers"][direction]
+            movers[book] -= 1
+            if not movers[book]:
+                del movers[book]
+
+    def update(self, prop: Tuple, book: str, price, ts) -> Dict:
+        """Apply one book's new price; returns {"steam": direction or 0, "stale": {book: info}}"""
+        now = _epoch(ts)
+        state = self._state(prop)
+        prob = implied_probability(price)
+        old = state["probs"].get(book)
+
+        state["sum"] += prob - (old or 0.0)
+        state["probs"][book] = prob
+        state["prices"][book] = price
+        state["last_seen"] = now
+        self._expire(state, now)
+
+        if old is not None and abs(prob - old) >= self.min_move:
+            direction = 1 if prob > old else -1
+            state["moves"].append((now, book, direction))
+            movers = state["movers"][direction]
+            movers[book] = movers.get(book, 0) + 1
+
+        return self._evaluate(state)
+
+    def seed(self, prop: Tuple, book: str, price, ts=None):
+        """Set a book's standing price without counting it as a move (startup snapshot)"""
+        state = self._state(prop)
+        prob = implied_probability(price)
+        state["sum"] += prob - state["probs"].get(book, 0.0)
+        state["probs"][book] = prob
+        state["prices"][book] = price
+        state["last_seen"] = max(state["last_seen"], _epoch(ts) if ts is not None else time.time())
+
+    def _evaluate(self, state: Dict) -> Dict:
+        probs = state["probs"]
+        for direction in (1, -1):
+            movers = state["movers"][direction]
+            if len(movers) < self.min_books or len(probs) < 2:
+                continue
+
+            stale = {}
+            for book, prob in probs.items():
+                if book in movers:
+                    continue
+                # Consensus of every other book, from the running sum
+                consensus = (state["sum"] - prob) / (len(probs) - 1)
+                deviation = (consensus - prob) * direction
+                if deviation >= self.min_deviation:
+                    stale[book] = {
+                        "price": state["prices"][book],
+                        "deviation": round(deviation, 4),
+                        "consensus_prob": round(consensus, 4),
+                        "movers": sorted(movers),
+                    }
+            return {"steam": direction, "stale": stale}
+        return {"steam": 0, "stale": {}}
+
+    def prune(self, idle_seconds: int = 6 * 3600, now: Optional[float] = None) -> int:
+        """Forget props with no update for idle_seconds (started games, pulled props)"""
+        now = now or time.time()
+        idle = [prop for prop, state in self.props.items() if state["last_seen"] < now - idle_seconds]
+        for prop in idle:
+            del self.props[prop]
+        return len(idle)
+
+
+class SteamPublisher:
+    """Mirrors the detector's stale books into steam:{sport} (ZSET by deviation) + detail hash"""
+
+    def __init__(self, redis_client, sport: str):
+        self.redis_client = redis_client
+        self.zset_key = f"steam:{sport}"
+        self.detail_key = f"steam:{sport}:detail"
+        self.flagged: Dict[Tuple, Dict[str, float]] = {}  # prop -> {member: flagged at}
+
+    @staticmethod
+    def member(prop: Tuple, book: str) -> str:
+        return "|".join(str(p) for p in prop) + f"|{book}"
+
+    def apply(self, pipe, prop: Tuple, result: Dict, now: float):
+        current = {self.member(prop, book): info for book, info in result["stale"].items()}
+        previous = self.flagged.get(prop, {})
+        gone = [m for m in previous if m not in current]
+        if gone:
+            pipe.zrem(self.zset_key, *gone)
+            pipe.hdel(self.detail_key, *gone)
+        if current:
+            pipe.zadd(self.zset_key, {m: info["deviation"] for m, info in current.items()})
+            pipe.hset(self.detail_key, mapping={
+                m: json.dumps({**info, "steam": result["steam"], "flagged_at": now}) for m, info in current.items()
+            })
+            pipe.expire(self.zset_key, STEAM_TTL)
+            pipe.expire(self.detail_key, STEAM_TTL)
+            self.flagged[prop] = {m: now for m in current}
+        else:
+            self.flagged.pop(prop, None)
+
+    def expire_older_than(self, pipe, cutoff: float):
+        """Drop flags whose steam has aged out of the window without a new update"""
+        for prop in list(self.flagged):
+            old = [m for m, flagged_at in self.flagged[prop].items() if flagged_at < cutoff]
+            if old:
+                pipe.zrem(self.zset_key, *old)
+                pipe.hdel(self.detail_key, *old)
+                for m in old:
+                    del self.flagged[prop][m]
+            if not self.flagged[prop]:
+                del self.flagged[prop]
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def seed_from_last_prices(detector: SteamDetector, redis_client, sport: str) -> int:
+    """Seed every prop/book price from the odds_last_price:{sport}:* hashes; returns prices seeded"""
+    keys = list(redis_client.scan_iter(match=f"{LAST_PRICE_PREFIX}:{sport}:*", count=1000))
+    seeded = 0
+    for i in range(0, len(keys), SEED_CHUNK):
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys[i:i + SEED_CHUNK]:
+            pipe.hgetall(key)
+        for prices in pipe.execute():
+            for field, value in prices.items():
+                # Same key/value encoding as price_key() / price_value()
+                event, player, market, line, book = _decode(field).split("|")
+                for side, price in zip(("over", "under"), _decode(value).split("|")):
+                    if price not in ("", "None"):
+                        detector.seed((event, player, market, line, side), book, price)
+                        seeded += 1
+    return seeded
+
+
+def top_stale(redis_client, sport: str, limit: int = 25) -> List[Dict]:
+    """Highest-deviation stale books with their details"""
+    members = [m.decode("utf-8") if isinstance(m, bytes) else m
+               for m in redis_client.zrevrange(f"steam:{sport}", 0, limit - 1)]
+    if not members:
+        return []
+    details = redis_client.hmget(f"steam:{sport}:detail", members)
+    return [{"prop": m, **json.loads(d)} for m, d in zip(members, details) if d]
+
+
+def main():
+    sport = sys.argv[1] if len(sys.argv) > 1 else "baseball_mlb"
+    from upstash_rest import create_redis_client
+    from odds_change_feed import ChangeFeedConsumer
+    redis_client = create_redis_client(os.environ["UPSTASH_REDIS_REST_URL"], os.environ["UPSTASH_REDIS_REST_TOKEN"])
+
+    detector = SteamDetector()
+    publisher = SteamPublisher(redis_client, sport)
+    consumer = ChangeFeedConsumer(redis_client, sport, "steam")
+    print(f"🌱 Seeded {seed_from_last_prices(detector, redis_client, sport)} standing book prices")
+    print(f"♨️ Watching {consumer.key} for steam ({STEAM_MIN_BOOKS}+ books in {STEAM_WINDOW}s)")
+
+    last_prune = time.time()
+    while True:
+        pipe = redis_client.pipeline(transaction=False)
+
+        def handle(m):
+            prop = (m["event"], m["player"], m["market"], m["line"], m["side"])
+            result = detector.update(prop, m["book"], m["new"], m["ts"])
+            publisher.apply(pipe, prop, result, _epoch(m["ts"]))
+            if result["stale"]:
+                print(f"♨️ {prop} steam {'+' if result['steam'] > 0 else '-'}: stale {sorted(result['stale'])}")
+
+        consumer.process(handle, count=500, block_ms=5000)
+        publisher.expire_older_than(pipe, time.time() - STEAM_WINDOW)
+        pipe.execute()
+
+        if time.time() - last_prune > 600:
+            detector.prune()
+            last_prune = time.time()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Canonical MLB team identity: every name a source uses for a team -> team_id.
+
+The odds API, StatsAPI and our mlb_games table each spell teams their own
+way ("St. Louis Cardinals", "Athletics" vs "Oakland Athletics", ...). Game
+mapping used to fuzzy-compare names for every event x game pair; instead,
+TeamIdentity resolves each name once through a dict keyed by team_key():
+
+  - mlb_teams rows (team_id, name)                      the DB names
+  - StatsAPI schedule teams, which carry their own id   learned per run
+  - KNOWN_ALIASES                                       renames/relocations
+  - team_alias:mlb (Redis hash team_key -> team_id)     learned offline
+
+Names nothing resolves are added to team_alias:mlb:unresolved. Running this
+module fuzzy-matches those against the known names (the only place
+SequenceMatcher is still used) and writes confident matches to the alias
+hash for the next mapping run:
+
+python scripts/team_identity.py [--dry-run]
+"""
+
+import os
+import re
+import sys
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, Optional, Set
+
+ALIAS_KEY = "team_alias:mlb"
+UNRESOLVED_KEY = "team_alias:mlb:unresolved"
+FUZZY_MIN_SCORE = 0.85        # Offline alias learning only
+FUZZY_MIN_MARGIN = 0.05       # Best match must beat the runner-up by this much
+
+# StatsAPI team ids for names no source lists any more
+KNOWN_ALIASES = {
+    "oaklandathletics": 133,
+    "sacramentoathletics": 133,
+    "athletics": 133,
+    "clevelandindians": 114,
+    "anaheimangels": 108,
+    "losangelesangelsofanaheim": 108,
+    "floridamarlins": 146,
+}
+
+
+def _decode(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def team_key(name: str) -> str:
+    """'St. Louis Cardinals' -> 'stlouiscardinals'"""
+    name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]", "", name.lower()).replace("socks", "sox")
+
+
+class TeamIdentity:
+    """team_key -> team_id for every name seen from any source"""
+
+    def __init__(self, teams: Iterable[Dict] = (), aliases: Optional[Dict] = None):
+        self.ids: Dict[str, int] = dict(KNOWN_ALIASES)
+        self.names: Dict[int, str] = {}
+        for team in teams:
+            self.add(team["name"], team["team_id"])
+        for key, team_id in (aliases or {}).items():
+            self.ids.setdefault(_decode(key), int(team_id))
+        self.unresolved: Set[str] = set()
+
+    @classmethod
+    def load(cls, supabase, redis_client=None) -> "TeamIdentity":
+        teams = supabase.table("mlb_teams").select("team_id, name").execute().data
+        aliases = redis_client.hgetall(ALIAS_KEY) if redis_client else {}
+        return cls(teams, aliases)
+
+    def add(self, name: str, team_id: int):
+        team_id = int(team_id)
+        self.ids[team_key(name)] = team_id
+        self.names.setdefault(team_id, name)
+
+    def learn_statsapi(self, games: Iterable[Dict]):
+        """StatsAPI schedule entries name their teams with ids: trust those"""
+        for game in games:
+            for side in ("home", "away"):
+                team = game["teams"][side]["team"]
+                self.add(team["name"], team["id"])
+
+    def resolve(self, name: str) -> Optional[int]:
+        team_id = self.ids.get(team_key(name))
+        if team_id is None and name:
+            self.unresolved.add(name)
+        return team_id
+
+    def save_unresolved(self, redis_client):
+        if redis_client and self.unresolved:
+            redis_client.sadd(UNRESOLVED_KEY, *sorted(self.unresolved))
+            print(f"⚠️ {len(self.unresolved)} unknown team names queued for alias learning: {sorted(self.unresolved)}")
+
+
+def suggest_alias(name: str, identity: TeamIdentity) -> Optional[int]:
+    """Fuzzy fallback: team_id when one known name clearly wins, else None"""
+    key = team_key(name)
+    best: Dict[int, float] = {}
+    for known, team_id in identity.ids.items():
+        score = SequenceMatcher(None, key, known).ratio()
+        best[team_id] = max(score, best.get(team_id, 0.0))
+    ranked = sorted(best.items(), key=lambda kv: kv[1], reverse=True)
+    if not ranked or ranked[0][1] < FUZZY_MIN_SCORE:
+        return None
+    if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < FUZZY_MIN_MARGIN:
+        return None
+    return ranked[0][0]
+
+
+def main():
+    from supabase import create_client
+    from upstash_rest import create_redis_client
+
+    dry_run = "--dry-run" in sys.argv
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    redis_client = create_redis_client(os.environ["UPSTASH_REDIS_REST_URL"], os.environ["UPSTASH_REDIS_REST_TOKEN"])
+    identity = TeamIdentity.load(supabase, redis_client)
+
+    pending = sorted(_decode(n) for n in redis_client.smembers(UNRESOLVED_KEY))
+    print(f"🔤 {len(pending)} unresolved team names")
+    learned = {}
+    for name in pending:
+        team_id = suggest_alias(name, identity)
+        if team_id is None:
+            print(f"  ❓ {name}: no confident match, add it to KNOWN_ALIASES by hand")
+            continue
+        learned[team_key(name)] = team_id
+        print(f"  ✅ {name} -> {identity.names.get(team_id, team_id)} ({team_id})")
+
+    if learned and not dry_run:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.hset(ALIAS_KEY, mapping=learned)
+        pipe.srem(UNRESOLVED_KEY, *[n for n in pending if team_key(n) in learned])
+        pipe.execute()
+        print(f"💾 Stored {len(learned)} aliases in {ALIAS_KEY}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Central TTL policy for cached Redis keys.
+
+Keys tied to an event expire a grace period after the event's commence_time
+instead of a fixed number of seconds after the write, so post-game odds leave
+memory (and the arb/EV scans) shortly after first pitch / tip-off. Each key
+family has its own grace and default; the grace can be overridden per family
+with REDIS_TTL_GRACE_<FAMILY> (seconds).
+
+    ttl = clamp(commence_time + grace - now, MIN_TTL, MAX_TTL)
+
+Writes without a commence_time (hit rates, per-date game lists) get the
+family's default_ttl. Keys holding a whole slate (generation and layout
+hashes) use slate_ttl(), which outlives the slate's last event.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Optional, Union
+
+MIN_TTL = 300
+MAX_TTL = 48 * 3600
+
+# grace: seconds past commence_time the key stays alive
+# default_ttl: used when the write has no commence_time
+POLICIES = {
+    # odds:{sport}:{player_id}:{market} (odds_import_script, cache_wnba_players, cache _mlb_players)
+    "player_odds": {"grace": 30 * 60, "default_ttl": 5400},
+    # odds:mlb:{event}:{player}:{market} and odds:mlb:{event}:player_props (optimized_odds_cache)
+    "props": {"grace": 30 * 60, "default_ttl": 6 * 3600},
+    # odds:{sport}:{event_id}:{market} (cache_game_lines); live lines stay useful longer
+    "game_lines": {"grace": 4 * 3600, "default_ttl": 6 * 3600},
+    # odds:mlb:{event_id} vendor event -> game mapping (fixed_game_mapping)
+    "game_mapping": {"grace": 6 * 3600, "default_ttl": 36 * 3600},
+    # games:mlb:{date}
+    "games_by_date": {"grace": 0, "default_ttl": 36 * 3600},
+    # odds_last_price:{sport}:{event_id} (price_change_tracker); only needed while the event is imported
+    "last_price": {"grace": 30 * 60, "default_ttl": 48 * 3600},
+    # hit_rate:{sport}:{player_id}:{market}
+    "hit_rate": {"grace": 0, "default_ttl": 24 * 3600},
+}
+
+
+def grace_for(family: str) -> int:
+    override = os.environ.get(f"REDIS_TTL_GRACE_{family.upper()}")
+    return int(override) if override else POLICIES[family]["grace"]
+
+
+def _parse_commence(commence_time) -> Optional[datetime]:
+    if not commence_time:
+        return None
+    if isinstance(commence_time, datetime):
+        return commence_time if commence_time.tzinfo else commence_time.replace(tzinfo=timezone.utc)
+    return datetime.fromisoformat(str(commence_time).replace("Z", "+00:00"))
+
+
+def ttl_for(family: str, commence_time: Union[str, datetime, None] = None, now: Optional[datetime] = None) -> int:
+    """TTL in seconds for a key of `family` belonging to an event starting at commence_time"""
+    policy = POLICIES[family]
+    try:
+        commence = _parse_commence(commence_time)
+    except ValueError:
+        commence = None
+    if commence is None:
+        return policy["default_ttl"]
+
+    now = now or datetime.now(timezone.utc)
+    remaining = int((commence - now).total_seconds()) + grace_for(family)
+    return max(MIN_TTL, min(MAX_TTL, remaining))
+
+
+def slate_ttl(family: str, commence_times: Iterable, now: Optional[datetime] = None) -> int:
+    """TTL for a key holding entries of every event in commence_times: the longest of theirs"""
+    now = now or datetime.now(timezone.utc)
+    return max((ttl_for(family, c, now) for c in commence_times), default=ttl_for(family))
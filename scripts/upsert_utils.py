@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared helpers for the batched upsert paths (DatabaseBatch and batch_upsert).
+"""
+
+import os
+import json
+import time
+import threading
+import concurrent.futures
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Optional, Tuple
+
+DEAD_LETTER_DIR = os.environ.get("DEAD_LETTER_DIR", "/tmp" if os.path.exists("/tmp") else ".")
+TRANSIENT_RETRIES = int(os.environ.get("UPSERT_TRANSIENT_RETRIES", "3"))  # Retries of a timed-out/5xx batch
+RETRY_BACKOFF = float(os.environ.get("UPSERT_RETRY_BACKOFF", "0.5"))      # Seconds, doubled per retry
+
+
+# ============= CONFLICT-KEY DEDUPLICATION =============
+
+SIDES = ("over", "under")
+
+
+def _side_price(record: Dict, side: str):
+    """Price of one side, whichever column name the table uses"""
+    return record.get(f"{side}_price", record.get(f"{side}_odds"))
+
+
+def dedupe_by_conflict_key(records: List[Dict], on_conflict: str, alternate_field: str) -> Tuple[List[Dict], int]:
+    """Collapse records that share the target table's conflict key.
+
+    Postgres rejects an ON CONFLICT DO UPDATE statement that touches the same
+    key twice, which happens when a standard and an _alternate market quote the
+    same line at the same book. Merge rule, per conflict key:
+
+    - Each side (over/under) is taken whole (price, link, sid) from one record,
+      never mixed between records.
+    - A side quoted in the standard market beats the same side from an
+      alternate market; otherwise the later record wins.
+    - `alternate_field` is True only if every merged record was alternate.
+    - All other fields come from the first record seen.
+
+    Returns (deduplicated records in first-seen order, number collapsed).
+    """
+    key_cols = [c.strip() for c in on_conflict.split(",")]
+    merged = {}
+    side_is_alternate = {}
+
+    for record in records:
+        key = tuple(
+            float(record[c]) if c == "line" and record.get(c) is not None else record.get(c)
+            for c in key_cols
+        )
+        is_alternate = bool(record.get(alternate_field))
+
+        if key not in merged:
+            merged[key] = dict(record)
+            side_is_alternate[key] = {side: is_alternate for side in SIDES if _side_price(record, side) is not None}
+            continue
+
+        target = merged[key]
+        target[alternate_field] = bool(target.get(alternate_field)) and is_alternate
+
+        for side in SIDES:
+            if _side_price(record, side) is None:
+                continue
+            current = side_is_alternate[key].get(side)
+            if current is None or current or not is_alternate:
+                for field, value in record.items():
+                    if field.startswith(f"{side}_"):
+                        target[field] = value
+                side_is_alternate[key][side] = is_alternate
+
+    collapsed = len(records) - len(merged)
+    if collapsed:
+        print(f"  🧬 Collapsed {collapsed} duplicate records by conflict key ({len(merged)} remain)")
+    return list(merged.values()), collapsed
+
+
+# ============= BISECTING RETRY =============
+
+# SQLSTATE classes caused by the rows themselves: 22 data exception
+# (bad value/format), 23 integrity constraint violation (not null, FK, check)
+DATA_ERROR_SQLSTATES = ("22", "23")
+
+
+def is_data_error(error: Exception) -> bool:
+    """True if the batch was rejected for its contents rather than a transient fault.
+
+    Data errors: PostgREST/psycopg errors with a 22xxx/23xxx code, other HTTP
+    4xx responses (except 408/429), and rows the client can't serialize.
+    Timeouts, 5xx, dropped connections and everything else are transient.
+    """
+    if isinstance(error, (TypeError, ValueError)):
+        return True  # e.g. a row json can't encode; never reaches the server
+
+    # postgrest APIError carries the SQLSTATE as .code, psycopg as .sqlstate
+    code = getattr(error, "code", None) or getattr(error, "sqlstate", None)
+    if isinstance(code, str) and code[:2] in DATA_ERROR_SQLSTATES:
+        return True
+
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500 and status not in (408, 429)
+
+
+def send_with_retry(send: Callable[[List[Dict]], List[Dict]], records: List[Dict]) -> List[Dict]:
+    """`send(records)`, retrying transient errors with exponential backoff.
+
+    Data errors are raised at once; a transient error is raised after
+    TRANSIENT_RETRIES retries.
+    """
+    for attempt in range(TRANSIENT_RETRIES + 1):
+        try:
+            return send(records)
+        except Exception as e:
+            if is_data_error(e) or attempt == TRANSIENT_RETRIES:
+                raise
+            delay = RETRY_BACKOFF * 2 ** attempt
+            print(f"    🔁 Transient upsert error, retrying {len(records)} records in {delay:.1f}s: {e}")
+            time.sleep(delay)
+
+
+def bisect_upsert(send: Callable[[List[Dict]], List[Dict]], records: List[Dict]) -> Tuple[List[Dict], List[Tuple[Dict, str]]]:
+    """Upsert `records` with `send`, bisecting on data errors to isolate bad rows.
+
+    A batch rejected for its contents is split in half and each half retried,
+    so k bad rows in a batch of n cost O(k log n) extra requests instead of n
+    single-row requests. Everything that can be written is written.
+
+    Transient errors are retried with backoff (send_with_retry) and, if they
+    persist, raised: the rows aren't bad, so they must not be dead-lettered.
+
+    Returns (results, failures) where failures is a list of (record, error).
+    """
+    if not records:
+        return [], []
+
+    try:
+        return send_with_retry(send, records) or [], []
+    except Exception as e:
+        if not is_data_error(e):
+            raise
+        if len(records) == 1:
+            return [], [(records[0], str(e))]
+
+    mid = len(records) // 2
+    left_results, left_failures = bisect_upsert(send, records[:mid])
+    right_results, right_failures = bisect_upsert(send, records[mid:])
+    return left_results + right_results, left_failures + right_failures
+
+
+def write_dead_letters(table: str, failures: List[Tuple[Dict, str]]) -> Optional[str]:
+    """Append rejected records to a JSONL dead-letter file and return its path"""
+    if not failures:
+        return None
+
+    path = os.path.join(DEAD_LETTER_DIR, f"dead_letter_{table}.jsonl")
+    failed_at = datetime.now(timezone.utc).isoformat()
+    with open(path, "a") as f:
+        for record, error in failures:
+            f.write(json.dumps({"table": table, "failed_at": failed_at, "error": error, "record": record}, default=str) + "\n")
+
+    print(f"    ☠️ Wrote {len(failures)} rejected records to {path}")
+    return path
+
+
+# ============= CONCURRENT WRITER =============
+
+def per_thread_client(factory: Callable[[], object]) -> Callable[[], object]:
+    """Getter returning one client per thread, created on first use.
+
+    The supabase client (and its HTTP session) isn't safe to share between
+    the writer's worker threads, so each `send` should fetch its client here.
+    """
+    local = threading.local()
+
+    def get():
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = factory()
+        return client
+
+    return get
+
+
+class ConcurrentUpsertWriter:
+    """Upsert batches with up to `max_in_flight` requests outstanding.
+
+    add()/submit() block once `max_in_flight` batches are in flight, so the
+    fetch/parse side holds at most (max_in_flight + 1) * batch_size records.
+    Batches can finish out of order but are reported in submission order, with
+    a committed-through watermark. Each batch goes through bisect_upsert, so
+    bad rows are isolated and dead-lettered on close(). A batch that still
+    fails after its transient retries is not dead-lettered: its records are
+    only listed in `failures` (for the caller to retry) and it stops the
+    watermark from advancing.
+    """
+
+    def __init__(self, send: Callable[[List[Dict]], List[Dict]], table: str,
+                 batch_size: int = 1000, max_in_flight: int = 4):
+        self.send = send
+        self.table = table
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_in_flight)
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.buffer = []
+        self.pending = deque()  # (batch_num, batch, future) in submission order
+        self.batches_submitted = 0
+        self.records_submitted = 0
+        self.committed_through = 0  # highest batch number with it and all earlier batches committed
+        self.crashed_batches = []
+        self.results = []
+        self.failures = []  # (record, error) for every record not written
+        self.rejected = []  # the subset rejected for bad data, dead-lettered on close()
+
+    def add(self, record: Dict):
+        """Buffer a record, submitting a batch once batch_size is reached"""
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.submit(self.buffer)
+            self.buffer = []
+
+    def submit(self, batch: List[Dict]):
+        """Send a batch in the background, blocking while all slots are busy"""
+        if not batch:
+            return
+        self.slots.acquire()  # Backpressure: wait for an in-flight batch to finish
+        self.batches_submitted += 1
+        self.records_submitted += len(batch)
+        future = self.executor.submit(bisect_upsert, self.send, batch)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.pending.append((self.batches_submitted, batch, future))
+        self._report_completed()
+
+    def _report_completed(self, wait: bool = False):
+        """Report finished batches in submission order"""
+        while self.pending and (wait or self.pending[0][2].done()):
+            batch_num, batch, future = self.pending.popleft()
+            size = len(batch)
+            try:
+                batch_results, batch_failures = future.result()
+            except Exception as e:
+                # Transient failure: nothing is known to be written, but the rows
+                # aren't bad, so they go back to the caller instead of the dead letters
+                self.crashed_batches.append(batch_num)
+                self.failures.extend((record, f"batch failed: {e}") for record in batch)
+                print(f"  ❌ Batch {batch_num} failed after retries, {size} records not written: {e}")
+                continue
+            self.results.extend(batch_results)
+            self.failures.extend(batch_failures)
+            self.rejected.extend(batch_failures)
+            if not self.crashed_batches:
+                self.committed_through = batch_num
+
+            if batch_failures:
+                print(f"  ❌ Batch {batch_num}: {len(batch_failures)} bad records isolated, {size - len(batch_failures)} committed")
+            else:
+                print(f"  ✅ Committed batch {batch_num} ({size} records)")
+
+    def close(self) -> List[Dict]:
+        """Flush the buffer, wait for every batch and return the upsert results"""
+        self.submit(self.buffer)
+        self.buffer = []
+        self._report_completed(wait=True)
+        self.executor.shutdown(wait=True)
+        write_dead_letters(self.table, self.rejected)
+        return self.results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Upstash REST transport with the redis.Redis calls our scripts use.
+
+Serverless runners often block or throttle the raw TLS Redis port, so with
+REDIS_TRANSPORT=rest create_redis_client() returns an UpstashRestClient that
+talks to UPSTASH_REDIS_REST_URL over HTTPS instead:
+
+  - single commands      POST /            ["SET", "k", "v"]
+  - pipeline()           POST /pipeline    [[...], [...]]   (chunked, MAX_BATCH per request)
+  - pipeline(transaction=True)
+                         POST /multi-exec  [[...], [...]]   (one request, atomic)
+
+One persistent HTTP/1.1 connection is kept alive and reused for every
+request. A connection the server closed while idle is replaced before
+sending; a request that fails after it was sent is only retried when every
+command in it is read-only, so writes (INCRBY, XADD, MULTI batches) are never
+applied twice. Replies come back as str (like decode_responses=True); the readers
+in this repo accept str or bytes. Without REDIS_TRANSPORT=rest the factory
+returns the usual redis.Redis TLS client.
+"""
+
+import os
+import json
+import select
+import threading
+import http.client
+from abc import ABC, abstractmethod
+from urllib.parse import urlsplit
+from typing import Dict, List, Optional
+
+REDIS_TRANSPORT = os.environ.get("REDIS_TRANSPORT", "tcp")
+MAX_BATCH = 1000
+REQUEST_TIMEOUT = 30
+
+# Safe to resend when we can't tell whether the server ran the first attempt
+READ_ONLY_COMMANDS = {
+    "GET", "MGET", "EXISTS", "TTL", "KEYS", "SCAN", "DBSIZE", "PING", "INFO",
+    "SMEMBERS", "ZCARD", "ZRANGEBYSCORE", "ZREVRANGE", "XLEN",
+    "HGET", "HGETALL", "HMGET", "HSCAN",
+}
+
+
+class UpstashRestError(Exception):
+    pass
+
+
+def _arg(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return str(value)
+
+
+def _pairs_to_dict(flat):
+    return dict(zip(flat[::2], flat[1::2])) if flat else {}
+
+
+def _stream_entries(entries):
+    return [(entry_id, _pairs_to_dict(fields) if fields is not None else None) for entry_id, fields in entries or []]
+
+
+def _with_scores(flat):
+    return [(member, float(score)) for member, score in zip(flat[::2], flat[1::2])] if flat else []
+
+
+def _to_bool(result):
+    return bool(result)
+
+
+def _parse_info(text):
+    info = {}
+    for line in (text or "").splitlines():
+        if ":" in line and not line.startswith("#"):
+            key, value = line.split(":", 1)
+            info[key] = int(value) if value.isdigit() else value
+    return info
+
+
+class _Commands(ABC):
+    """Command builders shared by the client (run now) and pipelines (queue)"""
+
+    @abstractmethod
+    def _call(self, command: List, transform=None):
+        """Run or queue one command; transform shapes the reply like redis-py"""
+
+    # Strings
+    def get(self, name):
+        return self._call(["GET", name])
+
+    def set(self, name, value, ex=None, px=None, nx=False, xx=False, get=False):
+        command = ["SET", name, value]
+        if ex is not None:
+            command += ["EX", int(ex)]
+        if px is not None:
+            command += ["PX", int(px)]
+        if nx:
+            command.append("NX")
+        if xx:
+            command.append("XX")
+        if get:
+            command.append("GET")
+            return self._call(command)
+        return self._call(command, lambda r: r == "OK")
+
+    def setex(self, name, time, value):
+        return self._call(["SETEX", name, int(time), value], lambda r: r == "OK")
+
+    def mget(self, keys, *args):
+        keys = list(keys) if isinstance(keys, (list, tuple, set)) else [keys]
+        return self._call(["MGET", *keys, *args])
+
+    def incrby(self, name, amount=1):
+        return self._call(["INCRBY", name, int(amount)])
+
+    def delete(self, *names):
+        return self._call(["DEL", *names])
+
+    def exists(self, *names):
+        return self._call(["EXISTS", *names])
+
+    # Expiry
+    def expire(self, name, time, nx=False, xx=False, gt=False, lt=False):
+        command = ["EXPIRE", name, int(time)]
+        for flag, enabled in (("NX", nx), ("XX", xx), ("GT", gt), ("LT", lt)):
+            if enabled:
+                command.append(flag)
+        return self._call(command, _to_bool)
+
+    def ttl(self, name):
+        return self._call(["TTL", name])
+
+    # Keyspace
+    def keys(self, pattern="*"):
+        return self._call(["KEYS", pattern])
+
+    def scan(self, cursor=0, match=None, count=None):
+        command = ["SCAN", cursor]
+        if match is not None:
+            command += ["MATCH", match]
+        if count is not None:
+            command += ["COUNT", count]
+        return self._call(command, lambda r: (int(r[0]), r[1]))
+
+    def dbsize(self):
+        return self._call(["DBSIZE"])
+
+    def flushdb(self):
+        return self._call(["FLUSHDB"], lambda r: r == "OK")
+
+    def ping(self):
+        return self._call(["PING"], lambda r: r == "PONG")
+
+    def info(self, section=None):
+        return self._call(["INFO"] + ([section] if section else []), _parse_info)
+
+    # Scripting
+    def script_load(self, script):
+        return self._call(["SCRIPT", "LOAD", script])
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        return self._call(["EVALSHA", sha, numkeys, *keys_and_args])
+
+    def eval(self, script, numkeys, *keys_and_args):
+        return self._call(["EVAL", script, numkeys, *keys_and_args])
+
+    # Sets
+    def sadd(self, name, *values):
+        return self._call(["SADD", name, *values])
+
+    def srem(self, name, *values):
+        return self._call(["SREM", name, *values])
+
+    def smembers(self, name):
+        return self._call(["SMEMBERS", name], lambda r: set(r or []))
+
+    # Sorted sets
+    def zadd(self, name, mapping: Dict, nx=False, xx=False, gt=False, lt=False):
+        command = ["ZADD", name]
+        for flag, enabled in (("NX", nx), ("XX", xx), ("GT", gt), ("LT", lt)):
+            if enabled:
+                command.append(flag)
+        for member, score in mapping.items():
+            command += [score, member]
+        return self._call(command)
+
+    def zrem(self, name, *values):
+        return self._call(["ZREM", name, *values])
+
+    def zcard(self, name):
+        return self._call(["ZCARD", name])
+
+    def zrangebyscore(self, name, min, max, start=None, num=None, withscores=False):
+        command = ["ZRANGEBYSCORE", name, min, max]
+        if withscores:
+            command.append("WITHSCORES")
+        if start is not None and num is not None:
+            command += ["LIMIT", start, num]
+        return self._call(command, _with_scores if withscores else None)
+
+    def zrevrange(self, name, start, end, withscores=False):
+        command = ["ZREVRANGE", name, start, end] + (["WITHSCORES"] if withscores else [])
+        return self._call(command, _with_scores if withscores else None)
+
+    def zremrangebyscore(self, name, min, max):
+        return self._call(["ZREMRANGEBYSCORE", name, min, max])
+
+    # Streams
+    def xadd(self, name, fields: Dict, id="*", maxlen=None, approximate=True):
+        command = ["XADD", name]
+        if maxlen is not None:
+            command += ["MAXLEN", "~" if approximate else "=", int(maxlen)]
+        command.append(id)
+        for k, v in fields.items():
+            command += [k, v]
+        return self._call(command)
+
+    def xlen(self, name):
+        return self._call(["XLEN", name])
+
+    def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        command = ["XGROUP", "CREATE", name, groupname, id] + (["MKSTREAM"] if mkstream else [])
+        return self._call(command, lambda r: r == "OK")
+
+    def xreadgroup(self, groupname, consumername, streams: Dict, count=None, block=None, noack=False):
+        command = ["XREADGROUP", "GROUP", groupname, consumername]
+        if count is not None:
+            command += ["COUNT", count]
+        if block is not None:
+            command += ["BLOCK", block]
+        if noack:
+            command.append("NOACK")
+        command += ["STREAMS", *streams.keys(), *streams.values()]
+        return self._call(command, lambda r: [[stream, _stream_entries(entries)] for stream, entries in r or []])
+
+    def xack(self, name, groupname, *ids):
+        return self._call(["XACK", name, groupname, *ids])
+
+    def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None):
+        command = ["XAUTOCLAIM", name, groupname, consumername, int(min_idle_time), start_id]
+        if count is not None:
+            command += ["COUNT", count]
+        return self._call(command, lambda r: [r[0], _stream_entries(r[1]), *r[2:]])
+
+    # Hashes
+    def hset(self, name, key=None, value=None, mapping: Optional[Dict] = None):
+        command = ["HSET", name]
+        if key is not None:
+            command += [key, value]
+        for k, v in (mapping or {}).items():
+            command += [k, v]
+        return self._call(command)
+
+    def hget(self, name, key):
+        return self._call(["HGET", name, key])
+
+    def hgetall(self, name):
+        return self._call(["HGETALL", name], _pairs_to_dict)
+
+    def hmget(self, name, keys, *args):
+        keys = list(keys) if isinstance(keys, (list, tuple, set)) else [keys]
+        return self._call(["HMGET", name, *keys, *args])
+
+    def hdel(self, name, *keys):
+        return self._call(["HDEL", name, *keys])
+
+    def hscan(self, name, cursor=0, match=None, count=None):
+        command = ["HSCAN", name, cursor]
+        if match is not None:
+            command += ["MATCH", match]
+        if count is not None:
+            command += ["COUNT", count]
+        return self._call(command, lambda r: (int(r[0]), _pairs_to_dict(r[1])))
+
+
+class UpstashRestClient(_Commands):
+    """redis.Redis-like client over the Upstash REST API"""
+
+    def __init__(self, url: str, token: str, timeout: int = REQUEST_TIMEOUT, max_batch: int = MAX_BATCH):
+        parts = urlsplit(url if "://" in url else f"https://{url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+            "Connection": "keep-alive",
+        }
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self.scheme == "http":
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+
+    def _dropped(self) -> bool:
+        """An idle kept-alive socket turns readable (EOF) once the server closes it"""
+        sock = self._conn.sock
+        if sock is None:
+            return False
+        try:
+            return bool(select.select([sock], [], [], 0)[0])
+        except (OSError, ValueError):
+            return True
+
+    def _post(self, path: str, payload):
+        commands = [payload] if path == "/" else payload
+        body = json.dumps([_arg(a) for a in payload] if path == "/" else [[_arg(a) for a in c] for c in payload])
+        read_only = all(_arg(c[0]).upper() in READ_ONLY_COMMANDS for c in commands)
+        with self._lock:
+            for attempt in (1, 2):
+                if self._conn is not None and self._dropped():
+                    self._conn.close()
+                    self._conn = None
+                if self._conn is None:
+                    self._conn = self._connect()
+                sent = False
+                try:
+                    self._conn.request("POST", self.base_path + path, body=body, headers=self.headers)
+                    sent = True
+                    response = self._conn.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.HTTPException, OSError):
+                    self._conn.close()
+                    self._conn = None
+                    # Once sent, the server may have run it: only reads are resent
+                    if attempt == 2 or (sent and not read_only):
+                        raise
+
+        try:
+            parsed = json.loads(data)
+        except ValueError:
+            raise UpstashRestError(f"HTTP {response.status}: {data[:200]!r}")
+        if response.status != 200 and not isinstance(parsed, list):
+            raise UpstashRestError(parsed.get("error", f"HTTP {response.status}"))
+        return parsed
+
+    def _call(self, command: List, transform=None):
+        reply = self._post("/", command)
+        if "error" in reply:
+            raise UpstashRestError(reply["error"])
+        result = reply.get("result")
+        return transform(result) if transform else result
+
+    def scan_iter(self, match=None, count=None):
+        cursor = None
+        while cursor != 0:
+            cursor, keys = self.scan(cursor or 0, match=match, count=count)
+            yield from keys
+
+    def hscan_iter(self, name, match=None, count=None):
+        cursor = None
+        while cursor != 0:
+            cursor, fields = self.hscan(name, cursor or 0, match=match, count=count)
+            yield from fields.items()
+
+    def pipeline(self, transaction: bool = True):
+        return UpstashRestPipeline(self, transaction)
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+
+class UpstashRestPipeline(_Commands):
+    """Queues commands; execute() sends them via /pipeline or /multi-exec"""
+
+    def __init__(self, client: UpstashRestClient, transaction: bool):
+        self.client = client
+        self.transaction = transaction
+        self.commands = []
+
+    def _call(self, command: List, transform=None):
+        self.commands.append((command, transform))
+        return self
+
+    def execute(self, raise_on_error: bool = True):
+        commands, self.commands = self.commands, []
+        if not commands:
+            return []
+
+        # MULTI/EXEC has to be a single request to stay atomic
+        if self.transaction:
+            batches = [commands]
+            path = "/multi-exec"
+        else:
+            batches = [commands[i:i + self.client.max_batch] for i in range(0, len(commands), self.client.max_batch)]
+            path = "/pipeline"
+
+        results = []
+        for batch in batches:
+            replies = self.client._post(path, [command for command, _ in batch])
+            for (command, transform), reply in zip(batch, replies):
+                if "error" in reply:
+                    error = UpstashRestError(f"{command[0]}: {reply['error']}")
+                    if raise_on_error:
+                        raise error
+                    results.append(error)
+                else:
+                    result = reply.get("result")
+                    results.append(transform(result) if transform else result)
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.commands = []
+
+
+def create_redis_client(url: str, token: str, decode_responses: bool = False):
+    """UpstashRestClient when REDIS_TRANSPORT=rest, else a TLS redis.Redis for the same database"""
+    if REDIS_TRANSPORT == "rest":
+        return UpstashRestClient(url, token)
+
+    import redis
+    return redis.Redis(
+        host=url.replace("https://", "").split(":")[0],
+        port=6379,
+        password=token,
+        ssl=True,
+        decode_responses=decode_responses
+    )
@@ -1,3 +1,10 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from redis_key_index import index_value_write
+from ttl_policy import ttl_for
+
 MARKETS = (
     "batter_home_runs,batter_home_runs_alternate,"
     "pitcher_record_a_win,pitcher_hits_allowed,pitcher_hits_allowed_alternate,"
@@ -27,7 +34,8 @@ def save_hit_rate_profiles(profiles):
             print(f"❌ Supabase insert error for {profile['player_name']}: {e}")
 
         # 2) Push to Redis under key: hit_rate:mlb:{player_id}:{market}
-        redis_key = f"hit_rate:mlb:{profile['player_id']}:{profile['market'].strip().lower()}"
+        market = profile['market'].strip().lower()
+        redis_key = f"hit_rate:mlb:{profile['player_id']}:{market}"
         try:
             # Create the cached data structure expected by the frontend
             cached_data = {
@@ -37,8 +45,10 @@ def save_hit_rate_profiles(profiles):
             }
             # JSON‐serialize the cached data object
             value = json.dumps(cached_data, default=str)
-            # Set with TTL = 24 hours
-            redis_client.set(redis_key, value, ex=86400)
+            # Set with the hit_rate TTL (24 hours), indexed by market and player
+            pipe = redis_client.pipeline(transaction=False)
+            index_value_write(pipe, redis_key, value, ttl_for("hit_rate"), market=market, player=profile['player_id'])
+            pipe.execute()
             print(f"✅ Redis set: {redis_key}")
         except Exception as e:
             print(f"❌ Redis set error for key {redis_key}: {e}") 
\ No newline at end of file